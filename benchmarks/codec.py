@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Decode and encode benchmarks for the data types """
+
+import json
+
+import requests
+
+from hpsdnclient.api import Api
+from hpsdnclient.datatypes import (Action, decode_action_lists, Flow,
+                                   JsonObjectFactory, Match)
+from hpsdnclient.rest import RestClient
+from hpsdnclient.template import FlowTemplate, Placeholder
+from hpsdnclient.tests import data
+from hpsdnclient.tests.stub import StubState
+
+from benchmarks.runner import Benchmark
+
+SIZES = (10, 100, 1000)
+
+URL = 'http://127.0.0.1:8080/sdn/v2.0/of/datapaths'
+
+
+def flows(size):
+    state = StubState(datapaths=1, flows=size)
+    return state.flows[state.dpids[0]]
+
+
+def rewrite_flows(size):
+    """ Flows that rewrite headers and output to several ports, as a
+    controller would return them """
+    items = flows(size)
+    for i, flow in enumerate(items):
+        flow["actions"] = [{"set_field": {"eth_dst": "00:00:00:00:00:01"}},
+                           {"set_field": {"ipv4_dst": "10.0.0.1"}},
+                           {"push_vlan": 33024},
+                           {"set_field": {"vlan_vid": i % 4094 + 1}},
+                           {"dec_nw_ttl": True},
+                           {"output": 1},
+                           {"output": 2},
+                           {"output": 3}]
+    return items
+
+
+def nodes(size):
+    return StubState(datapaths=1, flows=0, hosts=size, ports=size).nodes
+
+
+def stats(size):
+    port_stats = []
+    for number in range(1, size + 1):
+        entry = dict(data.PORT_STATS)
+        entry["port_id"] = number
+        port_stats.append(entry)
+    return [{"dpid": "00:00:00:00:00:00:00:01", "port_stats": port_stats}]
+
+
+PAYLOADS = (('flows', flows), ('nodes', nodes), ('stats', stats))
+
+
+def _response(key, items):
+    r = requests.Response()
+    r.status_code = 200
+    r.headers['Content-Type'] = 'application/json'
+    r._content = json.dumps({key: items, "version": "1.0.0"}).encode('utf-8')
+    return r
+
+
+def _decode_setup(key, make, size, **kwargs):
+    def setup():
+        return RestClient(None, **kwargs), _response(key, make(size))
+    return setup
+
+
+def _decode(context):
+    client, response = context
+    client._decode(URL, response)
+
+
+def _objects_setup(key, make, size):
+    def setup():
+        return RestClient(None)._decode(URL, _response(key, make(size)))
+    return setup
+
+
+def _to_dict(objects):
+    for o in objects:
+        o.to_dict()
+
+
+def _to_json_string(objects):
+    for o in objects:
+        o.to_json_string()
+
+
+def _json_loads(text):
+    json.loads(text)
+
+
+def _flow_factory(text):
+    for d in json.loads(text):
+        Flow.factory(d)
+
+
+def _flow_factory_action_lists(text):
+    for d in json.loads(text):
+        Flow.factory(decode_action_lists(d))
+
+
+def _flows_to_dict(objects):
+    for o in objects:
+        o.to_dict()
+
+
+def _rewrite_objects(size, action_lists=False):
+    def setup():
+        items = rewrite_flows(size)
+        if action_lists:
+            items = [decode_action_lists(d) for d in items]
+        return [Flow.factory(d) for d in items]
+    return setup
+
+
+def _create(text):
+    for d in json.loads(text):
+        JsonObjectFactory.create('Flow', d)
+
+
+def _assemble_setup(size):
+    def setup():
+        api = Api('127.0.0.1', None)
+        objects = _objects_setup('flows', flows, size)()
+        return api, objects
+    return setup
+
+
+def _assemble(context):
+    api, objects = context
+    api._assemble_flows(objects)
+
+
+def _policy(ip):
+    """ The flow from examples/killer.py """
+    return Flow(priority=30000, match=Match(eth_type="ipv4", ipv4_src=ip),
+                actions=Action(output=0), hard_timeout=30)
+
+
+def _ips(size):
+    return ["10.{0}.{1}.{2}".format(i // 65536, i // 256 % 256, i % 256)
+            for i in range(size)]
+
+
+def _policy_objects(context):
+    api, ips = context
+    api._flows_body([_policy(ip) for ip in ips])
+
+
+def _policy_template(context):
+    template, ips = context
+    template.batch(ips).data
+
+
+def _build():
+    benchmarks = []
+    for size in SIZES:
+        params = {"size": size}
+        for key, make in PAYLOADS:
+            benchmarks.append(Benchmark(
+                'decode.{0}[{1}]'.format(key, size), _decode,
+                _decode_setup(key, make, size), params=params))
+        for key, make in PAYLOADS[1:]:
+            benchmarks.append(Benchmark(
+                'decode.int_dpids.{0}[{1}]'.format(key, size), _decode,
+                _decode_setup(key, make, size, int_dpids=True),
+                params=params))
+        for key, make in PAYLOADS:
+            setup = _objects_setup(key, make, size)
+            benchmarks.append(Benchmark(
+                'encode.to_dict.{0}[{1}]'.format(key, size), _to_dict,
+                setup, params=params))
+            benchmarks.append(Benchmark(
+                'encode.to_json_string.{0}[{1}]'.format(key, size),
+                _to_json_string, setup, params=params))
+        text = json.dumps(flows(size))
+        benchmarks.append(Benchmark(
+            'flow.json_loads[{0}]'.format(size), _json_loads,
+            lambda text=text: text, params=params))
+        benchmarks.append(Benchmark(
+            'flow.factory[{0}]'.format(size), _flow_factory,
+            lambda text=text: text, params=params))
+        benchmarks.append(Benchmark(
+            'flow.factory.actions[{0}]'.format(size), _flow_factory,
+            lambda size=size: json.dumps(rewrite_flows(size)),
+            params=params))
+        benchmarks.append(Benchmark(
+            'flow.factory.action_lists[{0}]'.format(size),
+            _flow_factory_action_lists,
+            lambda size=size: json.dumps(rewrite_flows(size)),
+            params=params))
+        benchmarks.append(Benchmark(
+            'flow.to_dict.actions[{0}]'.format(size), _flows_to_dict,
+            _rewrite_objects(size), params=params))
+        benchmarks.append(Benchmark(
+            'flow.to_dict.action_lists[{0}]'.format(size), _flows_to_dict,
+            _rewrite_objects(size, True), params=params))
+        benchmarks.append(Benchmark(
+            'flow.create[{0}]'.format(size), _create,
+            lambda text=text: text, params=params))
+        benchmarks.append(Benchmark(
+            'assemble_flows[{0}]'.format(size), _assemble,
+            _assemble_setup(size), params=params))
+        benchmarks.append(Benchmark(
+            'policy.objects[{0}]'.format(size), _policy_objects,
+            lambda size=size: (Api('127.0.0.1', None), _ips(size)),
+            params=params))
+        benchmarks.append(Benchmark(
+            'policy.template[{0}]'.format(size), _policy_template,
+            lambda size=size: (FlowTemplate(_policy(Placeholder("ip"))),
+                               _ips(size)),
+            params=params))
+    return benchmarks
+
+
+BENCHMARKS = _build()
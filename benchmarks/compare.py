@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Compare benchmark results
+
+Compares the results of a base and a new run, e.g. of two commits. Each
+side is a results file or a directory of results files; the samples of
+repeated runs are pooled. For each benchmark the median and
+interquartile range of both sides are reported with a bootstrap
+confidence interval for the ratio of the medians.
+
+A benchmark has regressed when the whole confidence interval lies above
+``1 + threshold``. Regressions in the hot paths make the comparison
+fail, so it can be used as a gate. ::
+
+    python -m benchmarks.compare .benchmarks/base .benchmarks/new.json
+
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+
+from benchmarks.runner import format_time
+
+# Hot paths and the benchmarks that exercise them
+HOT_PATHS = (('JsonObject.to_dict', r'^encode\.to_dict\.'),
+             ('JsonObject.to_json_string', r'^encode\.to_json_string\.'),
+             ('JsonObjectFactory.create', r'^(decode\.|flow\.)'),
+             ('RestClient.get', r'^(e2e|team)\.get_'),
+             ('RestClient.post', r'^(e2e|team)\.add_'))
+
+DEFAULT_THRESHOLD = 0.05
+
+FASTER = 'faster'
+SLOWER = 'slower'
+SAME = 'same'
+REGRESSION = 'REGRESSION'
+
+
+def quantile(ordered, q):
+    """ The q-quantile of sorted values, interpolated linearly """
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (
+        position - lower)
+
+
+def median(values):
+    return quantile(sorted(values), 0.5)
+
+
+def iqr(values):
+    ordered = sorted(values)
+    return quantile(ordered, 0.75) - quantile(ordered, 0.25)
+
+
+def bootstrap_ratio(base, new, confidence=0.95, resamples=2000, seed=0):
+    """ Bootstrap confidence interval for median(new) / median(base)
+
+    :return: (low, high)
+
+    """
+    rng = random.Random(seed)
+    ratios = []
+    for _ in range(resamples):
+        b = median([rng.choice(base) for _ in base])
+        n = median([rng.choice(new) for _ in new])
+        ratios.append(n / b if b > 0 else float('inf'))
+    ratios.sort()
+    tail = (1 - confidence) / 2
+    return quantile(ratios, tail), quantile(ratios, 1 - tail)
+
+
+def load(path):
+    """ Returns the pooled samples per benchmark of a results file, or of
+    every results file in a directory """
+    if os.path.isdir(path):
+        paths = sorted(os.path.join(path, name) for name in os.listdir(path)
+                       if name.endswith('.json'))
+    else:
+        paths = [path]
+    samples = {}
+    for p in paths:
+        with open(p) as f:
+            results = json.load(f)
+        for name, result in results["benchmarks"].items():
+            samples.setdefault(name, []).extend(result["samples"])
+    return samples
+
+
+def hot_path(name, hot_paths=HOT_PATHS):
+    for label, pattern in hot_paths:
+        if re.search(pattern, name):
+            return label
+    return None
+
+
+class Comparison(object):
+    """ The comparison of one benchmark between two runs """
+    def __init__(self, name, base, new, threshold=DEFAULT_THRESHOLD,
+                 confidence=0.95, hot_paths=HOT_PATHS):
+        self.name = name
+        self.base_median = median(base)
+        self.new_median = median(new)
+        self.base_iqr = iqr(base)
+        self.new_iqr = iqr(new)
+        self.ratio = (self.new_median / self.base_median
+                      if self.base_median > 0 else float('inf'))
+        self.low, self.high = bootstrap_ratio(base, new, confidence)
+        self.hot_path = hot_path(name, hot_paths)
+        if self.low > 1 + threshold:
+            self.verdict = REGRESSION if self.hot_path else SLOWER
+        elif self.low > 1:
+            self.verdict = SLOWER
+        elif self.high < 1:
+            self.verdict = FASTER
+        else:
+            self.verdict = SAME
+
+    def to_dict(self):
+        return {"base_median": self.base_median,
+                "new_median": self.new_median,
+                "base_iqr": self.base_iqr,
+                "new_iqr": self.new_iqr,
+                "ratio": self.ratio,
+                "ci": [self.low, self.high],
+                "hot_path": self.hot_path,
+                "verdict": self.verdict}
+
+
+def compare(base, new, threshold=DEFAULT_THRESHOLD, confidence=0.95,
+            hot_paths=HOT_PATHS):
+    """ Compare the benchmarks present in both base and new
+
+    :param dict base: Samples per benchmark, as returned by load
+    :param dict new: Samples per benchmark, as returned by load
+    :return: A list of Comparison, sorted by name
+
+    """
+    return [Comparison(name, base[name], new[name], threshold, confidence,
+                       hot_paths)
+            for name in sorted(set(base) & set(new))]
+
+
+def report(comparisons, out=sys.stdout):
+    out.write('{0:36} {1:>24} {2:>24} {3:>8} {4:>17}  {5}\n'.format(
+        'benchmark', 'base (IQR)', 'new (IQR)', 'change', '95% CI', ''))
+    for c in comparisons:
+        out.write('{0:36} {1:>24} {2:>24} {3:>+7.1f}% {4:>17}  {5}\n'.format(
+            c.name,
+            '{0} ({1})'.format(format_time(c.base_median),
+                               format_time(c.base_iqr)),
+            '{0} ({1})'.format(format_time(c.new_median),
+                               format_time(c.new_iqr)),
+            (c.ratio - 1) * 100,
+            '[{0:+.1f}, {1:+.1f}]'.format(
+                (c.low - 1) * 100, (c.high - 1) * 100),
+            c.verdict if c.verdict != SAME else ''))
+    regressions = [c for c in comparisons if c.verdict == REGRESSION]
+    for c in regressions:
+        out.write('{0} regressed in {1}: {2:+.1f}%\n'.format(
+            c.hot_path, c.name, (c.ratio - 1) * 100))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.compare',
+        description=__doc__.splitlines()[0])
+    parser.add_argument('base', help='results file or directory')
+    parser.add_argument('new', help='results file or directory')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='slowdown allowed in hot paths, as a fraction')
+    parser.add_argument('--confidence', type=float, default=0.95)
+    parser.add_argument('--json', action='store_true',
+                        help='print the comparison as JSON')
+    args = parser.parse_args(argv)
+    comparisons = compare(load(args.base), load(args.new), args.threshold,
+                          args.confidence)
+    if args.json:
+        print(json.dumps(dict((c.name, c.to_dict()) for c in comparisons),
+                         indent=2, sort_keys=True))
+        regressions = [c for c in comparisons if c.verdict == REGRESSION]
+    else:
+        regressions = report(comparisons)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" DPID and MAC address conversion benchmarks """
+
+import random
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from hpsdnclient.utils import (DPID, MAC, Dpid, hex_to_string,
+                               ints_to_strings, string_to_hex,
+                               strings_to_ints)
+from hpsdnclient.tests.stub import dpid, mac
+
+from benchmarks.runner import Benchmark
+
+SIZES = (1000, 100000)
+
+
+def _values(size, length):
+    rng = random.Random(size)
+    bits = length * 4
+    return [rng.getrandbits(bits) for _ in range(size)]
+
+
+def _strings(size, length):
+    convert = dpid if length == DPID else mac
+    return [convert(v) for v in _values(size, length)]
+
+
+def _to_hex(context):
+    strings, length = context
+    for s in strings:
+        string_to_hex(s, length)
+
+
+def _to_string(context):
+    values, length = context
+    for v in values:
+        hex_to_string(v, length)
+
+
+def _strings_to_ints(context):
+    strings, length = context
+    strings_to_ints(strings)
+
+
+def _ints_to_strings(context):
+    values, length = context
+    ints_to_strings(values, length)
+
+
+def _dpid_str(values):
+    for v in values:
+        str(Dpid(v))
+
+
+def _setup(make, kind, size, array=False):
+    length = DPID if kind == 'dpid' else MAC
+
+    def setup():
+        values = make(size, length)
+        if array:
+            values = numpy.array(values, dtype=numpy.uint64 if make is
+                                 _values else None)
+        return values, length
+    return setup
+
+
+def _hex(size, length):
+    return ['{0:#x}'.format(v) for v in _values(size, length)]
+
+
+def _build():
+    benchmarks = []
+    for size in SIZES:
+        params = {"size": size}
+        for kind in ('dpid', 'mac'):
+            for name, func, make in (
+                    ('string_to_hex', _to_hex, _strings),
+                    ('hex_to_string', _to_string, _hex),
+                    ('strings_to_ints', _strings_to_ints, _strings),
+                    ('ints_to_strings', _ints_to_strings, _values)):
+                benchmarks.append(Benchmark(
+                    'convert.{0}.{1}[{2}]'.format(kind, name, size), func,
+                    _setup(make, kind, size), params=params))
+            if numpy is None:
+                continue
+            for name, func, make in (
+                    ('strings_to_ints', _strings_to_ints, _strings),
+                    ('ints_to_strings', _ints_to_strings, _values)):
+                benchmarks.append(Benchmark(
+                    'convert.{0}.numpy.{1}[{2}]'.format(kind, name, size),
+                    func, _setup(make, kind, size, True), params=params))
+        benchmarks.append(Benchmark(
+            'convert.dpid.Dpid.str[{0}]'.format(size), _dpid_str,
+            lambda size=size: _values(size, DPID), params=params))
+    return benchmarks
+
+
+BENCHMARKS = _build()
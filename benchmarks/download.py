@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Download benchmark
+
+Downloads a file from a local HTTP server that honours Range requests
+and reports the throughput of the download engine with the legacy 1 KB
+chunks flushed one by one, with large chunks, and with parallel ranges.
+
+    python -m benchmarks.download --size 256
+
+"""
+
+import argparse
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+# Python3 compatibility
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+import requests
+
+from benchmarks.upload import make_file, MB
+from hpsdnclient.transfer import DEFAULT_CHUNK_SIZE, Downloader
+
+RANGE_RE = re.compile(r'bytes=(\d+)-(\d*)')
+
+
+class ThreadingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class FileHandler(BaseHTTPRequestHandler):
+    """ Serves server.path as logs.zip, honouring Range requests """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        path = self.server.path
+        total = os.path.getsize(path)
+        start, end = 0, total - 1
+        match = RANGE_RE.match(self.headers.get('Range') or '')
+        if match is not None:
+            start = int(match.group(1))
+            end = int(match.group(2) or end)
+            self.send_response(206)
+            self.send_header('Content-Range',
+                             'bytes {0}-{1}/{2}'.format(start, end, total))
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/zip')
+        self.send_header('Content-Disposition',
+                         'attachment; filename=logs.zip')
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(end + 1 - start))
+        self.end_headers()
+        with open(path, 'rb') as f:
+            f.seek(start)
+            remaining = end + 1 - start
+            try:
+                while remaining > 0:
+                    data = f.read(min(remaining, MB))
+                    self.wfile.write(data)
+                    remaining -= len(data)
+            except (IOError, OSError):
+                # Clients close the first response of a parallel download
+                self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(path):
+    """ Serve path on a free localhost port, returns the server """
+    server = ThreadingServer(('127.0.0.1', 0), FileHandler)
+    server.path = path
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def _get(url, headers):
+    return requests.get(url, headers=headers, stream=True, timeout=60)
+
+
+def _legacy(url, target):
+    """ The download loop RestClient.get used before the engine """
+    r = _get(url, {})
+    with open(target, 'wb') as f:
+        for chunk in r.iter_content(chunk_size=1024):
+            if chunk:
+                f.write(chunk)
+                f.flush()
+
+
+def run(size=64 * MB, chunk_size=DEFAULT_CHUNK_SIZE, parallel=4, repeat=3):
+    """ Run the benchmark
+
+    :return: The best ``mb_s`` over ``repeat`` runs, keyed by variant
+
+    """
+    source = make_file(size)
+    target_dir = tempfile.mkdtemp()
+    target = os.path.join(target_dir, 'logs.zip')
+    server = start_server(source)
+    url = 'http://127.0.0.1:{0}/sdn/v2.0/logs'.format(server.server_port)
+    variants = {
+        "legacy_1k_flush": lambda: _legacy(url, target),
+        "serial": lambda: Downloader(_get, chunk_size).fetch(url, target),
+        "parallel_{0}".format(parallel): lambda: Downloader(
+            _get, chunk_size, parallel).fetch(url, target)}
+    results = {}
+    try:
+        for name, download in sorted(variants.items()):
+            best = None
+            for _ in range(repeat):
+                start = time.time()
+                download()
+                elapsed = time.time() - start
+                if os.path.getsize(target) != size:
+                    raise AssertionError("{0} is incomplete".format(name))
+                best = elapsed if best is None else min(best, elapsed)
+            results[name] = {"mb_s": size / float(MB) / best
+                             if best > 0 else None}
+    finally:
+        server.shutdown()
+        server.server_close()
+        os.remove(source)
+        shutil.rmtree(target_dir)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=64,
+                        help='file size in MB')
+    parser.add_argument('--chunk-size', type=int,
+                        default=DEFAULT_CHUNK_SIZE // 1024,
+                        help='download chunk size in KB')
+    parser.add_argument('--parallel', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    results = run(args.size * MB, args.chunk_size * 1024, args.parallel,
+                  args.repeat)
+    for name, result in sorted(results.items()):
+        print('{0:16} {1:8.1f} MB/s'.format(name, result["mb_s"] or 0.0))
+
+
+if __name__ == '__main__':
+    main()
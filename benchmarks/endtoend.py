@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" End-to-end benchmarks against the local stub controller
+
+Each benchmark starts its own stub. The team benchmarks run three stubs
+sharing one state; the stubs that are not the datapaths' master add
+``FORWARD_LATENCY`` to datapath requests, standing in for the hop a real
+team member makes to forward them to the master. The gzip benchmarks
+limit the stub to ``BANDWIDTH`` bytes per second of body data. The
+watch benchmarks poll a datapath whose ``WATCH_SIZE`` flows have not
+changed, with and without ETags from the stub.
+
+"""
+
+from hpsdnclient.api import Api
+from hpsdnclient.auth import XAuthToken
+from hpsdnclient.datatypes import Action, Flow, Match
+from hpsdnclient.team import TeamApi
+from hpsdnclient.template import FlowTemplate, Placeholder
+from hpsdnclient.tests.stub import Faults, StubController, StubState
+from hpsdnclient.watch import Watcher
+
+from benchmarks.runner import Benchmark
+
+SIZES = (10, 1000)
+
+FORWARD_LATENCY = 0.002
+
+# Bytes per second, roughly an 8 Mbit/s link
+BANDWIDTH = 1000000.0
+
+GZIP_SIZE = 1000
+
+WATCH_SIZE = 1000
+
+
+def new_flows(count):
+    return [Flow(priority=30000, idle_timeout=30,
+                 match=Match(eth_type="ipv4",
+                             ipv4_src="10.0.{0}.{1}".format(i // 250,
+                                                            i % 250)),
+                 actions=Action(output=1))
+            for i in range(count)]
+
+
+def new_batch(count):
+    """ The flows of new_flows as a FlowBatch """
+    template = FlowTemplate(Flow(priority=30000, idle_timeout=30,
+                                 match=Match(eth_type="ipv4",
+                                             ipv4_src=Placeholder("ip")),
+                                 actions=Action(output=1)))
+    return template.batch("10.0.{0}.{1}".format(i // 250, i % 250)
+                          for i in range(count))
+
+
+class Context(object):
+    def __init__(self, api, stubs, dpid, payload=None):
+        self.api = api
+        self.stubs = stubs
+        self.dpid = dpid
+        self.payload = payload
+        self.watcher = None
+
+
+def _single(flows, payload=0, make=new_flows):
+    def setup():
+        stub = StubController(StubState(datapaths=1, flows=flows)).start()
+        auth = XAuthToken(stub.address, 'sdn', 'skyline')
+        api = Api(stub.address, auth)
+        return Context(api, [stub], stub.state.dpids[0], make(payload))
+    return setup
+
+
+def _limited(gzip, flows=0, payload=0):
+    """ A stub on a slow link, compressing bodies if gzip is True """
+    def setup():
+        stub = StubController(StubState(datapaths=1, flows=flows),
+                              Faults(bandwidth=BANDWIDTH), gzip=gzip).start()
+        auth = XAuthToken(stub.address, 'sdn', 'skyline')
+        api = Api(stub.address, auth, compress=1024 if gzip else None)
+        return Context(api, [stub], stub.state.dpids[0], new_flows(payload))
+    return setup
+
+
+def _watched(etags):
+    """ A stub whose flows are watched, after the first poll """
+    def setup():
+        stub = StubController(StubState(datapaths=1, flows=WATCH_SIZE),
+                              etags=etags).start()
+        auth = XAuthToken(stub.address, 'sdn', 'skyline')
+        context = Context(Api(stub.address, auth), [stub],
+                          stub.state.dpids[0])
+        context.watcher = Watcher(context.api, dpids=[context.dpid])
+        context.watcher.poll()
+        return context
+    return setup
+
+
+def _team(affinity, flows=10):
+    def setup():
+        state = StubState(datapaths=4, flows=flows)
+        slow = Faults(latency=FORWARD_LATENCY, paths='^of/datapaths/.')
+        # The leader is not the datapaths' master
+        stubs = [StubController(state, slow).start(),
+                 StubController(state, slow).start(),
+                 StubController(state).start()]
+        state.master = stubs[2].address
+        addresses = [s.address for s in stubs]
+        auth = XAuthToken(addresses[0], 'sdn', 'skyline')
+        api = TeamApi(addresses, auth, affinity=affinity)
+        return Context(api, stubs, state.dpids[0], new_flows(1))
+    return setup
+
+
+def _stop(context):
+    for stub in context.stubs:
+        stub.stop()
+
+
+def _get_flows(context):
+    context.api.get_flows(context.dpid)
+
+
+def _add_flows(context):
+    context.api.add_flows(context.dpid, context.payload)
+
+
+def _poll(context):
+    context.watcher.poll()
+
+
+def _get_datapaths(context):
+    context.api.get_datapaths()
+
+
+def _build():
+    benchmarks = [Benchmark('e2e.get_datapaths', _get_datapaths, _single(0),
+                            _stop)]
+    for size in SIZES:
+        params = {"size": size}
+        benchmarks.append(Benchmark(
+            'e2e.get_flows[{0}]'.format(size), _get_flows, _single(size),
+            _stop, params))
+        benchmarks.append(Benchmark(
+            'e2e.add_flows[{0}]'.format(size), _add_flows,
+            _single(0, size), _stop, params))
+        benchmarks.append(Benchmark(
+            'e2e.add_flows.batch[{0}]'.format(size), _add_flows,
+            _single(0, size, new_batch), _stop, params))
+    for name, gzip in (('off', False), ('on', True)):
+        params = {"size": GZIP_SIZE, "gzip": gzip, "bandwidth": BANDWIDTH}
+        benchmarks.append(Benchmark(
+            'gzip.get_flows[{0}]'.format(name), _get_flows,
+            _limited(gzip, flows=GZIP_SIZE), _stop, params))
+        benchmarks.append(Benchmark(
+            'gzip.add_flows[{0}]'.format(name), _add_flows,
+            _limited(gzip, payload=GZIP_SIZE), _stop, params))
+    for name, etags in (('off', False), ('on', True)):
+        params = {"size": WATCH_SIZE, "etags": etags}
+        benchmarks.append(Benchmark(
+            'watch.poll[etags={0}]'.format(name), _poll, _watched(etags),
+            _stop, params))
+    for name, affinity in (('off', None), ('on', 60.0)):
+        params = {"affinity": affinity, "forward_latency": FORWARD_LATENCY}
+        benchmarks.append(Benchmark(
+            'team.get_flows[affinity={0}]'.format(name), _get_flows,
+            _team(affinity), _stop, params))
+        benchmarks.append(Benchmark(
+            'team.add_flows[affinity={0}]'.format(name), _add_flows,
+            _team(affinity), _stop, params))
+    return benchmarks
+
+
+BENCHMARKS = _build()
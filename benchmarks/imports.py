@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Import time benchmarks
+
+Each benchmark imports a module in a new interpreter; ``python -c pass``
+is the baseline for the interpreter start up.
+
+"""
+
+import subprocess
+import sys
+
+from benchmarks.runner import Benchmark
+
+STATEMENTS = (('baseline', 'pass'),
+              ('hpsdnclient', 'import hpsdnclient'),
+              ('hpsdnclient.datatypes', 'import hpsdnclient.datatypes'),
+              ('hpsdnclient.Api', 'from hpsdnclient import Api'))
+
+
+def _run(statement):
+    subprocess.check_call([sys.executable, '-c', statement])
+
+
+BENCHMARKS = [Benchmark('import.{0}'.format(name), _run,
+                        lambda statement=statement: statement)
+              for name, statement in STATEMENTS]
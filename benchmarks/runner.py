@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Benchmark runner
+
+Runs the registered benchmarks and stores the results as JSON, keyed by
+the git commit, so runs of different commits can be compared. ::
+
+    python -m benchmarks
+    python -m benchmarks -k decode --repeat 10 -o before.json
+
+"""
+
+import argparse
+import gc
+import importlib
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+import timeit
+
+SUITES = ('benchmarks.codec', 'benchmarks.conversion', 'benchmarks.endtoend',
+          'benchmarks.imports')
+
+RESULTS_DIR = '.benchmarks'
+
+FORMAT_VERSION = 1
+
+
+class Benchmark(object):
+    """ A timed operation
+
+    :param str name: The unique name of the benchmark, e.g.
+        "decode.flows[1000]"
+    :param func: The operation, called as ``func(context)``
+    :param setup: Called once to build the context (Optional)
+    :param teardown: Called with the context when the benchmark is done
+        (Optional)
+    :param dict params: Parameters stored with the results (Optional)
+
+    """
+    def __init__(self, name, func, setup=None, teardown=None, params=None):
+        self.name = name
+        self.func = func
+        self.setup = setup
+        self.teardown = teardown
+        self.params = params or {}
+
+    def _time(self, context, number):
+        func = self.func
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            start = timeit.default_timer()
+            for _ in range(number):
+                func(context)
+            return timeit.default_timer() - start
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def run(self, repeat=7, min_time=0.1):
+        """ Time the benchmark
+
+        The number of operations per sample is raised until a sample
+        takes at least ``min_time`` seconds.
+
+        :return: The result, with the seconds per operation of each sample
+        :rtype: dict
+
+        """
+        context = self.setup() if self.setup is not None else None
+        try:
+            number = 1
+            while True:
+                elapsed = self._time(context, number)
+                if elapsed >= min_time or number >= 10 ** 7:
+                    break
+                if elapsed <= 0:
+                    number *= 10
+                else:
+                    number = min(max(int(number * min_time / elapsed * 1.2),
+                                     number + 1), number * 10)
+            samples = [self._time(context, number) / number
+                       for _ in range(repeat)]
+        finally:
+            if self.teardown is not None:
+                self.teardown(context)
+        ordered = sorted(samples)
+        return {"params": self.params,
+                "number": number,
+                "samples": samples,
+                "min": ordered[0],
+                "median": ordered[len(ordered) // 2]}
+
+
+def load_benchmarks(suites=SUITES):
+    """ Returns the benchmarks of each suite module, in order """
+    benchmarks = []
+    for name in suites:
+        benchmarks.extend(importlib.import_module(name).BENCHMARKS)
+    return benchmarks
+
+
+def _git(*args):
+    try:
+        output = subprocess.check_output(('git',) + args,
+                                         stderr=subprocess.STDOUT)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.decode('utf-8').strip()
+
+
+def metadata():
+    """ Describe the commit and interpreter the benchmarks ran on """
+    status = _git('status', '--porcelain', '--untracked-files=no')
+    return {"commit": _git('rev-parse', 'HEAD'),
+            "dirty": bool(status),
+            "date": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "machine": platform.machine()}
+
+
+def run(benchmarks, repeat=7, min_time=0.1, out=None):
+    """ Run benchmarks, returns the results as a dict
+
+    :param out: A file the progress is written to (Optional)
+
+    """
+    results = {}
+    for benchmark in benchmarks:
+        result = benchmark.run(repeat, min_time)
+        results[benchmark.name] = result
+        if out is not None:
+            out.write('{0:45} {1:>12} {2:>12}  x{3}\n'.format(
+                benchmark.name, format_time(result["median"]),
+                format_time(result["min"]), result["number"]))
+            out.flush()
+    return {"version": FORMAT_VERSION,
+            "meta": metadata(),
+            "benchmarks": results}
+
+
+def format_time(seconds):
+    for unit, scale in (('s', 1.0), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return '{0:.3f} {1}'.format(seconds / scale, unit)
+    return '{0:.1f} ns'.format(seconds / 1e-9)
+
+
+def save(results, path):
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def default_path(meta):
+    name = (meta["commit"] or 'unknown')[:12]
+    if meta["dirty"]:
+        name += '-dirty'
+    return os.path.join(RESULTS_DIR, name + '.json')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks',
+        description='Run the hpsdnclient benchmarks')
+    parser.add_argument('-k', dest='pattern',
+                        help='only run benchmarks matching this regex')
+    parser.add_argument('--repeat', type=int, default=7,
+                        help='samples per benchmark')
+    parser.add_argument('--min-time', type=float, default=0.1,
+                        help='minimum seconds per sample')
+    parser.add_argument('--quick', action='store_true',
+                        help='3 short samples per benchmark')
+    parser.add_argument('-o', '--output',
+                        help='results file, {0}/<commit>.json by '
+                        'default'.format(RESULTS_DIR))
+    parser.add_argument('--compare', metavar='BASE',
+                        help='compare the results with a base results file '
+                        'or directory, failing on hot path regressions')
+    parser.add_argument('--list', action='store_true',
+                        help='list the benchmarks and exit')
+    args = parser.parse_args(argv)
+    benchmarks = load_benchmarks()
+    if args.pattern:
+        regex = re.compile(args.pattern)
+        benchmarks = [b for b in benchmarks if regex.search(b.name)]
+    if args.list:
+        for benchmark in benchmarks:
+            print(benchmark.name)
+        return 0
+    if args.quick:
+        args.repeat, args.min_time = 3, 0.02
+    sys.stdout.write('{0:45} {1:>12} {2:>12}\n'.format('benchmark', 'median',
+                                                       'min'))
+    results = run(benchmarks, args.repeat, args.min_time, sys.stdout)
+    path = args.output or default_path(results["meta"])
+    save(results, path)
+    print('Results written to {0}'.format(path))
+    if args.compare:
+        from benchmarks.compare import main as compare
+        return compare([args.compare, path])
+    return 0
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Upload benchmark
+
+Uploads a file to a local HTTP sink and reports the throughput and the
+peak Python memory allocated during the upload, for the streaming
+uploader and for a body read into memory in one piece.
+
+    python -m benchmarks.upload --size 256
+
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+# Python3 compatibility
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+import requests
+
+from hpsdnclient.transfer import DEFAULT_CHUNK_SIZE, UploadStream
+
+MB = 1024 * 1024
+
+
+class SinkHandler(BaseHTTPRequestHandler):
+    """ Reads and discards the request body """
+    def do_POST(self):
+        remaining = int(self.headers['Content-Length'])
+        while remaining > 0:
+            remaining -= len(self.rfile.read(min(remaining, MB)))
+        self.send_response(201)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def start_sink():
+    """ Start the sink on a free localhost port, returns the server """
+    server = HTTPServer(('127.0.0.1', 0), SinkHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def make_file(size):
+    """ Create a temporary file of ``size`` random bytes """
+    fd, path = tempfile.mkstemp(suffix='.zip')
+    with os.fdopen(fd, 'wb') as f:
+        for _ in range(size // MB):
+            f.write(os.urandom(MB))
+        f.write(os.urandom(size % MB))
+    return path
+
+
+def _in_memory(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def measure(url, body):
+    """ POST the body returned by ``body()`` to url
+
+    :return: (seconds, peak bytes allocated or None)
+
+    """
+    if tracemalloc is not None:
+        tracemalloc.start()
+    start = time.time()
+    r = requests.post(url, data=body(),
+                      headers={'content-type': 'application/zip'})
+    elapsed = time.time() - start
+    peak = None
+    if tracemalloc is not None:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    r.raise_for_status()
+    return elapsed, peak
+
+
+def run(size=64 * MB, chunk_size=DEFAULT_CHUNK_SIZE, repeat=3):
+    """ Run the benchmark
+
+    :return: Results keyed by uploader, each with the best ``mb_s`` and
+        the largest ``peak_mb`` over ``repeat`` runs
+
+    """
+    server = start_sink()
+    url = 'http://127.0.0.1:{0}/sdn/v2.0/apps'.format(server.server_port)
+    path = make_file(size)
+    uploaders = {"stream": lambda: UploadStream(path, chunk_size),
+                 "in_memory": lambda: _in_memory(path)}
+    results = {}
+    try:
+        for name, body in sorted(uploaders.items()):
+            runs = [measure(url, body) for _ in range(repeat)]
+            best = min(elapsed for elapsed, _ in runs)
+            peaks = [peak for _, peak in runs if peak is not None]
+            results[name] = {
+                "mb_s": size / float(MB) / best if best > 0 else None,
+                "peak_mb": max(peaks) / float(MB) if peaks else None}
+    finally:
+        os.remove(path)
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=64,
+                        help='file size in MB')
+    parser.add_argument('--chunk-size', type=int,
+                        default=DEFAULT_CHUNK_SIZE // 1024,
+                        help='upload chunk size in KB')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    results = run(args.size * MB, args.chunk_size * 1024, args.repeat)
+    for name, result in sorted(results.items()):
+        print('{0:10} {1:8.1f} MB/s  peak {2:8.2f} MB'.format(
+            name, result["mb_s"] or 0.0, result["peak_mb"] or 0.0))
+
+
+if __name__ == '__main__':
+    main()
@@ -15,6 +15,7 @@
 #   limitations under the License.
 
 import hpsdnclient as hp
+from hpsdnclient.transaction import Transaction
 
 def main():
     #initialize the api
@@ -37,10 +38,11 @@ def main():
     flow2 = hp.datatypes.Flow(priority=30000, idle_timeout=30,
                               match=match, actions=output1)
 
-    #push the flows to the datatpaths
-    api.add_flows('00:00:00:00:00:00:00:0e', flow1)
-    api.add_flows('00:00:00:00:00:00:00:01', flow1)
-    api.add_flows('00:00:00:00:00:00:00:0b', flow2)
+    #push the flows to the datatpaths, all or none of them
+    with Transaction(api) as tx:
+        tx.add_flows('00:00:00:00:00:00:00:0e', flow1)
+        tx.add_flows('00:00:00:00:00:00:00:01', flow1)
+        tx.add_flows('00:00:00:00:00:00:00:0b', flow2)
 
 if __name__ == "__main__":
     main()
@@ -14,7 +14,50 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
-#flake8: noqa
-from hpsdnclient.api import Api
-from hpsdnclient.auth import XAuthToken
+""" HP SDN Client
+
+Api, TeamApi and XAuthToken are imported on first use, so importing the
+package, or a light submodule such as hpsdnclient.datatypes, does not
+load requests and the REST client. Submodules are imported on first
+use as well, e.g ``hpsdnclient.datatypes``.
+
+"""
+
+import importlib
+import sys
+
 from hpsdnclient.version import __version__
+
+_LAZY = {'Api': 'hpsdnclient.api',
+         'TeamApi': 'hpsdnclient.team',
+         'XAuthToken': 'hpsdnclient.auth'}
+
+__all__ = ['Api', 'TeamApi', 'XAuthToken', '__version__']
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        value = getattr(importlib.import_module(_LAZY[name]), name)
+        globals()[name] = value
+        return value
+    if not name.startswith('_'):
+        submodule = '{0}.{1}'.format(__name__, name)
+        try:
+            return importlib.import_module(submodule)
+        except ImportError as e:
+            # Errors raised while importing an existing submodule propagate
+            if getattr(e, 'name', None) != submodule:
+                raise
+    raise AttributeError("module {0!r} has no attribute {1!r}".format(
+        __name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
+
+
+if sys.version_info < (3, 7):
+    # Module __getattr__ needs Python 3.7
+    from hpsdnclient.api import Api
+    from hpsdnclient.auth import XAuthToken
+    from hpsdnclient.team import TeamApi
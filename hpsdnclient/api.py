@@ -26,7 +26,12 @@ from hpsdnclient.rest import RestClient
 
 
 class Api(CoreMixin, OfMixin, NetMixin, ApiBase):
-    """ The container class for the HP SDN Controller Api """
-    def __init__(self, controller, auth):
-        self.restclient = RestClient(auth)
+    """ The container class for the HP SDN Controller Api
+
+    Additional keyword arguments, such as ``retry``, are passed to the
+    :class:`~hpsdnclient.rest.RestClient`
+
+    """
+    def __init__(self, controller, auth, **kwargs):
+        self.restclient = RestClient(auth, **kwargs)
         super(Api, self).__init__(controller, self.restclient)
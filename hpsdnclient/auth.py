@@ -19,11 +19,18 @@ import datetime
 
 import requests
 
+from hpsdnclient.utils import controller_url, API_ROOT
+
 
 class XAuthToken(requests.auth.AuthBase):
     """This class handles authentication against the HP SDN REST API and
     uses the Requests API. XAuthToken derives from
-    requests.auth.AuthBase and hpsdnclient.ApiBase."""
+    requests.auth.AuthBase and hpsdnclient.ApiBase.
+
+    The ``dispatch`` attribute, if set, is called as
+    ``dispatch(url, call)`` to send the login and logout requests.
+    :class:`~hpsdnclient.team.TeamRestClient` sets it so that they fail
+    over between the members of a team."""
 
     def __init__(self, server, user, password):
         """Initializes the class. Set the server, user and password
@@ -35,6 +42,12 @@ class XAuthToken(requests.auth.AuthBase):
         self.password = password
         self.token = None
         self.token_expiration = None
+        self.dispatch = None
+
+    def _send(self, url, call):
+        if self.dispatch is None:
+            return call(url)
+        return self.dispatch(url, call)
 
     def __call__(self, request):
         """This method is called when an authentication token is
@@ -50,10 +63,12 @@ class XAuthToken(requests.auth.AuthBase):
         """This method requests an authentication token from the SDN
         controller and returns a dictionary with the token and
         expiration time."""
-        url = 'https://{0}:8443/sdn/v2.0/auth'.format(self.server)
+        url = controller_url(self.server) + API_ROOT + 'auth'
         payload = {'login': {'user': self.user, 'password': self.password}}
-        r = requests.post(url, data=json.dumps(payload),
-                          verify=False, timeout=0.5)
+        data = json.dumps(payload)
+        r = self._send(url, lambda u: requests.post(u, data=data,
+                                                    verify=False,
+                                                    timeout=0.5))
         r.raise_for_status()
         data = r.json()
         self.token = data[u'record'][u'token']
@@ -63,10 +78,11 @@ class XAuthToken(requests.auth.AuthBase):
     def delete_auth(self):
         """Delete Authentication Token, AKA, Logout. This method logs
         the current user out"""
-        url = 'https://{0}:8443/sdn/v2.0/auth'.format(self.server)
+        url = controller_url(self.server) + API_ROOT + 'auth'
         headers = {"X-Auth-Token": self.token}
-        r = requests.delete(url, headers=headers,
-                            verify=False, timeout=0.5)
+        r = self._send(url, lambda u: requests.delete(u, headers=headers,
+                                                      verify=False,
+                                                      timeout=0.5))
         r.raise_for_status()
         self.token = None
         self.token_expiration = None
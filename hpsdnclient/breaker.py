@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Circuit breakers for unhealthy controllers and endpoints """
+
+import collections
+import threading
+import time
+# Python3 compatibility
+try:
+    from urllib.parse import urlparse
+except ImportError:
+    from urlparse import urlparse
+
+import requests
+
+from hpsdnclient.error import CircuitOpen
+from hpsdnclient.utils import endpoint_family
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+FAILURE_STATUS_CODES = frozenset([500, 502, 503, 504])
+
+FAILURE_EXCEPTIONS = (requests.ConnectionError, requests.Timeout)
+
+
+class CircuitBreaker(object):
+    """ A circuit breaker
+
+    The breaker opens when at least ``min_calls`` of the last ``window``
+    calls were made and the failure rate among them reaches
+    ``failure_threshold``. While open, calls fail fast with
+    :class:`~hpsdnclient.error.CircuitOpen`. After ``reset_timeout``
+    seconds the breaker is half-open and lets ``probes`` calls through;
+    if they all succeed it closes, if any fails it opens again.
+
+    :param str name: The name of the breaker
+    :param float failure_threshold: Failure rate that opens the breaker
+    :param int window: Number of recent calls considered
+    :param int min_calls: Minimum number of calls before opening
+    :param float reset_timeout: Seconds to stay open before probing
+    :param int probes: Number of probe calls while half-open
+
+    """
+    def __init__(self, name, failure_threshold=0.5, window=20, min_calls=5,
+                 reset_timeout=30.0, probes=1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.probes = probes
+        self._outcomes = collections.deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = None
+        self._probes_sent = 0
+        self._probes_passed = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state(time.time())
+
+    def _current_state(self, now):
+        if (self._state == OPEN and
+                now - self._opened_at >= self.reset_timeout):
+            self._state = HALF_OPEN
+            self._probes_sent = 0
+            self._probes_passed = 0
+        return self._state
+
+    def _open(self, now):
+        self._state = OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+
+    def before_call(self):
+        """ Raises CircuitOpen if the call is not allowed """
+        with self._lock:
+            now = time.time()
+            state = self._current_state(now)
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and self._probes_sent < self.probes:
+                self._probes_sent += 1
+                return
+            retry_after = 0.0
+            if state == OPEN:
+                retry_after = self.reset_timeout - (now - self._opened_at)
+            raise CircuitOpen(self.name, retry_after)
+
+    def cancel(self):
+        """ Undo before_call for a call that was never made """
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes_sent > 0:
+                self._probes_sent -= 1
+
+    def record(self, success):
+        """ Record the outcome of a call allowed by before_call """
+        with self._lock:
+            now = time.time()
+            state = self._current_state(now)
+            if state == HALF_OPEN:
+                if not success:
+                    self._open(now)
+                else:
+                    self._probes_passed += 1
+                    if self._probes_passed >= self.probes:
+                        self._state = CLOSED
+                        self._outcomes.clear()
+                return
+            if state == OPEN:
+                return
+            self._outcomes.append(success)
+            failures = sum(1 for s in self._outcomes if not s)
+            if (len(self._outcomes) >= self.min_calls and
+                    failures >= self.failure_threshold * len(self._outcomes)):
+                self._open(now)
+
+    def to_dict(self):
+        with self._lock:
+            state = self._current_state(time.time())
+            failures = sum(1 for s in self._outcomes if not s)
+            return {"state": state,
+                    "calls": len(self._outcomes),
+                    "failures": failures}
+
+
+class CircuitBreakers(object):
+    """ Circuit breakers per controller and per endpoint family
+
+    Every request must pass both the breaker for its controller and the
+    breaker for its controller and endpoint family (``of``, ``net``,
+    ``diag`` or ``core``). Keyword arguments are passed to each
+    :class:`CircuitBreaker` as it is created.
+
+    :param failure_status: HTTP status codes counted as failures
+    :param failure_exceptions: Exception types counted as failures
+
+    """
+    def __init__(self, failure_status=FAILURE_STATUS_CODES,
+                 failure_exceptions=FAILURE_EXCEPTIONS, **kwargs):
+        self.failure_status = frozenset(failure_status)
+        self.failure_exceptions = tuple(failure_exceptions)
+        self.options = kwargs
+        self.breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            if name not in self.breakers:
+                self.breakers[name] = CircuitBreaker(name, **self.options)
+            return self.breakers[name]
+
+    def for_url(self, url):
+        """ Returns the controller and endpoint family breakers for url """
+        controller = urlparse(url).netloc
+        family = '{0}/{1}'.format(controller, endpoint_family(url))
+        return [self.get(controller), self.get(family)]
+
+    def call(self, url, send):
+        """ Call ``send`` if the breakers for ``url`` allow it """
+        breakers = self.for_url(url)
+        allowed = []
+        try:
+            for breaker in breakers:
+                breaker.before_call()
+                allowed.append(breaker)
+        except CircuitOpen:
+            for breaker in allowed:
+                breaker.cancel()
+            raise
+        success = False
+        try:
+            response = send()
+            success = response.status_code not in self.failure_status
+            return response
+        except self.failure_exceptions:
+            raise
+        except Exception:
+            # Errors that say nothing about the controller's health
+            success = True
+            raise
+        finally:
+            for breaker in breakers:
+                breaker.record(success)
+
+    def states(self):
+        """ Returns the state of every breaker, keyed by name """
+        with self._lock:
+            breakers = list(self.breakers.values())
+        return dict((b.name, b.to_dict()) for b in breakers)
@@ -0,0 +1,460 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" The hpsdn command line tool
+
+Each command calls an Api method and prints the result as JSON. The
+controller and credentials come from the options or from the SDNCTL,
+SDNUSER and SDNPASS environment variables. ::
+
+    hpsdn datapaths
+    hpsdn flows 00:00:00:00:00:00:00:01
+
+A daemon can hold a logged in Api, with pooled connections, on a Unix
+socket. Commands are sent to it when it is running for the same
+controller and user, so they skip the import of the REST client, the
+login and the connection set up. The socket is kept in a directory only
+the user can access, ``$XDG_RUNTIME_DIR`` or ``hpsdn-<uid>`` in the
+temporary directory, and is only used if the user owns it. ::
+
+    hpsdn daemon --detach
+    hpsdn datapaths
+    hpsdn daemon-stop
+
+"""
+
+import argparse
+import json
+import os
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+# Python3 compatibility
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+SOCKET_TIMEOUT = 120.0
+START_TIMEOUT = 10.0
+
+# Replies that send the command to the controller directly instead
+REDIRECT_ERRORS = ('WrongController', 'WrongUser')
+
+
+def _uid():
+    return os.getuid() if hasattr(os, 'getuid') else None
+
+
+def socket_directory():
+    """ The per user directory of the daemon socket """
+    runtime = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime and os.path.isdir(runtime):
+        return runtime
+    return os.path.join(tempfile.gettempdir(),
+                        'hpsdn-{0}'.format(_uid() or 0))
+
+
+def default_socket():
+    return os.environ.get('HPSDN_SOCKET') or os.path.join(
+        socket_directory(), 'hpsdn.sock')
+
+
+def check_owner(path):
+    """ Raises RuntimeError if path is owned by another user """
+    uid = _uid()
+    if uid is not None and os.stat(path).st_uid != uid:
+        raise RuntimeError("{0} is owned by another user".format(path))
+
+
+def _private_directory(path):
+    """ Create the socket directory, readable only by the user. The
+    default directory must not be accessible to other users """
+    if not os.path.isdir(path):
+        os.makedirs(path, 0o700)
+    if path == socket_directory():
+        check_owner(path)
+        if stat.S_IMODE(os.stat(path).st_mode) & 0o077:
+            raise RuntimeError("{0} is accessible to other users".format(
+                path))
+
+
+class Command(object):
+    """ A CLI command that calls an Api method
+
+    :param str name: The command name
+    :param str method: The Api method
+    :param params: (name, kind) tuples for the positional arguments. kind is
+        "str", "dpid", "path" or "flows"; a name ending in "?" is optional
+    :param str help: The help text
+
+    """
+    def __init__(self, name, method, params=(), help=None):
+        self.name = name
+        self.method = method
+        self.params = params
+        self.help = help
+
+
+COMMANDS = [
+    Command('datapaths', 'get_datapaths', help='list datapaths'),
+    Command('datapath', 'get_datapath_detail', [('dpid', 'dpid')],
+            'show a datapath'),
+    Command('ports', 'get_ports', [('dpid', 'dpid')], 'list ports'),
+    Command('port-stats', 'get_port_stats', [('dpid', 'dpid')],
+            'show port statistics'),
+    Command('stats', 'get_stats', help='show controller statistics'),
+    Command('flows', 'get_flows', [('dpid', 'dpid')], 'list flows'),
+    Command('add-flows', 'add_flows', [('dpid', 'dpid'), ('file', 'flows')],
+            'add the flows in a JSON file'),
+    Command('delete-flows', 'delete_flows',
+            [('dpid', 'dpid'), ('file', 'flows')],
+            'delete the flows in a JSON file'),
+    Command('groups', 'get_groups', [('dpid', 'dpid')], 'list groups'),
+    Command('meters', 'get_meters', [('dpid', 'dpid')], 'list meters'),
+    Command('clusters', 'get_clusters', help='list clusters'),
+    Command('links', 'get_links', [('dpid?', 'dpid')], 'list links'),
+    Command('path', 'get_forward_path',
+            [('src_dpid', 'dpid'), ('dst_dpid', 'dpid')],
+            'show the forward path between two datapaths'),
+    Command('nodes', 'get_nodes', help='list end nodes'),
+    Command('arps', 'get_arps', help='list ARP entries'),
+    Command('apps', 'get_apps', help='list applications'),
+    Command('app', 'get_app_info', [('app', 'str')], 'show an application'),
+    Command('app-health', 'get_app_health', [('app', 'str')],
+            'show the health of an application'),
+    Command('upload-app', 'upload_app', [('file', 'path')],
+            'upload an application'),
+    Command('manage-app', 'manage_app', [('app', 'str'), ('action', 'str')],
+            'install, start or stop an application'),
+    Command('uninstall-app', 'uninstall_app', [('app', 'str')],
+            'uninstall an application'),
+    Command('licenses', 'get_licenses', help='list licenses'),
+    Command('team', 'get_team', help='show the team configuration'),
+    Command('systems', 'get_systems', help='list the team members'),
+    Command('regions', 'get_regions', help='list regions'),
+    Command('download-logs', 'download_logs', [('directory?', 'path')],
+            'download the controller logs'),
+]
+
+COMMAND_MAP = dict((c.name, c) for c in COMMANDS)
+
+
+def parse_dpid(value):
+    """ DPIDs may be given as 00:00:00:00:00:00:00:01 or as integers """
+    if ':' in value:
+        return value
+    return int(value, 0)
+
+
+def client_args(command, values):
+    """ Convert the command line arguments to JSON serializable values,
+    relative to the client's working directory """
+    args = []
+    for (name, kind), value in zip(command.params, values):
+        if value is None:
+            args.append(None)
+        elif kind == 'dpid':
+            args.append(parse_dpid(value))
+        elif kind == 'path':
+            args.append(os.path.abspath(value))
+        elif kind == 'flows':
+            with open(value) as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                data = data.get("flows", [data.get("flow", data)])
+            args.append(data)
+        else:
+            args.append(value)
+    return args
+
+
+def to_plain(value):
+    """ Convert a result to JSON serializable values """
+    if isinstance(value, list):
+        return [to_plain(v) for v in value]
+    if isinstance(value, dict):
+        return dict((k, to_plain(v)) for k, v in value.items())
+    if hasattr(value, 'to_dict'):
+        return to_plain(value.to_dict())
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    try:
+        if isinstance(value, (str, unicode)):
+            return value
+    except NameError:
+        if isinstance(value, str):
+            return value
+    return str(value)
+
+
+def execute(api, command, args):
+    """ Call the Api method of a command, returns the result as plain
+    values """
+    from hpsdnclient.datatypes import JsonObjectFactory
+    call_args = []
+    for (name, kind), value in zip(command.params, args):
+        if kind == 'flows':
+            value = [JsonObjectFactory.create('Flow', f) for f in value]
+        if value is None and name.endswith('?'):
+            break
+        call_args.append(value)
+    return to_plain(getattr(api, command.method)(*call_args))
+
+
+def connect_api(controller, user, password):
+    """ Returns an Api using a pooled session """
+    import requests
+    from hpsdnclient.api import Api
+    from hpsdnclient.auth import XAuthToken
+    auth = XAuthToken(controller, user, password)
+    return Api(controller, auth, session=requests.Session())
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            message = json.loads(line.decode('utf-8'))
+            reply = self.server.daemon.dispatch(message)
+        except Exception as e:
+            reply = {"error": type(e).__name__, "message": str(e)}
+        self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class Daemon(object):
+    """ Serves CLI commands for one controller on a Unix socket
+
+    Commands are only run for the controller and user the Api is logged
+    in as; clients asking for others are told to connect directly.
+
+    :param api: The Api used to run the commands
+    :param str controller: The controller address the Api talks to
+    :param str path: The socket path
+
+    """
+    def __init__(self, api, controller, path):
+        self.api = api
+        self.controller = controller
+        self.user = getattr(api.restclient.auth, 'user', None)
+        self.path = path
+        self.started = None
+        self.requests = 0
+        self._server = None
+        self._lock = threading.Lock()
+
+    def dispatch(self, message):
+        command = message.get("command")
+        if command == '_status':
+            return {"result": {"controller": self.controller,
+                               "user": self.user,
+                               "pid": os.getpid(),
+                               "uptime": time.time() - self.started,
+                               "requests": self.requests}}
+        if command == '_stop':
+            threading.Thread(target=self._server.shutdown).start()
+            return {"result": None}
+        if message.get("controller") != self.controller:
+            return {"error": "WrongController",
+                    "message": "the daemon serves {0}".format(self.controller)}
+        if message.get("user") != self.user:
+            return {"error": "WrongUser",
+                    "message": "the daemon is logged in as {0}".format(
+                        self.user)}
+        if command not in COMMAND_MAP:
+            return {"error": "UnknownCommand", "message": command}
+        with self._lock:
+            self.requests += 1
+        return {"result": execute(self.api, COMMAND_MAP[command],
+                                  message.get("args", []))}
+
+    def bind(self):
+        _private_directory(os.path.dirname(os.path.abspath(self.path)))
+        if os.path.exists(self.path):
+            if request(self.path, {"command": "_status"}) is not None:
+                raise RuntimeError(
+                    "A daemon is already listening on {0}".format(self.path))
+            os.remove(self.path)
+        old_umask = os.umask(0o077)
+        try:
+            self._server = _Server(self.path, _Handler)
+        finally:
+            os.umask(old_umask)
+        self._server.daemon = self
+        self.started = time.time()
+
+    def serve_forever(self, poll_interval=0.5):
+        if self._server is None:
+            self.bind()
+        try:
+            self._server.serve_forever(poll_interval)
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def shutdown(self):
+        self._server.shutdown()
+
+
+def request(path, message, timeout=SOCKET_TIMEOUT):
+    """ Send a message to the daemon, returns the reply or None if no
+    daemon is listening on path. Raises RuntimeError if the socket is
+    owned by another user """
+    if not hasattr(socket, 'AF_UNIX') or not os.path.exists(path):
+        return None
+    check_owner(path)
+    if not stat.S_ISSOCK(os.stat(path).st_mode):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        try:
+            sock.connect(path)
+        except socket.error:
+            return None
+        sock.sendall(json.dumps(message).encode('utf-8') + b'\n')
+        reply = sock.makefile('rb').readline()
+    finally:
+        sock.close()
+    if not reply:
+        return None
+    return json.loads(reply.decode('utf-8'))
+
+
+def _start_detached(args):
+    env = dict(os.environ, SDNCTL=args.controller, SDNUSER=args.user or '',
+               SDNPASS=args.password or '')
+    command = [sys.executable, '-m', 'hpsdnclient.cli', '--socket',
+               args.socket, 'daemon']
+    devnull = open(os.devnull, 'r+b')
+    kwargs = {}
+    if hasattr(os, 'setsid'):
+        kwargs['preexec_fn'] = os.setsid
+    subprocess.Popen(command, env=env, stdin=devnull, stdout=devnull,
+                     stderr=devnull, close_fds=True, **kwargs)
+    deadline = time.time() + START_TIMEOUT
+    while time.time() < deadline:
+        reply = request(args.socket, {"command": "_status"})
+        if reply is not None:
+            return reply["result"]
+        time.sleep(0.05)
+    raise RuntimeError("The daemon did not start")
+
+
+def _parser():
+    parser = argparse.ArgumentParser(
+        prog='hpsdn', description='HP VAN SDN Controller command line tool')
+    parser.add_argument('--controller', default=os.environ.get('SDNCTL'),
+                        help='controller address (SDNCTL)')
+    parser.add_argument('--user', default=os.environ.get('SDNUSER'),
+                        help='user name (SDNUSER)')
+    parser.add_argument('--password', default=os.environ.get('SDNPASS'),
+                        help='password (SDNPASS)')
+    parser.add_argument('--socket', help='daemon socket path '
+                        '(HPSDN_SOCKET)')
+    parser.add_argument('--no-daemon', action='store_true',
+                        help='do not use a running daemon')
+    parser.add_argument('--debug', action='store_true',
+                        help='show tracebacks')
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+    daemon = commands.add_parser('daemon', help='run the daemon')
+    daemon.add_argument('--detach', action='store_true',
+                        help='run in the background')
+    commands.add_parser('daemon-status', help='show the daemon status')
+    commands.add_parser('daemon-stop', help='stop the daemon')
+    for command in COMMANDS:
+        sub = commands.add_parser(command.name, help=command.help)
+        for name, kind in command.params:
+            if name.endswith('?'):
+                sub.add_argument(name[:-1], nargs='?')
+            else:
+                sub.add_argument(name)
+    return parser
+
+
+def _print(value, out):
+    if value is not None:
+        out.write(json.dumps(value, sort_keys=True, indent=4,
+                             separators=(',', ': ')) + '\n')
+
+
+def run(args, out):
+    args.socket = args.socket or default_socket()
+    if args.command == 'daemon-status':
+        reply = request(args.socket, {"command": "_status"})
+        if reply is None:
+            raise RuntimeError("The daemon is not running")
+        return reply["result"]
+    if args.command == 'daemon-stop':
+        if request(args.socket, {"command": "_stop"}) is None:
+            raise RuntimeError("The daemon is not running")
+        return None
+    if not args.controller:
+        raise RuntimeError("No controller given, use --controller or SDNCTL")
+    if args.command == 'daemon':
+        if args.detach:
+            return _start_detached(args)
+        api = connect_api(args.controller, args.user, args.password)
+        api.restclient.auth.get_auth()
+        Daemon(api, args.controller, args.socket).serve_forever()
+        return None
+    command = COMMAND_MAP[args.command]
+    values = [getattr(args, name.rstrip('?')) for name, _ in command.params]
+    call_args = client_args(command, values)
+    if not args.no_daemon:
+        reply = request(args.socket, {"controller": args.controller,
+                                      "user": args.user,
+                                      "command": command.name,
+                                      "args": call_args})
+        if reply is not None and reply.get("error") not in REDIRECT_ERRORS:
+            if "error" in reply:
+                raise RuntimeError("{0}: {1}".format(reply["error"],
+                                                     reply["message"]))
+            return reply["result"]
+    api = connect_api(args.controller, args.user, args.password)
+    return execute(api, command, call_args)
+
+
+def main(argv=None, out=None):
+    out = out or sys.stdout
+    parser = _parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_usage(sys.stderr)
+        return 2
+    try:
+        _print(run(args, out), out)
+    except Exception as e:
+        if args.debug:
+            raise
+        sys.stderr.write('Error: {0}: {1}\n'.format(type(e).__name__, e))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
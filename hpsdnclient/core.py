@@ -27,8 +27,10 @@ import time
 
 import requests
 
-from hpsdnclient.api import ApiBase
+from hpsdnclient.apibase import ApiBase
 from hpsdnclient.error import raise_errors
+from hpsdnclient.transfer import DEFAULT_CHUNK_SIZE, UploadStream
+from hpsdnclient.utils import controller_url, API_ROOT
 
 
 class CoreMixin(ApiBase):
@@ -47,8 +49,7 @@ class CoreMixin(ApiBase):
     """
     def __init__(self, controller, auth):
         super(CoreMixin, self).__init__(controller, auth)
-        self._core_base_url = ("https://{0}:8443".format(self.controller) +
-                               "/sdn/v2.0/")
+        self._core_base_url = controller_url(self.controller) + API_ROOT
 
     def get_support(self, id=None, fields=None):
         """ Generates a support report
@@ -150,15 +151,28 @@ class CoreMixin(ApiBase):
         url = self._core_base_url + 'apps'
         return self.restclient.get(url)
 
-    def upload_app(self, app):
+    def upload_app(self, app, progress=None, checksum=None,
+                   chunk_size=DEFAULT_CHUNK_SIZE):
         """ Upload an application to the controller
 
+        The file is streamed from disk, so memory use is bounded by
+        ``chunk_size`` whatever the size of the application.
+
         :param filename app: The path to the file to be uploaded
+        :param progress: Called as ``progress(sent, total)`` as the upload
+            proceeds (Optional)
+        :param str checksum: A hashlib algorithm used to compute a checksum
+            of the uploaded data, e.g "sha256" (Optional)
+        :param int chunk_size: Number of bytes read and sent at a time
+        :return: The size, duration, throughput and checksum of the upload
+        :rtype: hpsdnclient.transfer.TransferStats
 
         """
         url = self._core_base_url + 'apps'
-        r = self.restclient.post(url, app, is_file=True)
+        stream = UploadStream(app, chunk_size, progress, checksum)
+        r = self.restclient.post(url, stream, is_file=True)
         raise_errors(r)
+        return stream.stats
 
     def get_app_info(self, app):
         """ Get information about the specified application
@@ -203,18 +217,62 @@ class CoreMixin(ApiBase):
         url = self._core_base_url + 'apps/{}/health'.format(app)
         return self.restclient.get(url)
 
-    def download_logs(self):
+    def get_team(self):
+        """ Get the team configuration
+
+        :return: The team
+        :rtype: hpsdnclient.datatypes.Team
+
+        """
+        url = self._core_base_url + 'team'
+        return self.restclient.get(url)
+
+    def get_systems(self):
+        """ Get the systems (controllers) that are part of the team and
+        their roles
+
+        :return: A list of systems
+        :rtype: list
+
+        """
+        url = self._core_base_url + 'systems'
+        return self.restclient.get(url)
+
+    def get_regions(self):
+        """ Get the regions of the team. A region lists the master and
+        slave controllers for a set of devices
+
+        :return: A list of regions
+        :rtype: list
+
+        """
+        url = self._core_base_url + 'regions'
+        return self.restclient.get(url)
+
+    def download_logs(self, path=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                      parallel=1, resume=True, progress=None):
         """ Downloads log files for the controller team.
         The logs are a zip file containing an inner zip file of logs for each
-        team member.This is saved to the path where the application is being
-        run.
-
+        team member. By default this is saved to the path where the
+        application is being run.
+
+        Interrupted downloads are resumed with Range requests where the
+        controller supports them.
+
+        :param str path: The file, or directory, to save the logs to
+            (Optional)
+        :param int chunk_size: Number of bytes read and written at a time
+        :param int parallel: Number of byte ranges to fetch at once
+        :param bool resume: Resume interrupted downloads
+        :param progress: Called as ``progress(received, total)`` as the
+            download proceeds (Optional)
         :return: File path
         :rtype: String
 
         """
         url = self._core_base_url + 'logs'
-        return self.restclient.get(url, is_file=True)
+        return self.restclient.download(url, path, chunk_size, parallel,
+                                        resume, progress)
 
     def login(self, user, password):
         """ Login to the controller.
@@ -227,7 +285,7 @@ class CoreMixin(ApiBase):
         :rtype: dict
 
         """
-        url = 'https://{0}:8443/sdn/v2.0/auth'.format(self.controller)
+        url = self._core_base_url + 'auth'
         data = {'login': {'user': user, 'password': password}}
         r = requests.post(url, data=json.dumps(data), verify=False, timeout=1)
         t = {}
@@ -245,7 +303,7 @@ class CoreMixin(ApiBase):
         :param str token: X-Auth-Token of the user to logout
 
         """
-        url = 'https://{0}:8443/sdn/v2.0/auth'.format(self.controller)
+        url = self._core_base_url + 'auth'
         headers = {"X-Auth-Token": token}
         r = requests.delete(url, headers=headers, verify=False, timeout=1)
         r.raise_for_status()
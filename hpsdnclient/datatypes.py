@@ -18,6 +18,8 @@
 
 import json
 
+from hpsdnclient.utils import Dpid
+
 ETHERNET = ['ipv4', 'arp', 'rarp', 'snmp', 'ipv6',
             'mpls_u', 'mpls_m', 'lldp', 'pbb', 'bddp']
 
@@ -164,6 +166,9 @@ ENUMS = [ETHERNET,
          OPERATION
          ]
 
+# The types whose actions may be decoded as ActionLists
+ACTION_LIST_TYPES = ('Flow', 'Group')
+
 METHODS = ["factory", "to_json_string", "to_dict"]
 KEYWORDS = ["self"]
 
@@ -181,7 +186,11 @@ JSON_MAP = {'datapath': 'Datapath',
             'license': 'License',
             'support_report': None,
             'observation': 'Observation',
-            'nexthop': 'NextHop'
+            'nexthop': 'NextHop',
+            'system': 'System',
+            'team': 'Team',
+            'region': 'Region',
+            'controllers': 'DatapathControllers'
             }
 
 PLURALS = {'datapaths': JSON_MAP['datapath'],
@@ -201,16 +210,21 @@ PLURALS = {'datapaths': JSON_MAP['datapath'],
            'apps': JSON_MAP['app'],
            'licenses': JSON_MAP['license'],
            'paths': JSON_MAP['path'],
-           'nexthops': JSON_MAP['nexthop']
+           'nexthops': JSON_MAP['nexthop'],
+           'systems': JSON_MAP['system'],
+           'regions': JSON_MAP['region']
            }
 
 CLASS_MAP = {'ControllerStats': {'lost': 'Counter',
                                  'packet_in': 'Counter',
                                  'packet_out': 'Counter'},
              'Team': {'systems': 'TeamSystem'},
+             'Region': {'master': 'ControllerNode',
+                        'slaves': 'ControllerNode'},
              'Flow': {'match': 'Match',
                       'actions': 'Action',
                       'instructions': 'Instruction'},
+             'Group': {'buckets': 'Bucket'},
              'Stats': {'port_stats': 'PortStats',
                        'group_stats': 'GroupStats',
                        'meter_stats': 'MeterStats'},
@@ -235,13 +249,15 @@ class JsonObjectFactory(object):
 
     @staticmethod
     def create(id, data):
-        for key in data:
-            if key in KEYWORDS:
-                new_key = key + "_"
-                data[new_key] = data.pop(key)
-        if id not in JsonObjectFactory.factories:
-            JsonObjectFactory.add_factory(id, eval(id))
-        return JsonObjectFactory.factories[id].factory(data)
+        for key in KEYWORDS:
+            if key in data:
+                data[key + "_"] = data.pop(key)
+        try:
+            factory = JsonObjectFactory.factories[id]
+        except KeyError:
+            factory = globals()[id]
+            JsonObjectFactory.add_factory(id, factory)
+        return factory.factory(data)
 
 
 class JsonObject(object):
@@ -272,8 +288,10 @@ class JsonObject(object):
                         else:
                             tmp.append(list_item)
                     data[attr.__str__()] = tmp
-                elif isinstance(value, JsonObject):
+                elif isinstance(value, (JsonObject, ActionList)):
                     data[attr.__str__()] = value.to_dict()
+                elif isinstance(value, Dpid):
+                    data[attr.__str__()] = str(value)
                 elif type(value):
                     data[attr.__str__()] = value
         return data
@@ -282,6 +300,7 @@ class JsonObject(object):
     def factory(cls, data):
         try:
             cm = CLASS_MAP[cls.__name__]
+            data = dict(data)
             for key in data:
                 if key in cm and isinstance(data[key], list):
                     l = []
@@ -404,51 +423,48 @@ class Flow(JsonObject):
     @classmethod
     def factory(cls, data):
         """ Override factory in the base class to create a single instance of
-        the Match class for the 'match' key. We do this as each match field
-        may only exist once. Actions are trickier as keys here are not unique.
-        When multiple values are present, """
-        try:
-            cm = CLASS_MAP[cls.__name__]
-            for key in data:
-                if key == 'match':
-                    new_match = {}
-                    for d in data[key]:
-                        for k in d:
-                            new_match[k] = d[k]
-                    data[key] = JsonObjectFactory.create('Match', new_match)
-                elif key == 'actions':
-                    new_action = {}
-                    keys = []
-                    for d in data[key]:
-                        keys.extend([(k, v) for k, v in d.items()])
-                    num_keys = range(len(keys))
-
-                    duplicates = {}
-
-                    for i in num_keys:
-                        key_name = keys[i][0]
-                        if key_name in duplicates:
-                            duplicates[key_name].append(i)
-                        else:
-                            duplicates[key_name] = [i]
-
-                    for k, v in duplicates.items():
-                        if len(v) > 1:
-                            new_action[k] = [keys[i][1] for i in v]
-                        else:
-                            new_action[k] = keys[i][1]
-
-                    data[key] = JsonObjectFactory.create('Action', new_action)
-                elif key in cm and isinstance(data[key], list):
-                    l = []
-                    for d in data[key]:
-                        l.append(JsonObjectFactory.create(cm[key], d))
-                    data[key] = l
-                elif key in cm:
-                    data[key] = JsonObjectFactory.create(cm[key], data[key])
-        except KeyError:
-            pass
-        return cls(**data)
+        the Match class for the 'match' key and of the Action class for the
+        'actions' key. The controller sends both as lists of single entry
+        dicts. Each match field may only exist once, but action keys are not
+        unique: an action that appears more than once is kept as a list of
+        its values, in order. The data is not modified. """
+        kwargs = dict(data)
+        match = kwargs.get('match')
+        if isinstance(match, list):
+            fields = {}
+            for field in match:
+                fields.update(field)
+            kwargs['match'] = Match(**fields)
+        elif isinstance(match, dict):
+            kwargs['match'] = Match(**match)
+        actions = kwargs.get('actions')
+        if isinstance(actions, list):
+            kwargs['actions'] = Action(**_merge_actions(actions))
+        elif isinstance(actions, dict):
+            kwargs['actions'] = Action(**actions)
+        instructions = kwargs.get('instructions')
+        if isinstance(instructions, list):
+            kwargs['instructions'] = [Instruction(**i)
+                                      if isinstance(i, dict) else i
+                                      for i in instructions]
+        return cls(**kwargs)
+
+
+def _merge_actions(actions):
+    """ Merges a list of single entry action dicts into one dict. The values
+    of a key that appears more than once are collected in a list """
+    merged = {}
+    repeated = set()
+    for action in actions:
+        for key, value in action.items():
+            if key not in merged:
+                merged[key] = value
+            elif key in repeated:
+                merged[key].append(value)
+            else:
+                merged[key] = [merged[key], value]
+                repeated.add(key)
+    return merged
 
 
 class Match(JsonObject):
@@ -475,7 +491,7 @@ class Match(JsonObject):
         self.ip_dscp = kwargs.get('ip_dscp', None)
         self.ip_ecn = kwargs.get('ip_ecn', None)
         self.icmpv4_code = kwargs.get('icmpv4_code', None)
-        self.icmpv6_code = kwargs.get('icmpv6_type', None)
+        self.icmpv6_code = kwargs.get('icmpv6_code', None)
         self.mpls_tc = kwargs.get('mpls_tc', None)
         self.mpls_bos = kwargs.get('mpls_bos', None)
         self.arp_op = kwargs.get('arp_op', None)
@@ -551,6 +567,10 @@ class Action(JsonObject):
             Overrides the parent method as all members variables of
             this class are strings
 
+            Actions are grouped by type, with outputs last. Repeated
+            actions of one type keep their order, but the order across
+            types is not kept; use :class:`ActionList` for that.
+
         """
         data = []
         attributes = [attr for attr in dir(self)
@@ -559,7 +579,7 @@ class Action(JsonObject):
         for attr in attributes:
             if attr == "output":
                 output = getattr(self, attr)
-                if type(output) == list:
+                if isinstance(output, list):
                     for port in output:
                         tmp = {}
                         tmp[attr.__str__()] = port
@@ -569,13 +589,110 @@ class Action(JsonObject):
                     tmp[attr.__str__()] = getattr(self, attr)
                     data.append(tmp)
             else:
-                if getattr(self, attr):
+                value = getattr(self, attr)
+                if isinstance(value, list):
+                    # An action that appears more than once
+                    for item in reversed(value):
+                        data.insert(0, {attr.__str__(): item})
+                elif value:
                     tmp = {}
-                    tmp[attr.__str__()] = getattr(self, attr)
+                    tmp[attr.__str__()] = value
                     data.insert(0, tmp)
         return data
 
 
+def _freeze(value):
+    """ Returns a hashable equivalent of an action value """
+    if isinstance(value, dict):
+        return frozenset((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class ActionList(tuple):
+    """ ActionList
+
+        An ordered list of actions, kept as ``(name, value)`` pairs in the
+        order and number the controller sends them. It is a compact,
+        hashable alternative to :class:`Action` for the actions of a Flow,
+        Bucket or Instruction, and converts to and from the wire format
+        without reflection. ::
+
+            actions = ActionList([("set_field", {"vlan_vid": 10}),
+                                  ("output", 1), ("output", 2)])
+            flow = Flow(priority=100, match=Match(in_port=3),
+                        actions=actions)
+
+        Pass ``action_lists=True`` to the Api to decode the actions of
+        flows, buckets and instructions as ActionLists.
+
+        :param actions: (name, value) pairs, single entry dicts as sent by
+            the controller, or an :class:`Action`
+
+    """
+    __slots__ = ()
+
+    def __new__(cls, actions=()):
+        if isinstance(actions, Action):
+            actions = actions.to_dict()
+        pairs = []
+        for action in actions:
+            if isinstance(action, dict):
+                pairs.extend(action.items())
+            elif isinstance(action, tuple) and len(action) == 2:
+                pairs.append(action)
+            else:
+                raise TypeError("Expected a (name, value) pair or a dict, "
+                                "received {0!r}".format(action))
+        return tuple.__new__(cls, pairs)
+
+    @classmethod
+    def from_dicts(cls, actions):
+        """ Create an ActionList from a list of single entry dicts, as sent
+        by the controller """
+        return tuple.__new__(cls, [pair for action in actions
+                                   for pair in action.items()])
+
+    def to_dict(self):
+        """ Returns the actions as a list of single entry dicts """
+        return [{name: value} for name, value in self]
+
+    def values(self, name):
+        """ Returns the values of the actions called name, in order """
+        return [value for key, value in self if key == name]
+
+    def __hash__(self):
+        try:
+            return tuple.__hash__(self)
+        except TypeError:
+            # set_field and other actions with dict or list values
+            return hash(tuple((name, _freeze(value)) for name, value in self))
+
+    def __repr__(self):
+        return 'ActionList({0!r})'.format(list(self))
+
+
+def _to_action_list(item, key):
+    value = item.get(key)
+    if isinstance(value, list):
+        item[key] = ActionList.from_dicts(value)
+
+
+def decode_action_lists(item):
+    """ Replaces the action lists of a decoded flow or group dict, and of its
+    instructions or buckets, with :class:`ActionList` values """
+    _to_action_list(item, 'actions')
+    for instruction in item.get('instructions') or ():
+        if isinstance(instruction, dict):
+            _to_action_list(instruction, 'apply_actions')
+            _to_action_list(instruction, 'write_actions')
+    for bucket in item.get('buckets') or ():
+        if isinstance(bucket, dict):
+            _to_action_list(bucket, 'actions')
+    return item
+
+
 class Instruction(JsonObject,):
     """ Instruction (JsonObject)
 
@@ -1065,6 +1182,8 @@ class System(JsonObject):
         self.uid = kwargs.get("uid", None)
         self.version = kwargs.get("version", None)
         self.role = kwargs.get("role", None)
+        self.ip = kwargs.get("ip", None)
+        self.name = kwargs.get("name", None)
         self.core_data_version = kwargs.get("core_data_version", None)
         self.core_data_version_timestamp = kwargs.get(
             "core_data_version_timestamp", None
@@ -1114,8 +1233,8 @@ class TeamSystem(JsonObject):
 
     def __init__(self, **kwargs):
         self.name = kwargs.get("name", None)
-        self.ip = kwargs.get("name", None)
-        self.priority = kwargs.get("name", None)
+        self.ip = kwargs.get("ip", None)
+        self.priority = kwargs.get("priority", None)
 
 
 class Metric(JsonObject):
@@ -1396,5 +1515,3 @@ class Observation(JsonObject):
         self.type = kwargs.get("type", None)
         self.packet_uid = kwargs.get("packet_uid", None)
         self.status = kwargs.get("status", None)
-
-CLASS_LIST = [s() for s in JsonObject.__subclasses__()]
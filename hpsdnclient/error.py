@@ -115,3 +115,30 @@ class DatatypeError(HpsdnclientError):
         self.expected = expected
         message = "Received: {0} Expected: {1}".format(received, expected)
         super(DatatypeError, self).__init__(message)
+
+
+class CircuitOpen(HpsdnclientError):
+    def __init__(self, name, retry_after=0.0):
+        self.name = name
+        self.retry_after = retry_after
+        message = ("The circuit for {0} is open. " +
+                   "Retry in {1:.1f} seconds").format(name, retry_after)
+        super(CircuitOpen, self).__init__(message)
+
+
+class TransferError(HpsdnclientError):
+    def __init__(self, url, message):
+        self.url = url
+        message = "Transfer of {0} failed: {1}".format(url, message)
+        super(TransferError, self).__init__(message)
+
+
+class TransactionError(HpsdnclientError):
+    def __init__(self, result):
+        self.result = result
+        failed = result.failed()
+        message = "Transaction failed on {0}: {1}. State: {2}".format(
+            failed.dpid, failed.error,
+            ", ".join("{0} {1}".format(d.dpid, d.state)
+                      for d in result.datapaths.values()))
+        super(TransactionError, self).__init__(message)
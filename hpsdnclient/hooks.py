@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Hooks called around every request made by the RestClient """
+
+import re
+import threading
+import time
+# Python3 compatibility
+try:
+    from urllib.parse import urlparse
+except ImportError:
+    from urlparse import urlparse
+
+from hpsdnclient.utils import API_ROOT
+
+# The segment after one of these collections is the ID of an item in it
+ID_SEGMENTS = {
+    'apps': '{app}',
+    'clusters': '{cluster}',
+    'datapaths': '{dpid}',
+    'groups': '{group}',
+    'licenses': '{license}',
+    'meters': '{meter}',
+    'packets': '{packet}',
+    'ports': '{port}',
+    'regions': '{region}',
+    'systems': '{system}',
+    'users': '{user}',
+}
+
+# Resources that look like items of a collection
+FIXED_SEGMENTS = frozenset(['installid'])
+
+ID_RE = re.compile(r'^(?:\d+|(?:[0-9a-fA-F]{2}(?::|%3A)){5,7}[0-9a-fA-F]{2}|'
+                   r'[0-9a-fA-F-]{32,36}|\d+\.\d+\.\d+\.\d+)$')
+
+_TEMPLATE_CACHE_SIZE = 1024
+
+# The phases of a request timed in RequestInfo.phases
+PHASES = ('connect', 'wait', 'transfer', 'decode', 'materialize')
+
+
+class RequestInfo(object):
+    """ What is known about a request, passed to each :class:`Hook`
+
+    :ivar str method: The HTTP method
+    :ivar str url: The URL requested
+    :ivar str template: The URL path with IDs replaced, e.g.
+        ``of/datapaths/{dpid}/flows``
+    :ivar int status: The HTTP status code, or None if no response was
+        received
+    :ivar int bytes_out: Size of the request body, as sent
+    :ivar int bytes_in: Size of the response body as received, before any
+        gzip decoding, or None if unknown
+    :ivar float decode_time: Seconds spent decoding the response
+    :ivar dict phases: Seconds spent in each phase of the last attempt:
+        ``connect`` (only known when using
+        :func:`~hpsdnclient.timing.timing_session`), ``wait`` for the
+        response headers, body ``transfer``, JSON ``decode`` and
+        ``materialize`` for building JsonObjects
+    :ivar str profile: The profile of the decode phase, if the client was
+        created with ``profile="cprofile"`` or ``profile="tracemalloc"``
+    :ivar float latency: Seconds from the start of the request until the
+        result was returned or the error was raised
+    :ivar error: The exception raised, if any. :meth:`to_dict` gives
+        its type name and message instead
+
+    """
+    def __init__(self, method, url, template, bytes_out=0):
+        self.method = method
+        self.url = url
+        self.template = template
+        self.status = None
+        self.bytes_out = bytes_out
+        self.bytes_in = None
+        self.decode_time = None
+        self.phases = {}
+        self.profile = None
+        self.latency = None
+        self.error = None
+        self.start = time.time()
+
+    def to_dict(self):
+        return {"method": self.method,
+                "url": self.url,
+                "template": self.template,
+                "status": self.status,
+                "bytes_out": self.bytes_out,
+                "bytes_in": self.bytes_in,
+                "decode_time": self.decode_time,
+                "phases": dict(self.phases),
+                "latency": self.latency,
+                "error": (type(self.error).__name__
+                          if self.error is not None else None),
+                "error_message": (str(self.error)
+                                  if self.error is not None else None)}
+
+
+class Hook(object):
+    """ Base class for request hooks
+
+    Pass hooks to the :class:`~hpsdnclient.api.Api` with the ``hooks``
+    keyword argument. Hooks are called in the thread making the request
+    and should return quickly. Exceptions raised by hooks are not caught.
+
+    """
+    def before_request(self, info):
+        """ Called before the request is sent
+
+        :param RequestInfo info: The request
+
+        """
+        pass
+
+    def after_request(self, info):
+        """ Called once the request has completed or failed
+
+        :param RequestInfo info: The request and its outcome
+
+        """
+        pass
+
+
+class TemplateCache(object):
+    """ Converts URLs to templates, remembering recent results """
+    def __init__(self, size=_TEMPLATE_CACHE_SIZE):
+        self.size = size
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, url):
+        template = self._cache.get(url)
+        if template is None:
+            template = url_template(url)
+            with self._lock:
+                if len(self._cache) >= self.size:
+                    self._cache.clear()
+                self._cache[url] = template
+        return template
+
+
+def url_template(url):
+    """ Returns the path of url relative to the API root, without the
+    query string and with the IDs of items replaced by placeholders
+
+    >>> url_template('https://10.0.0.1:8443/sdn/v2.0/of/datapaths/'
+    ...              '00%3A00%3A00%3A00%3A00%3A00%3A00%3A01/flows')
+    'of/datapaths/{dpid}/flows'
+
+    :param str url: The URL
+    :rtype: str
+
+    """
+    path = urlparse(url).path
+    if path.startswith(API_ROOT):
+        path = path[len(API_ROOT):]
+    segments = path.strip('/').split('/')
+    for i in range(1, len(segments)):
+        segment = segments[i]
+        if segment in FIXED_SEGMENTS:
+            continue
+        # segments[i - 1] has already been replaced if it was an ID
+        placeholder = ID_SEGMENTS.get(segments[i - 1])
+        if placeholder is not None:
+            segments[i] = placeholder
+        elif ID_RE.match(segment):
+            segments[i] = '{id}'
+    return '/'.join(segments) or '/'
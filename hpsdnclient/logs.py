@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Inspect the log archives downloaded from a controller team
+
+The archive returned by :meth:`~hpsdnclient.core.CoreMixin.download_logs`
+contains one zip file per team member. :class:`LogArchive` reads the
+member archives and their log files as streams, without extracting them
+to disk.
+
+"""
+
+import collections
+import fnmatch
+import io
+import os
+import re
+import struct
+import zipfile
+
+from hpsdnclient.utils import run_parallel
+
+# The fixed size part of a zip local file header
+_LOCAL_HEADER = struct.Struct('<4s2B4HL2L2H')
+_LOCAL_HEADER_SIGNATURE = b'PK\x03\x04'
+
+READ_BUFFER_SIZE = 1024 * 1024
+
+LogMatch = collections.namedtuple('LogMatch',
+                                  ['member', 'file', 'lineno', 'line'])
+
+
+def _compile(pattern):
+    if hasattr(pattern, 'search'):
+        return pattern
+    return re.compile(pattern)
+
+
+class _Window(io.RawIOBase):
+    """ A read only view of ``size`` bytes of a file from ``offset`` """
+    def __init__(self, path, offset, size):
+        super(_Window, self).__init__()
+        self._file = open(path, 'rb')
+        self._offset = offset
+        self._size = size
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, pos, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            pos += self._pos
+        elif whence == os.SEEK_END:
+            pos += self._size
+        self._pos = max(0, min(pos, self._size))
+        return self._pos
+
+    def readinto(self, b):
+        size = min(len(b), self._size - self._pos)
+        if size <= 0:
+            return 0
+        self._file.seek(self._offset + self._pos)
+        data = self._file.read(size)
+        b[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+    def close(self):
+        self._file.close()
+        super(_Window, self).close()
+
+
+def _data_offset(path, info):
+    """ Returns the offset of a member's data in the zip file at path """
+    with open(path, 'rb') as f:
+        f.seek(info.header_offset)
+        header = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+    if header[0] != _LOCAL_HEADER_SIGNATURE:
+        raise zipfile.BadZipfile("Bad local header for " + info.filename)
+    name_length, extra_length = header[-2:]
+    return (info.header_offset + _LOCAL_HEADER.size + name_length +
+            extra_length)
+
+
+class LogArchive(object):
+    """ A log archive containing one zip file per team member
+
+    Member archives that are stored uncompressed in the outer archive are
+    read in place. Compressed ones are decompressed into memory, one
+    member at a time, as zip files cannot be read without seeking.
+
+    :param str path: The path of the archive
+    :param str encoding: The encoding of the log files
+
+    """
+    def __init__(self, path, encoding='utf-8'):
+        self.path = path
+        self.encoding = encoding
+        with zipfile.ZipFile(path) as outer:
+            self._infos = dict((i.filename, i) for i in outer.infolist()
+                               if i.filename.lower().endswith('.zip'))
+
+    def members(self):
+        """ Returns the names of the member archives
+
+        :rtype: list
+
+        """
+        return sorted(self._infos)
+
+    def open_member(self, member):
+        """ Open a member archive
+
+        :param str member: The name of the member archive
+        :return: The member archive, which should be closed after use
+        :rtype: zipfile.ZipFile
+
+        """
+        info = self._infos[member]
+        if info.compress_type == zipfile.ZIP_STORED:
+            stream = io.BufferedReader(
+                _Window(self.path, _data_offset(self.path, info),
+                        info.file_size), READ_BUFFER_SIZE)
+        else:
+            with zipfile.ZipFile(self.path) as outer:
+                stream = io.BytesIO(outer.read(info))
+        return zipfile.ZipFile(stream)
+
+    def log_files(self, member, pattern='*'):
+        """ Returns the names of the log files in a member archive
+
+        :param str member: The name of the member archive
+        :param str pattern: Only return file names matching this glob
+        :rtype: list
+
+        """
+        archive = self.open_member(member)
+        try:
+            return [n for n in archive.namelist()
+                    if not n.endswith('/') and fnmatch.fnmatch(n, pattern)]
+        finally:
+            archive.close()
+
+    def _lines(self, archive, name):
+        with archive.open(name) as f:
+            for line in f:
+                yield line.decode(self.encoding, 'replace').rstrip('\r\n')
+
+    def lines(self, member, name):
+        """ Iterate over the lines of a log file
+
+        :param str member: The name of the member archive
+        :param str name: The name of the log file in the member archive
+        :rtype: generator of str
+
+        """
+        archive = self.open_member(member)
+        try:
+            for line in self._lines(archive, name):
+                yield line
+        finally:
+            archive.close()
+
+    def tail(self, member, name, count=100):
+        """ Returns the last ``count`` lines of a log file
+
+        :rtype: list
+
+        """
+        return list(collections.deque(self.lines(member, name), count))
+
+    def search_member(self, member, pattern, files='*', max_matches=None):
+        """ Search the log files of one member archive
+
+        :param str member: The name of the member archive
+        :param pattern: A regular expression, as a string or compiled
+        :param str files: Only search log files matching this glob
+        :param int max_matches: Stop after this many matches (Optional)
+        :return: The matching lines
+        :rtype: list of LogMatch
+
+        """
+        regex = _compile(pattern)
+        matches = []
+        archive = self.open_member(member)
+        try:
+            for name in archive.namelist():
+                if name.endswith('/') or not fnmatch.fnmatch(name, files):
+                    continue
+                for lineno, line in enumerate(self._lines(archive, name), 1):
+                    if regex.search(line):
+                        matches.append(LogMatch(member, name, lineno, line))
+                        if max_matches and len(matches) >= max_matches:
+                            return matches
+        finally:
+            archive.close()
+        return matches
+
+    def search(self, pattern, members=None, files='*', max_matches=None,
+               workers=None):
+        """ Search the log files of every member archive in parallel
+
+        Each member archive is searched by its own thread, up to
+        ``workers`` at a time.
+
+        :param pattern: A regular expression, as a string or compiled
+        :param list members: The member archives to search, all by default
+        :param str files: Only search log files matching this glob
+        :param int max_matches: Matches returned per member (Optional)
+        :param int workers: Number of members searched at once. Defaults to
+            the number of members
+        :return: The matching lines, ordered by member, file and line
+        :rtype: list of LogMatch
+
+        """
+        regex = _compile(pattern)
+        order = list(members if members is not None else self.members())
+        results = {}
+
+        def search(member):
+            results[member] = self.search_member(member, regex, files,
+                                                 max_matches)
+
+        errors = run_parallel([lambda m=m: search(m) for m in order],
+                              workers or len(order), stop_on_error=True)
+        if errors:
+            raise errors[0]
+        return [m for member in order for m in results[member]]
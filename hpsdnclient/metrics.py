@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Latency histograms per endpoint, collected with a request hook """
+
+import math
+import threading
+
+from hpsdnclient.hooks import Hook, PHASES
+
+# Upper bounds, in seconds, of the buckets exported to Prometheus
+PROMETHEUS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                      0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram(object):
+    """ A log-linear histogram in the style of HdrHistogram
+
+    Values are recorded as integer multiples of ``unit`` seconds. Values
+    below ``2 ** bits`` units are counted exactly; larger values fall in
+    buckets no wider than ``1 / 2 ** (bits - 1)`` of their value, so with
+    the default of 7 bits quantiles are accurate to better than 2%.
+    Memory grows with the number of distinct buckets, not the number of
+    values recorded.
+
+    :param float unit: The resolution in seconds, 1 microsecond by default
+    :param int bits: The number of significant bits kept per value
+
+    """
+    def __init__(self, unit=1e-6, bits=7):
+        self.unit = unit
+        self.bits = bits
+        self.counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        exact = 1 << self.bits
+        if value < exact:
+            return value
+        shift = value.bit_length() - self.bits
+        half = exact >> 1
+        return exact + (shift - 1) * half + ((value >> shift) - half)
+
+    def _bounds(self, index):
+        """ Returns the lowest and highest values counted by a bucket """
+        exact = 1 << self.bits
+        if index < exact:
+            return index, index
+        half = exact >> 1
+        shift, top = divmod(index - exact, half)
+        shift += 1
+        low = (top + half) << shift
+        return low, low + (1 << shift) - 1
+
+    def record(self, seconds):
+        """ Record a duration """
+        value = max(0, int(seconds / self.unit))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """ Returns the duration at quantile q, e.g. 0.99, in seconds
+
+        The highest value of the bucket the quantile falls in is returned,
+        or None if nothing has been recorded.
+
+        """
+        if not self.count:
+            return None
+        rank = max(1, int(math.ceil(q * self.count)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._bounds(index)[1] * self.unit, self.max)
+        return self.max
+
+    def cumulative(self, bounds):
+        """ Returns the number of values less than or equal to each bound """
+        result = [0] * len(bounds)
+        for index, count in self.counts.items():
+            high = self._bounds(index)[1] * self.unit
+            for i, bound in enumerate(bounds):
+                if high <= bound:
+                    result[i] += count
+        return result
+
+    def to_dict(self):
+        return {"count": self.count,
+                "sum": self.total,
+                "min": self.min,
+                "max": self.max,
+                "mean": self.total / self.count if self.count else None,
+                "p50": self.quantile(0.5),
+                "p90": self.quantile(0.9),
+                "p99": self.quantile(0.99),
+                "p999": self.quantile(0.999)}
+
+
+class EndpointStats(object):
+    """ The requests made to one endpoint template with one method """
+    def __init__(self, **histogram_kwargs):
+        self.latency = Histogram(**histogram_kwargs)
+        self.decode = Histogram(**histogram_kwargs)
+        self.phases = dict((p, Histogram(**histogram_kwargs))
+                           for p in PHASES)
+        self.statuses = {}
+        self.errors = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def record(self, info):
+        self.latency.record(info.latency)
+        if info.decode_time is not None:
+            self.decode.record(info.decode_time)
+        for phase, seconds in info.phases.items():
+            if seconds is not None and phase in self.phases:
+                self.phases[phase].record(seconds)
+        status = info.status if info.status is not None else 'error'
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if info.error is not None:
+            self.errors += 1
+        self.bytes_in += info.bytes_in or 0
+        self.bytes_out += info.bytes_out or 0
+
+    def to_dict(self):
+        return {"latency": self.latency.to_dict(),
+                "decode": self.decode.to_dict(),
+                "phases": dict((p, h.to_dict())
+                               for p, h in self.phases.items() if h.count),
+                "statuses": dict(self.statuses),
+                "errors": self.errors,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out}
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _histogram_lines(name, labels, histogram, buckets):
+    counts = histogram.cumulative(buckets)
+    lines = ['{0}_bucket{{{1},le="{2}"}} {3}'.format(name, labels, bound, c)
+             for bound, c in zip(buckets, counts)]
+    lines.append('{0}_bucket{{{1},le="+Inf"}} {2}'.format(
+        name, labels, histogram.count))
+    lines.append('{0}_sum{{{1}}} {2}'.format(name, labels, histogram.total))
+    lines.append('{0}_count{{{1}}} {2}'.format(name, labels,
+                                               histogram.count))
+    return lines
+
+
+class MetricsCollector(Hook):
+    """ Keeps latency histograms for each method and endpoint template
+
+    Keyword arguments are passed to each :class:`Histogram`. ::
+
+        metrics = MetricsCollector()
+        api = Api('10.0.0.1', auth, hooks=[metrics])
+        ...
+        print(metrics.to_prometheus())
+
+    """
+    def __init__(self, prefix='hpsdnclient', **histogram_kwargs):
+        self.prefix = prefix
+        self.histogram_kwargs = histogram_kwargs
+        self.endpoints = {}
+        self._lock = threading.Lock()
+
+    def after_request(self, info):
+        key = (info.method, info.template)
+        with self._lock:
+            stats = self.endpoints.get(key)
+            if stats is None:
+                stats = EndpointStats(**self.histogram_kwargs)
+                self.endpoints[key] = stats
+            stats.record(info)
+
+    def reset(self):
+        with self._lock:
+            self.endpoints = {}
+
+    def to_dict(self):
+        """ Returns the statistics keyed by ``"METHOD template"`` """
+        with self._lock:
+            return dict(("{0} {1}".format(method, template), s.to_dict())
+                        for (method, template), s in self.endpoints.items())
+
+    def to_prometheus(self, buckets=PROMETHEUS_BUCKETS):
+        """ Returns the statistics in the Prometheus text format
+
+        :param buckets: Upper bounds, in seconds, of the exported buckets
+        :rtype: str
+
+        """
+        duration = self.prefix + '_request_duration_seconds'
+        phase = self.prefix + '_request_phase_seconds'
+        total = self.prefix + '_requests_total'
+        lines = ['# HELP {0} Request latency by endpoint'.format(duration),
+                 '# TYPE {0} histogram'.format(duration)]
+        phases = ['# HELP {0} Time spent in each phase of a request'.format(
+                  phase), '# TYPE {0} histogram'.format(phase)]
+        requests = ['# HELP {0} Requests by endpoint and status'.format(
+                    total), '# TYPE {0} counter'.format(total)]
+        with self._lock:
+            for (method, template), stats in sorted(self.endpoints.items()):
+                labels = 'method="{0}",endpoint="{1}"'.format(
+                    _label(method), _label(template))
+                lines.extend(_histogram_lines(duration, labels,
+                                              stats.latency, buckets))
+                for name in PHASES:
+                    if stats.phases[name].count:
+                        phases.extend(_histogram_lines(
+                            phase, labels + ',phase="{0}"'.format(name),
+                            stats.phases[name], buckets))
+                for status, count in sorted(stats.statuses.items(),
+                                            key=lambda s: str(s[0])):
+                    requests.append('{0}{{{1},status="{2}"}} {3}'.format(
+                        total, labels, status, count))
+        return '\n'.join(lines + phases + requests) + '\n'
@@ -15,11 +15,11 @@
 #   limitations under the License.
 
 import json
-import urllib
 
-from hpsdnclient.api import ApiBase
+from hpsdnclient.apibase import ApiBase
 from hpsdnclient.error import raise_errors
 from hpsdnclient.datatypes import LldpProperties
+from hpsdnclient.utils import controller_url, quote_dpid, API_ROOT
 
 
 class NetMixin(ApiBase):
@@ -34,13 +34,15 @@ class NetMixin(ApiBase):
     - Path Planner
     - Path Diagnostics Service
 
+    Datapath IDs may be given as strings such as 00:00:00:00:00:00:00:01,
+    as integers or as :class:`~hpsdnclient.utils.Dpid` values.
+
     """
     def __init__(self, controller, auth):
         super(NetMixin, self).__init__(controller, auth)
-        self._net_base_url = ("https://{0}:8443".format(self.controller) +
-                              "/sdn/v2.0/net/")
-        self._diag_base_url = ("https://{0}:8443".format(self.controller) +
-                               "/sdn/v2.0/diag/")
+        base_url = controller_url(self.controller) + API_ROOT
+        self._net_base_url = base_url + 'net/'
+        self._diag_base_url = base_url + 'diag/'
 
     def get_clusters(self):
         """ Gets a list of clusters
@@ -66,29 +68,29 @@ class NetMixin(ApiBase):
     def get_links(self, dpid=None):
         """ Returns a list of all links discovered by the SDN controller
 
-        :param str dpid: Return only the links for the specified DPID
+        :param dpid: Return only the links for the specified DPID
         :return: A list of Links
         :rtype: list
 
         """
         url = self._net_base_url + 'links'
-        if dpid:
-            url = url + '?dpid={0}'.format(urllib.quote(dpid))
+        if dpid is not None:
+            url = url + '?dpid={0}'.format(quote_dpid(dpid))
         return self.restclient.get(url)
 
     def get_forward_path(self, src_dpid, dst_dpid):
         """ Gets the shortest computed path between src_dpid and dst_dpid
 
-        :param str src_dpid: The source DPID
-        :param str dst_dpid: THe destination DPID
+        :param src_dpid: The source DPID
+        :param dst_dpid: THe destination DPID
         :return: The shortest path between the two DPID's
         :rtype: hpsdnclient.datatypes.Path
 
         """
         url = (self._net_base_url +
                'paths/forward' +
-               '?src_dpid={0}&dst_dpid={1}'.format(urllib.quote(src_dpid),
-                                                   urllib.quote(dst_dpid)))
+               '?src_dpid={0}&dst_dpid={1}'.format(quote_dpid(src_dpid),
+                                                   quote_dpid(dst_dpid)))
         return self.restclient.get(url)
 
     def get_arps(self, vid=None, ip=None):
@@ -119,7 +121,7 @@ class NetMixin(ApiBase):
 
         :param str ip: IP address
         :param str vid: VLAN ID
-        :param str dpid: Datapath ID
+        :param dpid: Datapath ID
         :param str port: Port
 
         """
@@ -129,10 +131,10 @@ class NetMixin(ApiBase):
             url += "?vid={0}".format(vid, ip)
         elif vid and ip:
             url += "?vid={0}&ip={1}".format(vid, ip)
-        elif dpid and not port:
-            url += "?dpid={0}".format(urllib.quote(dpid))
-        elif dpid and port:
-            url += "?dpid={0}&port={1}".format(urllib.quote(dpid), port)
+        elif dpid is not None and not port:
+            url += "?dpid={0}".format(quote_dpid(dpid))
+        elif dpid is not None and port:
+            url += "?dpid={0}&port={1}".format(quote_dpid(dpid), port)
 
         return self.restclient.get(url)
 
@@ -290,13 +292,13 @@ class NetMixin(ApiBase):
         """ Show next hop information for packet at a given Datapath ID
 
         :param str packet_uid: The packet UID
-        :param str dpid: The Datapath ID
+        :param dpid: The Datapath ID
         :returns: The next hop
         :rtype: hpsdnclient.datatypes.NextHop
 
         """
         url = self._diag_base_url + 'packets/{}/nexthops'.format(packet_uid)
-        url += '?src_dpid={}'.format(dpid)
+        url += '?src_dpid={0}'.format(quote_dpid(dpid))
         return self.restclient.get(url)
 
     def set_diag_packet_action(self, packet_uid, action):
@@ -15,15 +15,13 @@
 #   limitations under the License.
 
 import json
-# Python3 compatibility
-try:
-    import urllib.parse as urllib
-except ImportError:
-    import urllib
 
-from hpsdnclient.api import ApiBase
+from hpsdnclient.apibase import ApiBase
 import hpsdnclient.datatypes as datatypes
 from hpsdnclient.error import raise_errors, DatatypeError
+from hpsdnclient.template import FlowBatch
+from hpsdnclient.utils import (API_ROOT, BODY_TYPES, controller_url,
+                               quote_dpid)
 
 
 class OfMixin(ApiBase):
@@ -38,11 +36,19 @@ class OfMixin(ApiBase):
     - Path Planner
     - Path Diagnostics Service
 
+    Datapath IDs may be given as strings such as 00:00:00:00:00:00:00:01,
+    as integers or as :class:`~hpsdnclient.utils.Dpid` values.
+
     """
     def __init__(self, controller, restclient):
         super(OfMixin, self).__init__(controller, restclient)
-        self._of_base_url = ("https://{0}:8443".format(self.controller) +
-                             "/sdn/v2.0/of/")
+        self._of_base_url = (controller_url(self.controller) +
+                             API_ROOT + 'of/')
+
+    def _datapath_url(self, dpid):
+        """ Returns the url of a datapath. The quoted dpid is cached by
+        quote_dpid, which bounds the cache """
+        return self._of_base_url + 'datapaths/' + quote_dpid(dpid)
 
     def get_stats(self):
         """List controller statistics for all controllers that are
@@ -57,14 +63,14 @@ class OfMixin(ApiBase):
         """List all port statistics for a given datapath or for a
         given datapath and port number
 
-        :param str dpid: Filter by Datapath ID
+        :param dpid: Filter by Datapath ID
         :param str port_id: Filter by Port ID
         :returns: Statistics for Port
         :rtype: hpsdnclient.datatypes.Stats
 
         """
         url = (self._of_base_url +
-               'stats/ports?dpid={0}'.format(urllib.quote(dpid)))
+               'stats/ports?dpid={0}'.format(quote_dpid(dpid)))
         if port_id:
             url = url + '&port_id={0}'.format(port_id)
         return self.restclient.get(url)
@@ -72,14 +78,14 @@ class OfMixin(ApiBase):
     def get_group_stats(self, dpid, group_id=None):
         """List group statistics
 
-        :param str dpid: Filter by Datapath ID
+        :param dpid: Filter by Datapath ID
         :param group_id: Filter by Group ID
         :return: Group statistics
         :rtype: hpsdnclient.datatypes.Stats
 
         """
         url = (self._of_base_url +
-               'stats/groups?dpid={0}'.format(urllib.quote(dpid)))
+               'stats/groups?dpid={0}'.format(quote_dpid(dpid)))
         if group_id:
             url = url + '&group_id={0}'.format(group_id)
         return self.restclient.get(url)
@@ -87,14 +93,14 @@ class OfMixin(ApiBase):
     def get_meter_stats(self, dpid, meter_id):
         """List meter statistics for
 
-        :param str dpid: The Datapath ID
+        :param dpid: The Datapath ID
         :param str meter_id: The Meter ID
         :return: Meter statistics
         :rtype: hpsdnclient.datatypes.Stats
 
         """
         url = (self._of_base_url +
-               'stats/meters?dpid={0}&meter={1}'.format(urllib.quote(dpid),
+               'stats/meters?dpid={0}&meter={1}'.format(quote_dpid(dpid),
                                                         meter_id))
         return self.restclient.get(url)
 
@@ -111,137 +117,140 @@ class OfMixin(ApiBase):
     def get_datapath_detail(self, dpid):
         """Get detailed information for a datapath.
 
-        :param str dpid: The datapath ID
+        :param dpid: The datapath ID
         :return: Datatpath details
         :rtype: hpsdnclient.datatypes.Datapath
 
         """
-        url = (self._of_base_url + 'datapaths/{0}'.format(urllib.quote(dpid)))
+        url = self._datapath_url(dpid)
+        return self.restclient.get(url)
+
+    def get_datapath_controllers(self, dpid):
+        """Get the master and slave controllers for a datapath.
+
+        :param dpid: The datapath ID
+        :return: The controllers for the datapath
+        :rtype: hpsdnclient.datatypes.DatapathControllers
+
+        """
+        url = self._datapath_url(dpid) + '/controllers'
         return self.restclient.get(url)
 
     def get_meter_features(self, dpid):
         """Get meter features for the provided Datapath ID
 
-        :param str dpid: The Datapath ID
+        :param dpid: The Datapath ID
         :return: Meter Features
         :rtype: hpsdnclient.datatypes.MeterFeatures
 
         """
 
-        url = (self._of_base_url +
-               'datapaths/{0}/features/meter'.format(urllib.quote(dpid)))
+        url = self._datapath_url(dpid) + '/features/meter'
         return self.restclient.get(url)
 
     def get_group_features(self, dpid):
         """Get datapath group features
 
-        :param str dpid: The Datapath ID
+        :param dpid: The Datapath ID
         :return: Group Features
         :rtype: hpsdnclient.datatypes.GroupFeatures
 
         """
-        url = (self._of_base_url +
-               'datapaths/{0}/features/group'.format(urllib.quote(dpid)))
+        url = self._datapath_url(dpid) + '/features/group'
         return self.restclient.get(url)
 
     def get_ports(self, dpid):
         """ Gets a list of ports from the specified DPID
 
-        :param str dpid: The datapath ID
+        :param dpid: The datapath ID
         :return: List of ports
         :rtype: list
 
         """
-        url = (self._of_base_url +
-               'datapaths/{0}/ports'.format(urllib.quote(dpid)))
+        url = self._datapath_url(dpid) + '/ports'
         return self.restclient.get(url)
 
     def get_port_detail(self, dpid, port_id):
         """ Gets detailed port information for the specified port
 
-        :param str dpid: The datapath ID
+        :param dpid: The datapath ID
         :param str port_id: The port ID
         :return: Port details
         :rtype: hpsdnclient.datatypes.Port
 
         """
-        url = (self._of_base_url +
-               'datapaths/{0}/ports/{1}'.format(urllib.quote(dpid), port_id))
+        url = self._datapath_url(dpid) + '/ports/{0}'.format(port_id)
         return self.restclient.get(url)
 
     def get_meters(self, dpid):
         """List all meters configured on the supplied DPID
 
-        :param str dpid: The datapath ID
+        :param dpid: The datapath ID
         :returns: A list of meters
         :rtype: list
 
         """
-        url = (self._of_base_url +
-               'datapaths/{0}/meters'.format(urllib.quote(dpid)))
+        url = self._datapath_url(dpid) + '/meters'
         return self.restclient.get(url)
 
     def add_meter(self, dpid, meter):
         """Add a new meter to the supplied DPID
 
-        :param str dpid:
+        :param dpid:
         :param hpsdnclient.datatypes.Meter meter: The new Meter object
 
         """
-        url = (self._of_base_url +
-               'datapaths/{0}/meters'.format(urllib.quote(dpid)))
-        r = self.restclient.post(url, json.dumps(meter.to_dict()))
+        url = self._datapath_url(dpid) + '/meters'
+        data = {"meter": meter.to_dict()}
+        r = self.restclient.post(url, json.dumps(data))
         raise_errors(r)
 
     def get_meter_details(self, dpid, meter_id):
         """Get detailed meter information
 
-        :param str dpid: The datapath ID
+        :param dpid: The datapath ID
         :param str meter_id: The meter ID
         :return: Meter details
         :rtype: hpsdnclient.datatypes.Meter
 
         """
-        url = (self._of_base_url +
-               'datapaths/{0}/meters/{1}'.format(urllib.quote(dpid), meter_id))
+        url = self._datapath_url(dpid) + '/meters/{0}'.format(meter_id)
         return self.restclient.get(url)
 
     def update_meter(self, dpid, meter_id, meter):
         """ Update the specified meter
 
-        :param str dpid: The datapath ID
+        :param dpid: The datapath ID
         :param str meter_id: The meter ID
         :param hpsdnclient.datatypes.Meter meter: The meter
 
         """
-        url = (self._of_base_url +
-               'datapaths/{0}/meters/{1}'.format(urllib.quote(dpid), meter_id))
-        r = self.restclient.put(url, meter)
+        url = self._datapath_url(dpid) + '/meters/{0}'.format(meter_id)
+        data = {"meter": meter.to_dict()}
+        r = self.restclient.put(url, json.dumps(data))
         raise_errors(r)
 
     def delete_meter(self, dpid, meter_id):
         """Delete a meter
 
-        :param str dpid: The datapath ID
+        :param dpid: The datapath ID
         :param str meter_id: The meter ID to be deleted
 
         """
-        url = (self._of_base_url +
-               'datapaths/{0}/meters/{1}'.format(urllib.quote(dpid), meter_id))
-        r = self.restclient.put(url, self.auth)
+        url = self._datapath_url(dpid) + '/meters/{0}'.format(meter_id)
+        r = self.restclient.delete(url)
         raise_errors(r)
 
     def get_flows(self, dpid):
         """Gets a list of flows on the supplied DPID
 
 
-        :param str dpid: The datapath ID
+        :param dpid: The datapath ID
         :return: List of flows
         :rtype: list
 
         """
-        url = (self._of_base_url +
-               'datapaths/{0}/flows'.format(urllib.quote(dpid)))
+        url = self._datapath_url(dpid) + '/flows'
         return self.restclient.get(url)
 
     def _assemble_flows(self, flows):
@@ -259,69 +268,74 @@ class OfMixin(ApiBase):
             raise DatatypeError([datatypes.Flow, list], f.__class__())
         return data
 
+    def _flows_body(self, flows):
+        """ Returns the request body for flows as bytes. Pre-encoded bodies
+        are sent as they are """
+        if isinstance(flows, FlowBatch):
+            return flows.body
+        if isinstance(flows, BODY_TYPES):
+            return flows
+        return json.dumps(self._assemble_flows(flows)).encode('utf-8')
+
     def add_flows(self, dpid, flows):
         """Add a flow, or flows to the selected DPID
 
-        :param str dpid: The datapath ID
-        :param list, hpsdnclient.datatypes.Flow flows: The flow or flows to add
+        :param dpid: The datapath ID
+        :param list, hpsdnclient.datatypes.Flow flows: The flow or flows to
+            add, a :class:`~hpsdnclient.template.FlowBatch`, or a request
+            body already encoded as bytes, bytearray or memoryview
 
         """
-        url = (self._of_base_url +
-               'datapaths/{0}/flows'.format(urllib.quote(dpid)))
-        data = self._assemble_flows(flows)
-        r = self.restclient.post(url, json.dumps(data))
+        url = self._datapath_url(dpid) + '/flows'
+        r = self.restclient.post(url, self._flows_body(flows))
         raise_errors(r)
 
     def update_flows(self, dpid, flows):
         """Update a flow, or flows at the selected DPID
 
-        :param str dpid: The datapath ID
-        :param list, hpsdnclient.datatypes.Flow flows:
-            The flow or flows to update
+        :param dpid: The datapath ID
+        :param list, hpsdnclient.datatypes.Flow flows: The flow or flows to
+            update, a :class:`~hpsdnclient.template.FlowBatch`, or a request
+            body already encoded as bytes, bytearray or memoryview
 
         """
-        url = (self._of_base_url +
-               'datapaths/{0}/flows'.format(urllib.quote(dpid)))
-        data = self._assemble_flows(flows)
-        r = self.restclient.put(url, json.dumps(data))
+        url = self._datapath_url(dpid) + '/flows'
+        r = self.restclient.put(url, self._flows_body(flows))
         raise_errors(r)
 
     def delete_flows(self, dpid, flows):
         """ Delete flow, or flows from the specified DPID
 
-        :param str dpid: The datapath ID
-        :param list, hpsdnclient.datatypes.Flow flows:
-            The flow or flows to delete
+        :param dpid: The datapath ID
+        :param list, hpsdnclient.datatypes.Flow flows: The flow or flows to
+            delete, a :class:`~hpsdnclient.template.FlowBatch`, or a request
+            body already encoded as bytes, bytearray or memoryview
 
         """
-        url = (self._of_base_url +
-               'datapaths/{0}/flows'.format(urllib.quote(dpid)))
-        data = self._assemble_flows(flows)
-        r = self.restclient.delete(url, json.dumps(data))
+        url = self._datapath_url(dpid) + '/flows'
+        r = self.restclient.delete(url, self._flows_body(flows))
         raise_errors(r)
 
     def get_groups(self, dpid):
         """Get a list of groups created on the DPID
 
-        :param str dpid: The datapath ID
+        :param dpid: The datapath ID
         :return: List of groups
         :rtype: list
 
         """
-        url = (self._of_base_url +
-               'datapaths/{0}/groups'.format(urllib.quote(dpid)))
+        url = self._datapath_url(dpid) + '/groups'
 
         return self.restclient.get(url)
 
     def add_group(self, dpid, group):
         """Create a group
 
-        :param str dpid: The datapath ID
+        :param dpid: The datapath ID
         :param hpsdnclient.datatypes.Group group: The group to add
 
         """
-        url = (self._of_base_url +
-               'datapaths/{0}/groups'.format(urllib.quote(dpid)))
+        url = self._datapath_url(dpid) + '/groups'
         data = {"group": group.to_dict()}
         r = self.restclient.post(url, json.dumps(data))
         raise_errors(r)
@@ -329,36 +343,34 @@ class OfMixin(ApiBase):
     def get_group_details(self, dpid, group_id):
         """Get group details
 
-        :param str dpid: The datapath ID
+        :param dpid: The datapath ID
         :param str group_id: The group ID
         :return: Group details
         :rtype: hpsdnclient.datatypes.Group
 
         """
-        url = (self._of_base_url +
-               'datapaths/{0}/groups/{1}'.format(urllib.quote(dpid), group_id))
+        url = self._datapath_url(dpid) + '/groups/{0}'.format(group_id)
         return self.restclient.get(url)
 
     def update_group(self, dpid, group_id, group):
         """Update a group
 
-        :param str dpid: The datapath ID
+        :param dpid: The datapath ID
         :param hpsdnclient.datatypes.Group group: The group to add
 
         """
-        url = (self._of_base_url +
-               'datapaths/{0}/groups/{1}'.format(urllib.quote(dpid), group_id))
-        r = self.restclient.post(url, json.dumps(group.to_dict()))
+        url = self._datapath_url(dpid) + '/groups/{0}'.format(group_id)
+        data = {"group": group.to_dict()}
+        r = self.restclient.put(url, json.dumps(data))
         raise_errors(r)
 
     def delete_groups(self, dpid, group_id):
         """Delete a group
 
-        :param str dpid: The datapath ID
+        :param dpid: The datapath ID
         :param str group_id: The group ID to delete
 
         """
-        url = (self._of_base_url +
-               'datapaths/{0}/groups/{1}'.format(urllib.quote(dpid), group_id))
-        r = self.restclient.delete(url, self.auth)
+        url = self._datapath_url(dpid) + '/groups/{0}'.format(group_id)
+        r = self.restclient.delete(url)
         raise_errors(r)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Install flows, groups and meters in dependency order """
+
+import threading
+
+from hpsdnclient.datatypes import ActionList, Flow, Group, Meter
+from hpsdnclient.transaction import ADD, DELETE, FLOW, GROUP, METER, Change
+from hpsdnclient.utils import dpid_string, run_parallel
+
+
+def _value(item, name):
+    if isinstance(item, dict):
+        return item.get(name)
+    return getattr(item, name, None)
+
+
+def _list(value):
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+
+def _id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _action_groups(actions):
+    # A repeated group action decodes to a list of group IDs
+    groups = set()
+    if isinstance(actions, ActionList):
+        for group in actions.values('group'):
+            groups.update(_id(g) for g in _list(group))
+        return groups
+    for action in _list(actions):
+        groups.update(_id(g) for g in _list(_value(action, 'group')))
+    return groups
+
+
+def flow_dependencies(flow):
+    """ Returns the IDs of the groups and of the meters a flow uses
+
+    :param hpsdnclient.datatypes.Flow flow: The flow
+    :rtype: tuple
+
+    """
+    groups = _action_groups(flow.actions)
+    meters = set()
+    for instruction in _list(flow.instructions):
+        groups |= _action_groups(_value(instruction, 'apply_actions'))
+        groups |= _action_groups(_value(instruction, 'write_actions'))
+        meter = _value(instruction, 'meter')
+        if meter is not None:
+            meters.add(_id(meter))
+    return groups, meters
+
+
+def group_dependencies(group):
+    """ Returns the IDs of the groups a group's buckets forward to or
+    watch
+
+    :param hpsdnclient.datatypes.Group group: The group
+    :rtype: set
+
+    """
+    groups = set()
+    for bucket in _list(group.buckets):
+        groups |= _action_groups(_value(bucket, 'actions'))
+        watch = _value(bucket, 'watch_group')
+        if watch is not None:
+            groups.add(_id(watch))
+    return groups
+
+
+class Plan(object):
+    """ Installs and removes flows, groups and meters in dependency order
+
+    Flows depend on the groups their actions forward to and on the meters
+    their instructions use; groups depend on the groups their buckets
+    forward to or watch. Groups and meters that are not in the plan are
+    assumed to be on the datapath already.
+
+    Each datapath's items are arranged in layers: an item is placed one
+    layer after the deepest item it depends on. Layers are installed in
+    order and removed in reverse order. Within a layer every group and
+    meter is sent concurrently and the flows are sent in one request.
+    Datapaths are programmed in parallel.
+
+    :param int parallel: Number of datapaths programmed at once
+    :param int per_datapath: Number of requests sent at once to each
+        datapath
+
+    """
+    def __init__(self, parallel=8, per_datapath=4):
+        self.parallel = parallel
+        self.per_datapath = per_datapath
+        self.datapaths = {}
+
+    def add(self, dpid, *items):
+        """ Add Flows, Groups or Meters, or lists of them, for a datapath
+
+        :param dpid: The datapath ID
+
+        """
+        entry = self.datapaths.setdefault(
+            dpid_string(dpid), {"dpid": dpid, "flows": [], "groups": {},
+                                "meters": {}})
+        for item in items:
+            if isinstance(item, (list, tuple)):
+                self.add(dpid, *item)
+            elif isinstance(item, Flow):
+                entry["flows"].append(item)
+            elif isinstance(item, Group):
+                entry["groups"][_id(item.id)] = item
+            elif isinstance(item, Meter):
+                entry["meters"][_id(item.id)] = item
+            else:
+                raise TypeError("Cannot plan {0!r}".format(item))
+
+    def _group_levels(self, groups):
+        levels = {}
+        visiting = set()
+
+        def level(group_id):
+            if group_id in levels:
+                return levels[group_id]
+            if group_id in visiting:
+                raise ValueError("Groups {0} depend on each other".format(
+                    sorted(visiting)))
+            visiting.add(group_id)
+            depends = [level(g) for g in group_dependencies(groups[group_id])
+                       if g in groups and g != group_id]
+            visiting.discard(group_id)
+            levels[group_id] = max(depends) + 1 if depends else 0
+            return levels[group_id]
+
+        for group_id in groups:
+            level(group_id)
+        return levels
+
+    def layers(self, dpid, remove=False):
+        """ Returns the changes for a datapath, as a list of layers
+
+        :param dpid: The datapath ID
+        :param bool remove: Return the changes that remove the items
+        :raises: ValueError if groups depend on each other
+
+        """
+        entry = self.datapaths[dpid_string(dpid)]
+        dpid = entry["dpid"]
+        action = DELETE if remove else ADD
+        layers = []
+
+        def place(level, change):
+            while len(layers) <= level:
+                layers.append([])
+            layers[level].append(change)
+
+        for meter_id, meter in sorted(entry["meters"].items()):
+            place(0, Change(METER, action, dpid, meter, meter_id))
+        levels = self._group_levels(entry["groups"])
+        for group_id, group in sorted(entry["groups"].items()):
+            place(levels[group_id],
+                  Change(GROUP, action, dpid, group, group_id))
+        flows = {}
+        for flow in entry["flows"]:
+            groups, meters = flow_dependencies(flow)
+            level = 0
+            for group_id in groups:
+                if group_id in levels:
+                    level = max(level, levels[group_id] + 1)
+            if any(m in entry["meters"] for m in meters):
+                level = max(level, 1)
+            flows.setdefault(level, []).append(flow)
+        for level, batch in sorted(flows.items()):
+            place(level, Change(FLOW, action, dpid, batch))
+        layers = [layer for layer in layers if layer]
+        if remove:
+            layers.reverse()
+        return layers
+
+    def _execute(self, api, remove):
+        plans = [self.layers(dpid, remove) for dpid in self.datapaths]
+        errors = []
+        abort = threading.Event()
+
+        def program(layers):
+            for layer in layers:
+                if abort.is_set():
+                    return
+                failed = run_parallel(
+                    [lambda c=c: c.apply(api) for c in layer],
+                    self.per_datapath)
+                if failed:
+                    errors.extend(failed)
+                    abort.set()
+                    return
+
+        run_parallel([lambda p=p: program(p) for p in plans], self.parallel)
+        if errors:
+            raise errors[0]
+
+    def install(self, api):
+        """ Add the planned items to their datapaths
+
+        Datapaths that have not failed finish the layer they are on and
+        stop if another datapath fails; the first error is raised.
+
+        :param api: The Api to program the datapaths with
+
+        """
+        self._execute(api, False)
+
+    def remove(self, api):
+        """ Delete the planned items from their datapaths, flows first
+
+        :param api: The Api to program the datapaths with
+
+        """
+        self._execute(api, True)
@@ -14,90 +14,331 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
-import copy
+import functools
+import hashlib
+import time
+import zlib
+# Python3 compatibility
+try:
+    from urllib.parse import urlparse
+except ImportError:
+    from urlparse import urlparse
 
 import requests
 
 from hpsdnclient.version import __version__
-from hpsdnclient.datatypes import JsonObjectFactory, JSON_MAP, PLURALS
+from hpsdnclient.datatypes import (ACTION_LIST_TYPES, decode_action_lists,
+                                   JsonObjectFactory, JSON_MAP, PLURALS)
 from hpsdnclient.error import raise_errors, NotFound
+from hpsdnclient.hooks import RequestInfo, TemplateCache
+from hpsdnclient.transfer import DEFAULT_CHUNK_SIZE, Downloader, UploadStream
+from hpsdnclient.utils import BODY_TYPES, dpid_hook
+
+try:
+    TEXT_TYPE = unicode
+except NameError:
+    TEXT_TYPE = str
+
+COMPRESS_LEVEL = 6
 
 UA = {
     'content-type': 'application/json',
+    'accept-encoding': 'gzip, deflate',
     'user-agent': 'hpsdnclient/{0} '.format(__version__) +
                   'python-requests/{0}'.format(requests.__version__)
 }
 
 
+def encode_body(data):
+    """ Returns a request body as a bytes-like object
+
+    Text is encoded as UTF-8. bytes, bytearray and memoryview bodies are
+    returned as they are, so they reach the socket without being copied;
+    memoryviews are only cast to flat bytes. Other bodies, e.g. files and
+    UploadStreams, are unchanged. """
+    if isinstance(data, TEXT_TYPE):
+        return data.encode('utf-8')
+    if isinstance(data, memoryview):
+        if data.ndim != 1 or data.format != 'B':
+            try:
+                data = data.cast('B')
+            except (AttributeError, TypeError):
+                data = data.tobytes()
+        # Empty iterables are sent with chunked encoding
+        return data if len(data) else b''
+    if isinstance(data, bytearray) and not data:
+        return b''
+    return data
+
+
+def gzip_body(data, level=COMPRESS_LEVEL):
+    """ Returns data compressed in the gzip format """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
 class RestClient(object):
-    def __init__(self, auth):
+    def __init__(self, auth, retry=None, governor=None, breakers=None,
+                 hooks=None, session=None, profile=None, int_dpids=False,
+                 compress=None, action_lists=False):
         self.auth = auth
+        self.retry = retry
+        self.governor = governor
+        self.breakers = breakers
+        self.hooks = list(hooks or [])
+        self.session = session
+        self.profiler = None
+        # timing loads cProfile and the urllib3 connection classes, so it
+        # is only imported when a session or profiling may need it
+        self._timing = None
+        if session is not None or profile is not None:
+            from hpsdnclient import timing
+            self._timing = timing
+        if profile is not None:
+            self.profiler = self._timing.DecodeProfiler(profile)
+        # Without a session, each request uses a new connection
+        self._http = session if session is not None else requests
+        self._templates = TemplateCache()
+        # Decoded DPIDs become Dpid values, shared across responses
+        self._json_args = {}
+        if int_dpids:
+            self._json_args["object_hook"] = dpid_hook({})
+        # Actions of flows and groups are decoded as ActionLists
+        self.action_lists = action_lists
+        # Bodies of at least this many bytes are sent gzip encoded
+        self.compress = compress
+        # Controllers that refused a compressed body
+        self._uncompressed = set()
         self.args = {"auth": self.auth,
                      "verify": False,
                      "headers": UA,
                      "timeout": 30
                      }
 
-    def _download_args(self):
-        args = copy.deepcopy(self.args)
+    def _download_args(self, headers=None):
+        args = dict(self.args)
+        args["headers"] = dict(self.args["headers"])
         args["headers"]["content-type"] = 'application/zip'
+        # Byte ranges must refer to the file, not to an encoding of it
+        args["headers"]["accept-encoding"] = 'identity'
+        if headers:
+            args["headers"].update(headers)
         args["timeout"] = 60
         args["stream"] = True
         return args
 
     def _upload_args(self, filename):
-        args = copy.deepcopy(self.args)
+        args = dict(self.args)
+        args["headers"] = dict(self.args["headers"])
         args["headers"]["content-type"] = 'application/zip'
         args["headers"]["Filename"] = filename
         args["timeout"] = 60
         return args
 
-    def _get(self, url, is_file=False):
+    def _get(self, url, is_file=False, headers=None):
         if is_file:
-            args = self._download_args()
+            args = self._download_args(headers)
+        elif headers:
+            args = dict(self.args)
+            args["headers"] = dict(self.args["headers"], **headers)
         else:
             args = self.args
-        r = requests.get(url, **args)
+        r = self._http.get(url, **args)
+        return r
+
+    def _send_body(self, send, url, data):
+        """ Send data with send(url, data=..., **args), gzip encoded if it
+        is large and the controller has not refused compressed bodies """
+        body = encode_body(data)
+        host = urlparse(url).netloc
+        if (self.compress is None or not isinstance(body, BODY_TYPES) or
+                len(body) < self.compress or host in self._uncompressed):
+            return send(url, data=body, **self.args)
+        args = dict(self.args)
+        args["headers"] = dict(self.args["headers"])
+        args["headers"]["content-encoding"] = 'gzip'
+        r = send(url, data=gzip_body(body), **args)
+        if r.status_code == 415:
+            # Unsupported Media Type: send it again, uncompressed
+            self._uncompressed.add(host)
+            r.close()
+            r = send(url, data=body, **self.args)
         return r
 
     def _put(self, url, data):
-        r = requests.put(url, data=data, **self.args)
+        r = self._send_body(self._http.put, url, data)
         return r
 
     def _post(self, url, data, is_file=False):
         if is_file:
-            args = self._upload_args(data)
-            with open(data) as f:
-                r = requests.post(url, data=f, **args)
+            if not isinstance(data, UploadStream):
+                data = UploadStream(data)
+            args = self._upload_args(data.filename)
+            # Empty iterables are sent with chunked encoding, so an empty
+            # file is read up front and sent as an empty body
+            body = data if len(data) else b''.join(data)
+            r = self._http.post(url, data=body, **args)
         else:
-            args = self.args
-            r = requests.post(url, data=data, **args)
+            r = self._send_body(self._http.post, url, data)
         return r
 
     def _delete(self, url, data=None):
         if data is None:
-            r = requests.delete(url, **self.args)
+            r = self._http.delete(url, **self.args)
         else:
-            r = requests.delete(url, data=data, **self.args)
+            r = self._send_body(self._http.delete, url, data)
         return r
 
     def _head(self, url):
-        r = requests.head(url, **self.args)
+        r = self._http.head(url, **self.args)
         return r
 
+    def _send(self, method, url, send, idempotent=None):
+        attempt = send
+        if self.governor is not None:
+            attempt = functools.partial(self.governor.call, url, attempt)
+        if self.breakers is not None:
+            attempt = functools.partial(self.breakers.call, url, attempt)
+        if self.retry is None:
+            return attempt()
+        return self.retry.call(method, attempt, idempotent)
+
+    def _before(self, method, url, data=None):
+        if not self.hooks:
+            return None
+        bytes_out = 0
+        if data is not None:
+            try:
+                bytes_out = getattr(data, 'nbytes', None) or len(data)
+            except TypeError:
+                bytes_out = None
+        info = RequestInfo(method, url, self._templates(url), bytes_out)
+        for hook in self.hooks:
+            hook.before_request(info)
+        return info
+
+    def _after(self, info, response=None, error=None):
+        if info is None:
+            return
+        info.latency = time.time() - info.start
+        info.error = error
+        if response is not None:
+            info.status = response.status_code
+            length = response.headers.get('Content-Length')
+            if length is not None:
+                info.bytes_in = int(length)
+            elif getattr(response, '_content_consumed', False):
+                info.bytes_in = len(response.content or b'')
+        for hook in self.hooks:
+            hook.after_request(info)
+
+    def _timed(self, send, info):
+        """ Wraps send to record the network phases of each attempt """
+        timing = self._timing
+
+        def attempt():
+            if timing is not None:
+                timing.reset_connect_time()
+            start = time.time()
+            r = send()
+            total = time.time() - start
+            connect = timing.connect_time() if timing is not None else None
+            elapsed = r.elapsed.total_seconds() if r.elapsed else total
+            # None unless a TimingAdapter measured the connect phase
+            info.phases['connect'] = connect
+            info.phases['wait'] = max(0.0, elapsed - (connect or 0.0))
+            info.phases['transfer'] = max(0.0, total - elapsed)
+            # Count the body as sent, after any compression
+            body = getattr(r.request, 'body', None)
+            if isinstance(body, BODY_TYPES):
+                info.bytes_out = len(body)
+            return r
+        return attempt
+
+    def _call(self, method, url, send, idempotent=None, data=None,
+              decode=None, check=True):
+        """ Send a request, calling the hooks before and after it.
+
+        decode, if given, is called with the response and the RequestInfo
+        to produce the result. Otherwise the response is returned. """
+        info = self._before(method, url, data)
+        if info is not None:
+            send = self._timed(send, info)
+        r = None
+        try:
+            r = self._send(method, url, send, idempotent)
+            if check:
+                raise_errors(r)
+            if decode is None:
+                result = r
+            elif info is None:
+                result = decode(r, None)
+            elif self.profiler is not None:
+                start = time.time()
+                result, info.profile = self.profiler.call(decode, r, info)
+                info.decode_time = time.time() - start
+            else:
+                start = time.time()
+                result = decode(r, info)
+                info.decode_time = time.time() - start
+        except Exception as e:
+            self._after(info, r, e)
+            raise
+        self._after(info, r)
+        return result
+
     def get(self, url, is_file=False):
-        result = []
-        if is_file:
-            r = self._get(url, is_file=True)
-        else:
-            r = self._get(url)
+        def send():
+            if is_file:
+                return self._get(url, is_file=True)
+            return self._get(url)
+
+        return self._call('GET', url, send,
+                          decode=lambda r, info: self._decode(url, r, info))
+
+    def poll(self, url, etag=None, digest=None):
+        """ GET url, only parsing the response if it has changed
+
+        The request is conditional if the ETag of the previous response is
+        given. Otherwise the body is hashed and compared with the digest of
+        the previous body. Changed responses are parsed but not converted
+        to JsonObjects.
+
+        :param str url: The URL
+        :param str etag: The ETag of the previous response (Optional)
+        :param str digest: The digest of the previous body (Optional)
+        :return: The JSON data, or None if it has not changed, followed by
+            the ETag and the digest of the response
+        :rtype: tuple
+
+        """
+        headers = {'if-none-match': etag} if etag else None
 
-        raise_errors(r)
+        def decode(r, info):
+            if r.status_code == 304:
+                return None, etag, digest
+            new_etag = r.headers.get('ETag')
+            new_digest = hashlib.sha1(r.content).hexdigest()
+            if new_digest == digest:
+                return None, new_etag, digest
+            start = time.time()
+            data = r.json(**self._json_args)
+            if info is not None:
+                info.phases['decode'] = time.time() - start
+            return data, new_etag, new_digest
 
+        return self._call('GET', url,
+                          lambda: self._get(url, headers=headers),
+                          decode=decode)
+
+    def _decode(self, url, r, info=None):
+        result = []
         content = r.headers['Content-Type']
 
         if content == 'application/json':
-            data = r.json()
+            start = time.time()
+            data = r.json(**self._json_args)
+            decoded = time.time()
 
             for k in list(data):
                 if not k == 'version':
@@ -111,49 +352,57 @@ class RestClient(object):
                 if datatype is None:
                     result = data[key]
                 else:
-                    result = JsonObjectFactory.create(datatype, data[key])
+                    item = data[key]
+                    if self.action_lists and datatype in ACTION_LIST_TYPES:
+                        decode_action_lists(item)
+                    result = JsonObjectFactory.create(datatype, item)
             else:
                 datatype = PLURALS[key]
-                for d in data[key]:
+                items = data[key]
+                if self.action_lists and datatype in ACTION_LIST_TYPES:
+                    for d in items:
+                        decode_action_lists(d)
+                for d in items:
                     result.append(JsonObjectFactory.create(datatype, d))
+            if info is not None:
+                info.phases['decode'] = decoded - start
+                info.phases['materialize'] = time.time() - decoded
 
         elif content == 'text/plain':
             result = r.text
 
         elif r.headers['Content-Type'] == 'application/zip':
-
-            # Strip the 'attachment; filename='' from Content-Disposition
-            filename = r.headers["Content-Disposition"][21:]
-            # Save the data to a file
-            with open(filename, 'wb') as f:
-                for chunk in r.iter_content(chunk_size=1024):
-                    if chunk:  # filter out keep-alive new chunks
-                        if type(chunk) == bytes:
-                            f.write(chunk)
-                        else:
-                            f.write(chunk.encode("UTF-8"))
-                        f.flush()
-            return filename
+            # Save the data to the file named in Content-Disposition
+            return Downloader(self._get_range).fetch(url, response=r)
         else:
             result = None
         return result
 
-    def post(self, url, data, is_file=False):
-        r = self._post(url, data, is_file)
-        raise_errors(r)
-        return r
+    def _get_range(self, url, headers):
+        return self._call('GET', url,
+                          lambda: self._get(url, True, headers),
+                          check=False)
+
+    def download(self, url, path=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 parallel=1, resume=True, progress=None):
+        downloader = Downloader(self._get_range, chunk_size, parallel,
+                                resume, progress=progress)
+        return downloader.fetch(url, path)
+
+    def post(self, url, data, is_file=False, idempotent=False):
+        if is_file and not isinstance(data, UploadStream):
+            data = UploadStream(data)
+        return self._call('POST', url,
+                          lambda: self._post(url, data, is_file),
+                          idempotent, data)
 
     def put(self, url, data):
-        r = self._put(url, data)
-        raise_errors(r)
-        return r
+        return self._call('PUT', url, lambda: self._put(url, data),
+                          data=data)
 
     def delete(self, url, data=None):
-        r = self._delete(url, data)
-        raise_errors(r)
-        return r
+        return self._call('DELETE', url, lambda: self._delete(url, data),
+                          data=data)
 
     def head(self, url):
-        r = self._head(url)
-        raise_errors(r)
-        return r
+        return self._call('HEAD', url, lambda: self._head(url))
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Retry policies for the REST client """
+
+import random
+import threading
+import time
+
+import requests
+
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'PUT', 'DELETE'])
+
+RETRY_STATUS_CODES = frozenset([502, 503, 504])
+
+RETRY_EXCEPTIONS = (requests.ConnectionError, requests.Timeout)
+
+
+class RetryStats(object):
+    """ Counters describing the work done by a RetryPolicy
+
+    - ``requests``: Number of logical requests made
+    - ``attempts``: Number of HTTP attempts made
+    - ``retries``: Number of attempts that were retries
+    - ``giveups``: Requests that still failed once the policy gave up
+    - ``retry_latency``: Total seconds spent on requests that were retried
+
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.attempts = 0
+        self.retries = 0
+        self.giveups = 0
+        self.retry_latency = 0.0
+
+    def record(self, attempts, elapsed, gave_up=False):
+        with self._lock:
+            self.requests += 1
+            self.attempts += attempts
+            self.retries += attempts - 1
+            if attempts > 1:
+                self.retry_latency += elapsed
+            if gave_up:
+                self.giveups += 1
+
+    def to_dict(self):
+        with self._lock:
+            return {"requests": self.requests,
+                    "attempts": self.attempts,
+                    "retries": self.retries,
+                    "giveups": self.giveups,
+                    "retry_latency": self.retry_latency}
+
+
+class RetryPolicy(object):
+    """ Retry transient failures with exponential backoff and jitter
+
+    GET, HEAD, PUT and DELETE requests are retried automatically. POST
+    requests are only retried when the caller marks them as idempotent.
+
+    :param int max_attempts: Maximum number of attempts per request
+    :param float backoff: Base delay in seconds, doubled on each retry
+    :param float max_backoff: Upper bound for a single delay
+    :param float max_elapsed: Give up once a request has taken this long
+    :param bool jitter: Randomize delays ("full jitter")
+    :param status_codes: HTTP status codes that trigger a retry
+    :param exceptions: Exception types that trigger a retry
+    :param methods: HTTP methods that are safe to retry
+
+    """
+    def __init__(self, max_attempts=3, backoff=0.5, max_backoff=30.0,
+                 max_elapsed=120.0, jitter=True,
+                 status_codes=RETRY_STATUS_CODES,
+                 exceptions=RETRY_EXCEPTIONS,
+                 methods=IDEMPOTENT_METHODS):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_elapsed = max_elapsed
+        self.jitter = jitter
+        self.status_codes = frozenset(status_codes)
+        self.exceptions = tuple(exceptions)
+        self.methods = frozenset(m.upper() for m in methods)
+        self.stats = RetryStats()
+
+    def is_retryable(self, method, idempotent=None):
+        """ Returns True if a request may be sent more than once.
+        ``idempotent`` overrides the method based default """
+        if idempotent is not None:
+            return idempotent
+        return method.upper() in self.methods
+
+    def backoff_time(self, attempt, response=None):
+        """ Returns the delay in seconds before the next attempt """
+        delay = min(self.max_backoff, self.backoff * (2 ** (attempt - 1)))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        retry_after = _retry_after(response)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_backoff))
+        return delay
+
+    def call(self, method, send, idempotent=None):
+        """ Call ``send`` until it succeeds or the policy gives up
+
+        :param str method: The HTTP method
+        :param send: A callable making a single attempt and returning a
+            requests.Response
+        :param bool idempotent: Mark the request as safe (or unsafe) to
+            retry regardless of the method
+        :return: The last response received
+
+        """
+        retryable = self.is_retryable(method, idempotent)
+        start = time.time()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = send()
+            except self.exceptions:
+                if not retryable or not self._wait(attempt, start):
+                    self.stats.record(attempt, time.time() - start,
+                                      retryable)
+                    raise
+                continue
+            failed = response.status_code in self.status_codes
+            if (not failed or not retryable or
+                    not self._wait(attempt, start, response)):
+                self.stats.record(attempt, time.time() - start,
+                                  failed and retryable)
+                return response
+
+    def _wait(self, attempt, start, response=None):
+        if attempt >= self.max_attempts:
+            return False
+        delay = self.backoff_time(attempt, response)
+        if time.time() - start + delay > self.max_elapsed:
+            return False
+        time.sleep(delay)
+        return True
+
+
+def _retry_after(response):
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,368 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Access a team of HP VAN SDN Controllers through a single Api """
+
+import re
+import threading
+import time
+# Python3 compatibility
+try:
+    from urllib.parse import urlparse, unquote
+except ImportError:
+    from urlparse import urlparse
+    from urllib import unquote
+
+import requests
+
+from hpsdnclient.apibase import ApiBase
+from hpsdnclient.core import CoreMixin
+from hpsdnclient.net import NetMixin
+from hpsdnclient.of import OfMixin
+from hpsdnclient.rest import RestClient
+from hpsdnclient.utils import controller_url
+
+READ_FAILOVER = (requests.ConnectionError, requests.Timeout)
+WRITE_FAILOVER = (requests.ConnectionError,)
+
+DPID_RE = re.compile(r'/of/datapaths/([^/?]+)|'
+                     r'/of/stats/[^?]*\?(?:.*&)?dpid=([^&]+)')
+
+
+def url_dpid(url):
+    """ Returns the datapath ID an OpenFlow url refers to, or None """
+    match = DPID_RE.search(url)
+    if match is None:
+        return None
+    return unquote(match.group(1) or match.group(2))
+
+
+def _ip(item):
+    """ Regions and DatapathControllers refer to controllers and devices
+    either by IP address or by an object with an ``ip`` attribute """
+    if isinstance(item, dict):
+        return item.get("ip")
+    return getattr(item, "ip", item)
+
+
+class AffinityTable(object):
+    """ Maps datapath IDs to the address of their master controller
+
+    The table is built from the team's regions: a datapath belongs to the
+    region that lists its ``device_ip`` and is mastered by the region's
+    master. The table is rebuilt, at most every ``interval`` seconds, on
+    the first lookup after it has gone stale. A datapath missing from the
+    table is looked up once per interval from its DatapathControllers;
+    until then, and if it has no master, its requests are not routed.
+
+    :param api: The Api used to fetch regions and datapaths
+    :param float interval: Seconds between refreshes
+
+    """
+    def __init__(self, api, interval=60.0):
+        self.api = api
+        self.interval = interval
+        self.routes = {}
+        self.updated = None
+        self._misses = set()
+        self._lock = threading.Lock()
+        self._misses_lock = threading.Lock()
+
+    def refresh(self):
+        """ Rebuild the table from the team's regions and datapaths """
+        masters = {}
+        for region in self.api.get_regions():
+            if region.master is None:
+                continue
+            for device in region.devices:
+                masters[_ip(device)] = _ip(region.master)
+        routes = {}
+        for datapath in self.api.get_datapaths():
+            master = masters.get(datapath.device_ip)
+            if master is not None:
+                routes[datapath.dpid] = master
+        self.routes = routes
+        self.updated = time.time()
+        with self._misses_lock:
+            self._misses = set()
+
+    def update(self, dpid, controllers):
+        """ Set the route for a datapath from its DatapathControllers """
+        if controllers.master is not None:
+            self.routes[dpid] = _ip(controllers.master)
+
+    def is_stale(self):
+        return (self.updated is None or
+                time.time() - self.updated >= self.interval)
+
+    def lookup(self, dpid):
+        """ Returns the address of the master controller for dpid """
+        # Only one thread refreshes; the others use the current routes
+        if self.is_stale() and self._lock.acquire(False):
+            try:
+                if self.is_stale():
+                    self.refresh()
+            except Exception:
+                # Keep routing with the old table until the next interval
+                self.updated = time.time()
+            finally:
+                self._lock.release()
+        address = self.routes.get(dpid)
+        if address is None:
+            address = self._learn(dpid)
+        return address
+
+    def _learn(self, dpid):
+        """ Set the route for a datapath missing from the table """
+        with self._misses_lock:
+            # The lookup for the controllers request itself misses too
+            if dpid in self._misses:
+                return None
+            self._misses.add(dpid)
+        try:
+            self.update(dpid, self.api.get_datapath_controllers(dpid))
+        except Exception:
+            return None
+        return self.routes.get(dpid)
+
+
+class Member(object):
+    """ A controller in the team, as seen by the client
+
+    :param str address: The controller address, as accepted by Api
+
+    """
+    def __init__(self, address, smoothing=0.2):
+        self.address = address
+        self.base_url = controller_url(address)
+        self.host = urlparse(self.base_url).hostname
+        self.smoothing = smoothing
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.latency = None
+        self.down_until = 0.0
+        self._lock = threading.Lock()
+
+    def is_healthy(self, now=None):
+        return (now or time.time()) >= self.down_until
+
+    def start(self):
+        with self._lock:
+            self.outstanding += 1
+            self.requests += 1
+
+    def finish(self, latency, failed=False, cooldown=0.0):
+        with self._lock:
+            self.outstanding -= 1
+            if failed:
+                self.failures += 1
+                self.down_until = time.time() + cooldown
+            elif self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += self.smoothing * (latency - self.latency)
+
+    def to_dict(self):
+        with self._lock:
+            return {"address": self.address,
+                    "healthy": self.is_healthy(),
+                    "outstanding": self.outstanding,
+                    "requests": self.requests,
+                    "failures": self.failures,
+                    "latency": self.latency}
+
+
+class TeamRestClient(RestClient):
+    """ A RestClient that spreads requests across the members of a team
+
+    Reads (GET and HEAD) go to the healthy member with the fewest
+    outstanding requests, using the smoothed latency to break ties.
+    Writes (POST, PUT and DELETE) go to the leader. If an
+    :class:`AffinityTable` is set, requests for a datapath go to its
+    master controller instead, avoiding forwarding inside the team.
+
+    When a member cannot be reached it is marked unhealthy for
+    ``cooldown`` seconds and the request fails over to another member;
+    writes only fail over when the connection could not be established.
+
+    URLs are built for the first controller and rewritten to the chosen
+    member. Logins to the first controller fail over in the same way as
+    reads. Additional keyword arguments are passed to RestClient.
+
+    :param auth: The authenticator. X-Auth-Tokens are valid team wide
+    :param list controllers: The addresses of the team members
+    :param float cooldown: Seconds a failed member is avoided for
+
+    """
+    def __init__(self, auth, controllers, cooldown=10.0, **kwargs):
+        super(TeamRestClient, self).__init__(auth, **kwargs)
+        if not controllers:
+            raise ValueError("A team needs at least one controller")
+        self.members = [Member(c) for c in controllers]
+        self.leader = self.members[0]
+        self.cooldown = cooldown
+        self.affinity = None
+        self._prefix = self.members[0].base_url
+        if hasattr(auth, 'dispatch'):
+            auth.dispatch = self._login
+
+    def member(self, address):
+        """ Returns the member with the given address or host, or None """
+        for member in self.members:
+            if address in (member.address, member.host):
+                return member
+        return None
+
+    def set_leader(self, address):
+        """ Send writes to the member with the given address or host """
+        member = self.member(address)
+        if member is None:
+            raise ValueError("{0} is not a team member".format(address))
+        self.leader = member
+        return member
+
+    def _pick_master(self, url, tried):
+        if self.affinity is None:
+            return None
+        dpid = url_dpid(url)
+        if dpid is None:
+            return None
+        address = self.affinity.lookup(dpid)
+        if address is None:
+            return None
+        member = self.member(address)
+        if member is None or member in tried or not member.is_healthy():
+            return None
+        return member
+
+    def _pick_reader(self, tried):
+        now = time.time()
+        candidates = [m for m in self.members if m not in tried]
+        healthy = [m for m in candidates if m.is_healthy(now)]
+        if healthy:
+            candidates = healthy
+        if not candidates:
+            return None
+        return min(candidates,
+                   key=lambda m: (m.outstanding, m.latency or 0.0))
+
+    def _pick_writer(self, tried):
+        if self.leader not in tried and self.leader.is_healthy():
+            return self.leader
+        # The leader is down, fail over to the next member in order
+        now = time.time()
+        candidates = [m for m in self.members if m not in tried]
+        for member in candidates:
+            if member.is_healthy(now):
+                return member
+        return candidates[0] if candidates else None
+
+    def _dispatch(self, url, call, write):
+        if not url.startswith(self._prefix):
+            return call(url)
+        path = url[len(self._prefix):]
+        failover = WRITE_FAILOVER if write else READ_FAILOVER
+        tried = []
+        last_error = None
+        while True:
+            member = self._pick_master(path, tried)
+            if member is None:
+                pick = self._pick_writer if write else self._pick_reader
+                member = pick(tried)
+            if member is None:
+                raise last_error
+            tried.append(member)
+            member.start()
+            start = time.time()
+            try:
+                r = call(member.base_url + path)
+            except failover as e:
+                member.finish(time.time() - start, True, self.cooldown)
+                last_error = e
+                continue
+            except Exception:
+                member.finish(time.time() - start)
+                raise
+            member.finish(time.time() - start)
+            if write and len(tried) > 1 and tried[0] is self.leader:
+                # The leader failed and this member took the write
+                self.leader = member
+            return r
+
+    def _login(self, url, call):
+        # Logging in or out twice is harmless, so any member may take it
+        return self._dispatch(url, call, False)
+
+    def _get(self, url, is_file=False, headers=None):
+        parent = super(TeamRestClient, self)._get
+        return self._dispatch(url, lambda u: parent(u, is_file, headers),
+                              False)
+
+    def _head(self, url):
+        parent = super(TeamRestClient, self)._head
+        return self._dispatch(url, parent, False)
+
+    def _put(self, url, data):
+        parent = super(TeamRestClient, self)._put
+        return self._dispatch(url, lambda u: parent(u, data), True)
+
+    def _post(self, url, data, is_file=False):
+        parent = super(TeamRestClient, self)._post
+        return self._dispatch(url, lambda u: parent(u, data, is_file), True)
+
+    def _delete(self, url, data=None):
+        parent = super(TeamRestClient, self)._delete
+        return self._dispatch(url, lambda u: parent(u, data), True)
+
+    def members_state(self):
+        """ Returns the state and latency of each member """
+        return [m.to_dict() for m in self.members]
+
+
+class TeamApi(CoreMixin, OfMixin, NetMixin, ApiBase):
+    """ The container class for a team of HP SDN Controllers
+
+    Additional keyword arguments are passed to the
+    :class:`~hpsdnclient.team.TeamRestClient`
+
+    :param list controllers: The addresses of the team members
+    :param auth: The authenticator
+    :param float affinity: Route datapath requests to the datapath's master
+        controller, refreshing the routes every ``affinity`` seconds
+        (Optional)
+
+    """
+    def __init__(self, controllers, auth, affinity=None, **kwargs):
+        self.restclient = TeamRestClient(auth, controllers, **kwargs)
+        super(TeamApi, self).__init__(controllers[0], self.restclient)
+        if affinity is not None:
+            self.restclient.affinity = AffinityTable(self, affinity)
+
+    def discover_leader(self):
+        """ Ask the team which member is the leader and send writes to it
+
+        :return: The address of the leader, or None if it is unknown
+        :rtype: str
+
+        """
+        for system in self.get_systems():
+            if system.role == 'leader' and system.ip:
+                try:
+                    return self.restclient.set_leader(system.ip).address
+                except ValueError:
+                    return None
+        return None
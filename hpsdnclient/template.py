@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Serialize many variants of a flow without building Flow objects """
+
+import json
+import re
+from json.encoder import encode_basestring_ascii
+
+from hpsdnclient.datatypes import Flow
+from hpsdnclient.utils import STRING_TYPES
+
+MARKER = '\x00'
+
+# A placeholder's number between markers, as serialized by json.dumps
+SLOT_RE = re.compile(r'"\\u0000(\d+)\\u0000"')
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def _encode(value):
+    """ Encode a value as JSON; strings and integers take a fast path """
+    if isinstance(value, STRING_TYPES):
+        return encode_basestring_ascii(value)
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(int(value))
+    return json.dumps(value)
+
+
+class Placeholder(object):
+    """ A field of a :class:`FlowTemplate` whose value varies
+
+    :param str name: The name the value is given under when rendering
+
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return 'Placeholder({0!r})'.format(self.name)
+
+
+class FlowBatch(object):
+    """ Flows serialized as the body of a flows request
+
+    Accepted in place of Flows by
+    :meth:`~hpsdnclient.of.OfMixin.add_flows`,
+    :meth:`~hpsdnclient.of.OfMixin.update_flows` and
+    :meth:`~hpsdnclient.of.OfMixin.delete_flows`.
+
+    :param list flows: JSON texts of the flows
+
+    """
+    def __init__(self, flows):
+        self.flows = flows
+        self._body = None
+
+    def __len__(self):
+        return len(self.flows)
+
+    @property
+    def data(self):
+        """ The request body as text """
+        return '{"flows": [' + ', '.join(self.flows) + ']}'
+
+    @property
+    def body(self):
+        """ The request body as UTF-8. It is encoded once and reused by every
+        request that sends the batch, e.g. to several datapaths """
+        if self._body is None:
+            self._body = self.data.encode('utf-8')
+        return self._body
+
+
+class FlowTemplate(object):
+    """ A Flow compiled to JSON text with slots for its placeholders
+
+    The flow is converted with ``to_dict`` and serialized once. Rendering
+    only encodes the values and fills them in, so producing many variants
+    of a flow costs a string format per flow rather than building and
+    serializing Flow objects. ::
+
+        match = Match(eth_type="ipv4", ipv4_src=Placeholder("ip"))
+        template = FlowTemplate(Flow(priority=30000, match=match,
+                                     actions=Action(output=0)))
+        api.add_flows(dpid, template.batch({"ip": ip} for ip in ips))
+
+    A placeholder may be used several times and anywhere a JSON value is
+    allowed. Its values are encoded as JSON strings, numbers, booleans,
+    lists or objects.
+
+    :param hpsdnclient.datatypes.Flow flow: The flow, with Placeholders for
+        the fields that vary
+
+    """
+    def __init__(self, flow):
+        if not isinstance(flow, Flow):
+            raise TypeError("Expected a Flow, received {0!r}".format(flow))
+        self.fields = []
+
+        def slot(value):
+            if not isinstance(value, Placeholder):
+                raise TypeError("{0!r} is not JSON serializable".format(
+                    value))
+            if value.name not in self.fields:
+                self.fields.append(value.name)
+            return MARKER + str(self.fields.index(value.name)) + MARKER
+
+        text = json.dumps(flow.to_dict(), sort_keys=True, default=slot)
+        parts = SLOT_RE.split(text)
+        self.text = '%s'.join(p.replace('%', '%%') for p in parts[0::2])
+        self._slots = [int(i) for i in parts[1::2]]
+        if self._slots == list(range(len(self.fields))):
+            # Each placeholder is used once, in order
+            self._slots = None
+
+    def _fill(self, encoded):
+        if self._slots is None:
+            return self.text % tuple(encoded)
+        return self.text % tuple([encoded[i] for i in self._slots])
+
+    def render(self, values):
+        """ Returns the JSON text of one flow
+
+        :param values: The placeholder values keyed by name, or a sequence
+            in the order of :attr:`fields`. A template with one placeholder
+            also accepts the value itself
+        :raises: KeyError if a value is missing
+
+        """
+        fields = self.fields
+        if isinstance(values, dict):
+            return self._fill([_encode(values[name]) for name in fields])
+        if len(fields) == 1 and (isinstance(values, STRING_TYPES) or
+                                 not isinstance(values, (list, tuple))):
+            return self._fill([_encode(values)])
+        if len(values) != len(fields):
+            raise KeyError("Expected values for {0}".format(fields))
+        return self._fill([_encode(value) for value in values])
+
+    def batch(self, rows):
+        """ Returns a FlowBatch with a flow for each set of values
+
+        :param rows: An iterable of values, as accepted by :meth:`render`
+
+        """
+        render = self.render
+        return FlowBatch([render(values) for values in rows])
+
+    def batches(self, rows, size=DEFAULT_BATCH_SIZE):
+        """ Yields FlowBatches of at most ``size`` flows, so that very
+        large sets of flows are sent in requests of a bounded size
+
+        :param rows: An iterable of values, as accepted by :meth:`render`
+        :param int size: The number of flows per batch
+
+        """
+        render = self.render
+        flows = []
+        for values in rows:
+            flows.append(render(values))
+            if len(flows) >= size:
+                yield FlowBatch(flows)
+                flows = []
+        if flows:
+            yield FlowBatch(flows)
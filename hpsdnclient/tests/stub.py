@@ -0,0 +1,1009 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" A stub HP VAN SDN Controller for offline tests and benchmarks
+
+:class:`StubController` serves the /sdn/v2.0 endpoints used by the
+CoreMixin, OfMixin and NetMixin from synthetic data, on a localhost port
+in a background thread. Latency and errors can be injected with
+:class:`Faults`. ::
+
+    with StubController(StubState(datapaths=10, flows=100)) as stub:
+        auth = XAuthToken(stub.address, 'sdn', 'skyline')
+        api = Api(stub.address, auth)
+        flows = api.get_flows(stub.state.dpids[0])
+
+"""
+
+import copy
+import hashlib
+import io
+import json
+import random
+import re
+import threading
+import time
+import uuid
+import zipfile
+import zlib
+# Python3 compatibility
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, unquote, urlparse
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urllib import unquote
+    from urlparse import parse_qs, urlparse
+
+from hpsdnclient.hooks import url_template
+from hpsdnclient.tests import data
+from hpsdnclient.utils import API_ROOT
+
+VERSION = "1.0.0"
+
+RANGE_RE = re.compile(r'bytes=(\d+)-(\d*)$')
+
+# JSON responses of at least this many bytes are compressed when gzip is on
+GZIP_MIN_SIZE = 1024
+
+
+def dpid(number):
+    """ Returns the datapath ID for a number, e.g. 00:00:00:00:00:00:00:01 """
+    return ':'.join('{0:02x}'.format((number >> shift) & 0xff)
+                    for shift in range(56, -8, -8))
+
+
+def mac(number):
+    """ Returns a locally administered MAC address for a number """
+    return '02:' + ':'.join('{0:02x}'.format((number >> shift) & 0xff)
+                            for shift in range(32, -8, -8))
+
+
+class StubError(Exception):
+    """ Returned to the client as an error response """
+    def __init__(self, status, error, message):
+        self.status = status
+        self.error = error
+        self.message = message
+        super(StubError, self).__init__(message)
+
+
+def _not_found(message):
+    return StubError(404, "com.hp.api.NotFoundException", message)
+
+
+class StubState(object):
+    """ The synthetic state of the stub controller
+
+    :param int datapaths: Number of datapaths
+    :param int flows: Number of flows on each datapath
+    :param int links: Number of links between datapaths. Defaults to a
+        ring through every datapath. Each link is reported in both
+        directions.
+    :param int ports: Number of ports on each datapath
+    :param int hosts: Number of end hosts attached to each datapath
+    :param int seed: Seed for the random data
+
+    The ``master`` attribute is the controller address reported as the
+    master of every datapath and region.
+
+    """
+    def __init__(self, datapaths=4, flows=10, links=None, ports=8, hosts=1,
+                 seed=0):
+        rng = random.Random(seed)
+        self.lock = threading.RLock()
+        self.dpids = [dpid(i + 1) for i in range(datapaths)]
+        self.datapaths = {}
+        self.ports = {}
+        self.flows = {}
+        self.meters = {}
+        self.groups = {}
+        for i, d in enumerate(self.dpids):
+            datapath = copy.deepcopy(data.DATAPATH)
+            datapath["dpid"] = d
+            datapath["device_ip"] = "10.1.{0}.{1}".format(i // 250,
+                                                          i % 250 + 1)
+            self.datapaths[d] = datapath
+            self.ports[d] = [self._port(i, p) for p in range(1, ports + 1)]
+            self.flows[d] = [self._flow(rng, ports) for _ in range(flows)]
+            self.meters[d] = {}
+            self.groups[d] = {}
+        if links is None:
+            links = datapaths if datapaths > 2 else datapaths - 1
+        self.links = self._links(rng, max(links, 0), ports)
+        self.nodes = []
+        for i, d in enumerate(self.dpids):
+            for h in range(hosts):
+                number = i * hosts + h
+                self.nodes.append({"ip": "10.0.{0}.{1}".format(
+                    number // 250, number % 250 + 1),
+                    "mac": mac(number + 1),
+                    "dpid": d,
+                    "port": ports - (h % ports),
+                    "vid": 1})
+        self.lldp_suppressed = []
+        self.observations = []
+        self.packets = {}
+        self.apps = {}
+        self.licenses = []
+        self.logs = None
+        self.master = "127.0.0.1"
+
+    def _port(self, index, number):
+        port = copy.deepcopy(data.PORT)
+        port["id"] = number
+        port["name"] = str(number)
+        port["mac"] = mac((index + 1) << 8 | number)
+        return port
+
+    def _flow(self, rng, ports):
+        flow = copy.deepcopy(data.FLOW)
+        flow["priority"] = rng.randint(1, 40000)
+        flow["packet_count"] = rng.randint(0, 10 ** 6)
+        flow["byte_count"] = flow["packet_count"] * 64
+        flow["match"] = [{"in_port": rng.randint(1, ports)},
+                         {"eth_src": mac(rng.getrandbits(40))},
+                         {"eth_dst": mac(rng.getrandbits(40))}]
+        flow["actions"] = [{"output": rng.randint(1, ports)}]
+        return flow
+
+    def _links(self, rng, count, ports):
+        pairs = []
+        size = len(self.dpids)
+        for i in range(min(count, size if size > 2 else size - 1)):
+            pairs.append((i, (i + 1) % size))
+        while len(pairs) < count and size > 1:
+            pairs.append(tuple(rng.sample(range(size), 2)))
+        used = dict((d, 0) for d in self.dpids)
+        links = []
+        for a, b in pairs:
+            src, dst = self.dpids[a], self.dpids[b]
+            used[src] += 1
+            used[dst] += 1
+            src_port = (used[src] - 1) % ports + 1
+            dst_port = (used[dst] - 1) % ports + 1
+            links.append({"src_dpid": src, "src_port": src_port,
+                          "dst_dpid": dst, "dst_port": dst_port})
+            links.append({"src_dpid": dst, "src_port": dst_port,
+                          "dst_dpid": src, "dst_port": src_port})
+        return links
+
+    def datapath(self, d):
+        if d not in self.datapaths:
+            raise _not_found("No such device: {0}".format(d))
+        return self.datapaths[d]
+
+    def path(self, src, dst):
+        """ Returns the shortest list of links from src to dst """
+        self.datapath(src)
+        self.datapath(dst)
+        previous = {src: None}
+        queue = [src]
+        while queue and dst not in previous:
+            current = queue.pop(0)
+            for link in self.links:
+                if (link["src_dpid"] == current and
+                        link["dst_dpid"] not in previous):
+                    previous[link["dst_dpid"]] = link
+                    queue.append(link["dst_dpid"])
+        if dst not in previous:
+            raise _not_found("No path from {0} to {1}".format(src, dst))
+        path = []
+        while previous[dst] is not None:
+            path.insert(0, previous[dst])
+            dst = previous[dst]["src_dpid"]
+        return path
+
+    def log_archive(self, lines=1000):
+        """ Returns a team log archive: a zip of one zip per member """
+        if self.logs is None:
+            outer = io.BytesIO()
+            with zipfile.ZipFile(outer, 'w') as archive:
+                for member in ('127.0.0.1',):
+                    inner = io.BytesIO()
+                    with zipfile.ZipFile(inner, 'w',
+                                         zipfile.ZIP_DEFLATED) as z:
+                        log = '\n'.join(
+                            'INFO {0} stub message {1}'.format(member, i)
+                            for i in range(lines))
+                        z.writestr('sdn.log', log.encode('utf-8'))
+                    archive.writestr(member + '.zip', inner.getvalue())
+            self.logs = outer.getvalue()
+        return self.logs
+
+
+class Faults(object):
+    """ Latency and errors injected into the stub's responses
+
+    :param float latency: Seconds added to every response
+    :param float jitter: Up to this many seconds are added at random
+    :param float error_rate: Fraction of requests answered with
+        ``error_status``
+    :param int error_status: The status code of injected errors
+    :param float drop_rate: Fraction of requests whose connection is
+        closed without a response
+    :param str paths: Only inject faults for request paths, relative to
+        the API root, matching this regular expression
+    :param int seed: Seed for the random choices
+    :param float bandwidth: Bytes per second the request and response
+        bodies are sent at, unlimited if None
+
+    """
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0,
+                 error_status=503, drop_rate=0.0, paths=None, seed=None,
+                 bandwidth=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.drop_rate = drop_rate
+        self.paths = re.compile(paths) if paths else None
+        self.bandwidth = bandwidth
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def applies(self, path):
+        return self.paths is None or self.paths.search(path) is not None
+
+    def delay(self):
+        with self._lock:
+            jitter = self._random.uniform(0, self.jitter)
+        return self.latency + jitter
+
+    def transfer(self, size):
+        """ Returns the seconds taken to send size bytes """
+        if not self.bandwidth:
+            return 0.0
+        return float(size) / self.bandwidth
+
+    def roll(self, rate):
+        if not rate:
+            return False
+        with self._lock:
+            return self._random.random() < rate
+
+
+def _body(request):
+    """ Parse a JSON request body """
+    if not request.body:
+        return None
+    try:
+        return json.loads(request.body.decode('utf-8'))
+    except ValueError:
+        raise StubError(400, "java.lang.IllegalArgumentException",
+                        "Invalid JSON format: could not parse the request")
+
+
+def _items(body, singular, plural):
+    if body is None:
+        return []
+    if plural in body:
+        return body[plural]
+    if singular in body:
+        return [body[singular]]
+    return []
+
+
+def _query(request, name, required=False):
+    values = request.query.get(name)
+    if not values:
+        if required:
+            raise StubError(400, "java.lang.IllegalArgumentException",
+                            "Missing parameter {0}".format(name))
+        return None
+    return values[0]
+
+
+class Routes(object):
+    """ The endpoints of the stub, as (method, pattern, handler) tuples.
+
+    Handlers are called with the request, the state and the groups of
+    the pattern. They return a (status, payload) tuple where payload is a
+    dict sent as JSON, bytes, or None for an empty response. """
+    def __init__(self):
+        self.routes = []
+
+    def add(self, method, pattern):
+        regex = re.compile('^' + pattern + '$')
+
+        def decorator(handler):
+            self.routes.append((method, regex, handler))
+            return handler
+        return decorator
+
+    def match(self, method, path):
+        allowed = False
+        for route_method, regex, handler in self.routes:
+            match = regex.match(path)
+            if match is not None:
+                if route_method == method:
+                    return handler, [unquote(g) for g in match.groups()]
+                allowed = True
+        if allowed:
+            raise StubError(405, "javax.ws.rs.NotAllowedException",
+                            "Method {0} not allowed".format(method))
+        raise _not_found("No such resource: {0}".format(path))
+
+
+ROUTES = Routes()
+route = ROUTES.add
+
+DP = '/of/datapaths/([^/]+)'
+
+
+@route('POST', '/auth')
+def _login(request, state):
+    expiration = int((time.time() + 3600) * 1000)
+    return 200, {"record": {"token": uuid.uuid4().hex,
+                            "expiration": expiration,
+                            "userName": "sdn"}}
+
+
+@route('DELETE', '/auth')
+def _logout(request, state):
+    return 204, None
+
+
+@route('GET', '/of/stats')
+def _controller_stats(request, state):
+    return 200, {"controller_stats": [copy.deepcopy(data.CONTROLLER_STATS)]}
+
+
+@route('GET', '/of/stats/ports')
+def _port_stats(request, state):
+    d = _query(request, 'dpid', True)
+    port_id = _query(request, 'port_id')
+    stats = []
+    for port in state.ports[state.datapath(d)["dpid"]]:
+        if port_id is None or str(port["id"]) == port_id:
+            entry = copy.deepcopy(data.PORT_STATS)
+            entry["port_id"] = port["id"]
+            stats.append(entry)
+    return 200, {"stats": [{"dpid": d, "port_stats": stats}]}
+
+
+@route('GET', '/of/stats/groups')
+def _group_stats(request, state):
+    d = _query(request, 'dpid', True)
+    group_id = _query(request, 'group_id')
+    stats = []
+    for number in sorted(state.groups[state.datapath(d)["dpid"]]):
+        if group_id is None or str(number) == group_id:
+            entry = copy.deepcopy(data.GROUP_STATS)
+            entry["id"] = number
+            stats.append(entry)
+    return 200, {"stats": stats}
+
+
+@route('GET', '/of/stats/meters')
+def _meter_stats(request, state):
+    d = _query(request, 'dpid', True)
+    meter = _query(request, 'meter', True)
+    if int(meter) not in state.meters[state.datapath(d)["dpid"]]:
+        raise _not_found("No such meter: {0}".format(meter))
+    entry = copy.deepcopy(data.METER_STATS)
+    entry["id"] = int(meter)
+    return 200, {"stats": [entry]}
+
+
+@route('GET', '/of/datapaths')
+def _datapaths(request, state):
+    return 200, {"datapaths": [state.datapaths[d] for d in state.dpids]}
+
+
+@route('GET', DP)
+def _datapath(request, state, d):
+    return 200, {"datapath": state.datapath(d)}
+
+
+@route('GET', DP + '/controllers')
+def _datapath_controllers(request, state, d):
+    state.datapath(d)
+    return 200, {"controllers": {"master": state.master, "slaves": []}}
+
+
+@route('GET', DP + '/features/meter')
+def _meter_features(request, state, d):
+    state.datapath(d)
+    return 200, {"meter_features": copy.deepcopy(data.METER_FEATURES)}
+
+
+@route('GET', DP + '/features/group')
+def _group_features(request, state, d):
+    state.datapath(d)
+    return 200, {"group_features": copy.deepcopy(data.GROUP_FEATURES)}
+
+
+@route('GET', DP + '/ports')
+def _ports(request, state, d):
+    return 200, {"ports": state.ports[state.datapath(d)["dpid"]]}
+
+
+@route('GET', DP + '/ports/(\\d+)')
+def _port(request, state, d, port_id):
+    for port in state.ports[state.datapath(d)["dpid"]]:
+        if port["id"] == int(port_id):
+            return 200, {"port": port}
+    raise _not_found("No such port: {0}".format(port_id))
+
+
+@route('GET', DP + '/flows')
+def _flows(request, state, d):
+    return 200, {"flows": state.flows[state.datapath(d)["dpid"]]}
+
+
+@route('POST', DP + '/flows')
+def _add_flows(request, state, d):
+    flows = state.flows[state.datapath(d)["dpid"]]
+    for flow in _items(_body(request), 'flow', 'flows'):
+        flow.setdefault("packet_count", 0)
+        flow.setdefault("byte_count", 0)
+        flow.setdefault("duration_sec", 0)
+        flows.append(flow)
+    return 201, None
+
+
+def _same_flow(a, b):
+    """ Flows match on priority and match fields, in any order """
+    if a.get("priority") != b.get("priority"):
+        return False
+    fields = [json.dumps(f, sort_keys=True) for f in a.get("match") or []]
+    other = [json.dumps(f, sort_keys=True) for f in b.get("match") or []]
+    return sorted(fields) == sorted(other)
+
+
+@route('PUT', DP + '/flows')
+def _update_flows(request, state, d):
+    flows = state.flows[state.datapath(d)["dpid"]]
+    for flow in _items(_body(request), 'flow', 'flows'):
+        for existing in flows:
+            if _same_flow(existing, flow):
+                existing.update(flow)
+    return 200, None
+
+
+@route('DELETE', DP + '/flows')
+def _delete_flows(request, state, d):
+    key = state.datapath(d)["dpid"]
+    for flow in _items(_body(request), 'flow', 'flows'):
+        state.flows[key] = [f for f in state.flows[key]
+                            if not _same_flow(f, flow)]
+    return 204, None
+
+
+def _collection(name, singular):
+    """ Routes for meters and groups, which have the same shape """
+    @route('GET', DP + '/' + name)
+    def list_items(request, state, d):
+        items = getattr(state, name)[state.datapath(d)["dpid"]]
+        return 200, {name: [items[k] for k in sorted(items)]}
+
+    @route('POST', DP + '/' + name)
+    def add_item(request, state, d):
+        items = getattr(state, name)[state.datapath(d)["dpid"]]
+        for item in _items(_body(request), singular, name):
+            items[int(item.get("id", len(items) + 1))] = item
+        return 201, None
+
+    def get(state, d, number):
+        items = getattr(state, name)[state.datapath(d)["dpid"]]
+        if int(number) not in items:
+            raise _not_found("No such {0}: {1}".format(singular, number))
+        return items
+
+    @route('GET', DP + '/' + name + '/(\\d+)')
+    def get_item(request, state, d, number):
+        return 200, {singular: get(state, d, number)[int(number)]}
+
+    def update_item(request, state, d, number):
+        items = get(state, d, number)
+        for item in _items(_body(request), singular, name):
+            item["id"] = int(number)
+            items[int(number)] = item
+        return 200, None
+
+    route('PUT', DP + '/' + name + '/(\\d+)')(update_item)
+    route('POST', DP + '/' + name + '/(\\d+)')(update_item)
+
+    @route('DELETE', DP + '/' + name + '/(\\d+)')
+    def delete_item(request, state, d, number):
+        del get(state, d, number)[int(number)]
+        return 204, None
+
+
+_collection('meters', 'meter')
+_collection('groups', 'group')
+
+
+@route('GET', '/net/clusters')
+def _clusters(request, state):
+    return 200, {"clusters": [{"uid": "1", "links": state.links}]}
+
+
+@route('GET', '/net/clusters/([^/]+)/tree')
+def _cluster_tree(request, state, cluster):
+    if cluster != "1":
+        raise _not_found("No such cluster: {0}".format(cluster))
+    return 200, {"links": state.links}
+
+
+@route('GET', '/net/links')
+def _links(request, state):
+    d = _query(request, 'dpid')
+    links = [link for link in state.links
+             if d is None or d in (link["src_dpid"], link["dst_dpid"])]
+    return 200, {"links": links}
+
+
+@route('GET', '/net/paths/forward')
+def _forward_path(request, state):
+    links = state.path(_query(request, 'src_dpid', True),
+                       _query(request, 'dst_dpid', True))
+    return 200, {"path": {"cost": len(links), "links": links}}
+
+
+@route('GET', '/net/arps')
+def _arps(request, state):
+    return 200, {"arps": [{"ip": n["ip"], "mac": n["mac"], "vid": n["vid"]}
+                          for n in state.nodes]}
+
+
+@route('GET', '/net/nodes')
+def _nodes(request, state):
+    d = _query(request, 'dpid')
+    return 200, {"nodes": [n for n in state.nodes
+                           if d is None or n["dpid"] == d]}
+
+
+@route('GET', '/net/lldp')
+def _lldp(request, state):
+    return 200, {"lldp_suppressed": state.lldp_suppressed}
+
+
+@route('POST', '/net/lldp')
+def _add_lldp(request, state):
+    state.lldp_suppressed.extend(
+        _items(_body(request), 'lldp_suppressed', 'lldp_suppressed'))
+    return 201, None
+
+
+@route('DELETE', '/net/lldp')
+def _remove_lldp(request, state):
+    removed = _items(_body(request), 'lldp_suppressed', 'lldp_suppressed')
+    state.lldp_suppressed = [p for p in state.lldp_suppressed
+                             if p not in removed]
+    return 204, None
+
+
+@route('GET', '/diag/observations')
+def _observations(request, state):
+    return 200, {"observations": state.observations}
+
+
+@route('POST', '/diag/observations')
+def _add_observation(request, state):
+    state.observations.extend(
+        _items(_body(request), 'observation', 'observations'))
+    return 201, None
+
+
+@route('DELETE', '/diag/observations')
+def _delete_observation(request, state):
+    removed = _items(_body(request), 'observation', 'observations')
+    state.observations = [o for o in state.observations if o not in removed]
+    return 204, None
+
+
+@route('GET', '/diag/packets')
+def _packets(request, state):
+    return 200, {"packets": [state.packets[k] for k in sorted(state.packets)]}
+
+
+@route('POST', '/diag/packets')
+def _add_packet(request, state):
+    for packet in _items(_body(request), 'packet', 'packets'):
+        packet.setdefault("uid", str(len(state.packets) + 1))
+        state.packets[packet["uid"]] = packet
+    return 201, None
+
+
+def _packet(state, uid):
+    if uid not in state.packets:
+        raise _not_found("No such packet: {0}".format(uid))
+    return state.packets[uid]
+
+
+@route('GET', '/diag/packets/([^/]+)')
+def _get_packet(request, state, uid):
+    return 200, {"packet": _packet(state, uid)}
+
+
+@route('DELETE', '/diag/packets/([^/]+)')
+def _delete_packet(request, state, uid):
+    _packet(state, uid)
+    del state.packets[uid]
+    return 204, None
+
+
+@route('GET', '/diag/packets/([^/]+)/path')
+def _packet_path(request, state, uid):
+    _packet(state, uid)
+    links = state.path(state.dpids[0], state.dpids[-1])
+    return 200, {"path": {"cost": len(links), "links": links}}
+
+
+@route('GET', '/diag/packets/([^/]+)/nexthops')
+def _packet_nexthops(request, state, uid):
+    _packet(state, uid)
+    src = _query(request, 'src_dpid', True)
+    hops = [{"dpid": link["dst_dpid"], "port": link["src_port"]}
+            for link in state.links if link["src_dpid"] == src]
+    return 200, {"nexthops": hops}
+
+
+@route('POST', '/diag/packets/([^/]+)/action')
+def _packet_action(request, state, uid):
+    _packet(state, uid)
+    return 200, None
+
+
+@route('GET', '/apps')
+def _apps(request, state):
+    return 200, {"apps": [state.apps[k] for k in sorted(state.apps)]}
+
+
+@route('POST', '/apps')
+def _upload_app(request, state):
+    name = request.headers.get('Filename') or 'app.zip'
+    uid = name[:-4] if name.endswith('.zip') else name
+    state.apps[uid] = {"uid": uid, "name": uid, "version": "1.0.0",
+                       "state": "INSTALLED", "deployed": int(time.time()),
+                       "size": len(request.body or b'')}
+    return 201, {"app": state.apps[uid]}
+
+
+def _app(state, uid):
+    if uid not in state.apps:
+        raise _not_found("No such app: {0}".format(uid))
+    return state.apps[uid]
+
+
+@route('GET', '/apps/([^/]+)')
+def _get_app(request, state, uid):
+    return 200, {"app": _app(state, uid)}
+
+
+@route('DELETE', '/apps/([^/]+)')
+def _delete_app(request, state, uid):
+    _app(state, uid)
+    del state.apps[uid]
+    return 204, None
+
+
+@route('POST', '/apps/([^/]+)/action')
+def _app_action(request, state, uid):
+    app = _app(state, uid)
+    action = (request.body or b'').decode('utf-8').strip()
+    app["state"] = {"start": "ACTIVE", "stop": "RESOLVED"}.get(
+        action, app["state"])
+    return 200, None
+
+
+@route('GET', '/apps/([^/]+)/health')
+def _app_health(request, state, uid):
+    health = copy.deepcopy(data.APP_HEALTH)
+    health.update(uid=uid, name=uid, state=_app(state, uid)["state"])
+    return 200, {"app": health}
+
+
+@route('GET', '/licenses')
+def _licenses(request, state):
+    return 200, {"licenses": state.licenses}
+
+
+@route('POST', '/licenses')
+def _add_license(request, state):
+    state.licenses.append({"serial_no": len(state.licenses) + 1,
+                           "license_key": request.body.decode('utf-8')})
+    return 201, None
+
+
+@route('GET', '/team')
+def _team(request, state):
+    return 200, {"team": copy.deepcopy(data.TEAM)}
+
+
+@route('GET', '/systems')
+def _systems(request, state):
+    system = copy.deepcopy(data.SYSTEM)
+    system["ip"] = "127.0.0.1"
+    system["role"] = "leader"
+    return 200, {"systems": [system]}
+
+
+@route('GET', '/regions')
+def _regions(request, state):
+    return 200, {"regions": [{
+        "uid": "1",
+        "master": {"ip": state.master, "name": "stub"},
+        "slaves": [],
+        "devices": [{"ip": state.datapaths[d]["device_ip"]}
+                    for d in state.dpids]}]}
+
+
+@route('GET', '/support')
+def _support(request, state):
+    return 200, {"support_report": [{"id": "stub", "title": "Stub",
+                                     "content": ["ok"]}]}
+
+
+@route('GET', '/logs')
+def _logs(request, state):
+    return 200, state.log_archive()
+
+
+class StubRequest(object):
+    def __init__(self, method, path, query, headers, body):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+
+
+def _decode(body, encoding):
+    """ Decode a request body sent with a Content-Encoding """
+    try:
+        if encoding == 'gzip':
+            return zlib.decompress(body, 16 + zlib.MAX_WBITS)
+        return zlib.decompress(body)
+    except zlib.error:
+        raise StubError(400, "java.lang.IllegalArgumentException",
+                        "Invalid {0} encoding".format(encoding))
+
+
+def _gzip(body):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(body) + compressor.flush()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # The faults applied to the current request and its body size
+    _faults = None
+    _received = 0
+
+    def log_message(self, *args):
+        pass
+
+    def _read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return b''.join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _handle(self):
+        stub = self.server.stub
+        url = urlparse(self.path)
+        path = url.path
+        if path.startswith(API_ROOT):
+            path = path[len(API_ROOT) - 1:]
+        body = self._read_body()
+        self._received = len(body)
+        stub.record(self.command, self.path, len(body))
+        faults = stub.faults
+        self._faults = None
+        if faults is not None and faults.applies(path.lstrip('/')):
+            self._faults = faults
+            delay = faults.delay()
+            if delay:
+                time.sleep(delay)
+            if faults.roll(faults.drop_rate):
+                self.close_connection = True
+                return
+            if faults.roll(faults.error_rate):
+                return self._error(StubError(
+                    faults.error_status, "InjectedFault",
+                    "Fault injected by the stub controller"))
+        if path != '/auth' and 'X-Auth-Token' not in self.headers:
+            return self._error(StubError(401, "Unauthorized",
+                                         "Missing X-Auth-Token"))
+        encoding = self.headers.get('Content-Encoding', 'identity').lower()
+        try:
+            if encoding in ('gzip', 'deflate') and body:
+                if not stub.gzip:
+                    raise StubError(415, "UnsupportedMediaType",
+                                    "Unsupported Content-Encoding")
+                body = _decode(body, encoding)
+            request = StubRequest(self.command, path, parse_qs(url.query),
+                                  self.headers, body)
+            handler, args = ROUTES.match(self.command, path)
+            with stub.state.lock:
+                status, payload = handler(request, stub.state, *args)
+                if isinstance(payload, dict):
+                    payload = dict(payload, version=VERSION)
+                    body = json.dumps(payload).encode('utf-8')
+                else:
+                    body = payload
+        except StubError as e:
+            return self._error(e)
+        if isinstance(body, bytes) and path == '/logs':
+            return self._send_file(body, 'logs.zip')
+        headers = {}
+        if stub.etags and self.command == 'GET' and status == 200 and body:
+            etag = '"{0}"'.format(hashlib.sha1(body).hexdigest())
+            headers['ETag'] = etag
+            if self.headers.get('If-None-Match') == etag:
+                return self._send(304, b'', None, headers)
+        accept = self.headers.get('Accept-Encoding', '').lower()
+        if (stub.gzip and body and len(body) >= GZIP_MIN_SIZE and
+                'gzip' in accept):
+            body = _gzip(body)
+            headers['Content-Encoding'] = 'gzip'
+        self._send(status, body, 'application/json' if body else None,
+                   headers)
+
+    def _error(self, error):
+        body = json.dumps({"error": error.error,
+                           "message": error.message}).encode('utf-8')
+        self._send(error.status, body, 'application/json')
+
+    def _send(self, status, body, content_type, headers=None):
+        if self._faults is not None:
+            delay = self._faults.transfer(self._received + len(body or b''))
+            if delay:
+                time.sleep(delay)
+        self.server.stub.sent(len(body or b'') if self.command != 'HEAD'
+                              else 0)
+        self.send_response(status)
+        if content_type is not None:
+            self.send_header('Content-Type', content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body or b'')))
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _send_file(self, body, filename):
+        headers = {'Accept-Ranges': 'bytes',
+                   'Content-Disposition':
+                   'attachment; filename={0}'.format(filename)}
+        match = RANGE_RE.match(self.headers.get('Range') or '')
+        if match is None:
+            return self._send(200, body, 'application/zip', headers)
+        start = int(match.group(1))
+        end = min(int(match.group(2) or len(body) - 1), len(body) - 1)
+        if start >= len(body):
+            headers['Content-Range'] = 'bytes */{0}'.format(len(body))
+            return self._send(416, b'', None, headers)
+        headers['Content-Range'] = 'bytes {0}-{1}/{2}'.format(
+            start, end, len(body))
+        self._send(206, body[start:end + 1], 'application/zip', headers)
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = _handle
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class StubController(object):
+    """ Serves a StubState on a localhost port
+
+    :param state: The controller state, a default StubState if None
+    :param faults: The Faults to inject (Optional)
+    :param str host: The address to listen on
+    :param int port: The port to listen on, a free port by default
+    :param bool gzip: Accept gzip and deflate encoded request bodies and
+        gzip large JSON responses for clients that accept it. Otherwise
+        encoded bodies are refused with a 415
+    :param bool etags: Send an ETag with each JSON response and answer GET
+        requests whose If-None-Match matches it with a 304
+
+    """
+    def __init__(self, state=None, faults=None, host='127.0.0.1', port=0,
+                 gzip=False, etags=False):
+        self.state = state if state is not None else StubState()
+        self.faults = faults
+        self.host = host
+        self.port = port
+        self.gzip = gzip
+        self.etags = etags
+        self.requests = {}
+        # Request and response body bytes, as sent on the wire
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self._server = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def address(self):
+        """ The controller address to pass to the Api """
+        return 'http://{0}:{1}'.format(self.host, self.port)
+
+    def record(self, method, path, size=0):
+        key = '{0} {1}'.format(method, url_template(path))
+        with self._lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.bytes_received += size
+
+    def sent(self, size):
+        with self._lock:
+            self.bytes_sent += size
+
+    def start(self):
+        self._server = _Server((self.host, self.port), StubHandler)
+        self._server.stub = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        args=(0.05,))
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    """ Run a stub controller until interrupted """
+    import argparse
+    parser = argparse.ArgumentParser(description="Stub SDN controller")
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--datapaths', type=int, default=4)
+    parser.add_argument('--flows', type=int, default=10)
+    parser.add_argument('--links', type=int, default=None)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--bandwidth', type=float, default=None)
+    parser.add_argument('--gzip', action='store_true')
+    args = parser.parse_args()
+    stub = StubController(StubState(args.datapaths, args.flows, args.links),
+                          Faults(args.latency, error_rate=args.error_rate,
+                                 bandwidth=args.bandwidth),
+                          port=args.port, gzip=args.gzip).start()
+    print("Stub controller at {0}".format(stub.address))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == '__main__':
+    main()
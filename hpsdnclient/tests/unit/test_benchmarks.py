@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import json
+import os
+import random
+import shutil
+import tempfile
+import unittest
+#PY3
+try:
+    from io import StringIO
+except ImportError:
+    from StringIO import StringIO
+
+from benchmarks import compare
+from benchmarks.runner import load_benchmarks
+
+
+def _samples(center, seed, count=15, spread=0.02):
+    """ Samples scattered around center, the same for a given seed """
+    rng = random.Random(seed)
+    return [center * (1 + rng.uniform(-spread, spread))
+            for _ in range(count)]
+
+
+class BenchmarkSmokeTests(unittest.TestCase):
+    def test_every_benchmark_runs_once(self):
+        benchmarks = load_benchmarks()
+        self.assertTrue(benchmarks)
+        for benchmark in benchmarks:
+            context = benchmark.setup() if benchmark.setup else None
+            try:
+                benchmark.func(context)
+            except Exception as e:
+                self.fail('{0} failed: {1!r}'.format(benchmark.name, e))
+            finally:
+                if benchmark.teardown is not None:
+                    benchmark.teardown(context)
+
+
+class CompareTests(unittest.TestCase):
+    def setUp(self):
+        self.base = _samples(1.0, seed=1)
+
+    def test_faster(self):
+        c = compare.Comparison('e2e.get_flows[10]', self.base,
+                               _samples(0.8, seed=2))
+        self.assertEqual(c.verdict, compare.FASTER)
+        self.assertTrue(c.low <= c.ratio <= c.high < 1)
+
+    def test_regression_in_hot_path(self):
+        c = compare.Comparison('e2e.get_flows[10]', self.base,
+                               _samples(1.2, seed=2))
+        self.assertEqual(c.verdict, compare.REGRESSION)
+        self.assertEqual(c.hot_path, 'RestClient.get')
+        self.assertTrue(c.low > 1 + compare.DEFAULT_THRESHOLD)
+
+    def test_slower_outside_hot_paths(self):
+        c = compare.Comparison('import.hpsdnclient', self.base,
+                               _samples(1.2, seed=2))
+        self.assertEqual(c.verdict, compare.SLOWER)
+        self.assertEqual(c.hot_path, None)
+
+    def test_slower_within_threshold(self):
+        c = compare.Comparison('e2e.get_flows[10]', self.base,
+                               _samples(1.03, seed=2, spread=0.005))
+        self.assertEqual(c.verdict, compare.SLOWER)
+
+    def test_inconclusive(self):
+        # The samples overlap too much to tell the medians apart
+        c = compare.Comparison('e2e.get_flows[10]',
+                               _samples(1.0, seed=1, spread=0.5),
+                               _samples(1.1, seed=2, spread=0.5))
+        self.assertEqual(c.verdict, compare.SAME)
+        self.assertTrue(c.low < 1 < c.high)
+
+    def test_bootstrap_is_seeded(self):
+        new = _samples(1.1, seed=2)
+        self.assertEqual(compare.bootstrap_ratio(self.base, new, seed=3),
+                         compare.bootstrap_ratio(self.base, new, seed=3))
+
+
+class CompareMainTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.base = self._save('base.json', 1.0, seed=1)
+
+    def _save(self, name, center, seed):
+        path = os.path.join(self.directory, name)
+        samples = {"e2e.get_flows[10]": _samples(center, seed),
+                   "import.hpsdnclient": _samples(center, seed + 10)}
+        with open(path, 'w') as f:
+            json.dump({"benchmarks": dict(
+                (k, {"samples": v}) for k, v in samples.items())}, f)
+        return path
+
+    def _main(self, new):
+        return compare.main([self.base, new, '--json'])
+
+    def test_exit_code(self):
+        # Only hot path regressions fail the comparison
+        compare.sys.stdout, stdout = StringIO(), compare.sys.stdout
+        try:
+            self.assertEqual(self._main(self._save('same.json', 1.0, 5)), 0)
+            self.assertEqual(self._main(self._save('fast.json', 0.8, 5)), 0)
+            self.assertEqual(self._main(self._save('slow.json', 1.2, 5)), 1)
+        finally:
+            compare.sys.stdout = stdout
+
+    def test_report(self):
+        new = compare.load(self._save('slow.json', 1.2, 5))
+        out = StringIO()
+        regressions = compare.report(
+            compare.compare(compare.load(self.base), new), out)
+        self.assertEqual([c.name for c in regressions], ['e2e.get_flows[10]'])
+        self.assertIn('RestClient.get regressed in e2e.get_flows[10]',
+                      out.getvalue())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import time
+import unittest
+#PY3.3
+try:
+    from unittest.mock import MagicMock
+except ImportError:
+    from mock import MagicMock
+
+import requests
+
+from hpsdnclient.auth import XAuthToken
+from hpsdnclient.breaker import (CircuitBreaker, CircuitBreakers, CLOSED,
+                                 HALF_OPEN, OPEN)
+from hpsdnclient.error import CircuitOpen, HpsdnclientError, NotFound
+from hpsdnclient.rest import RestClient
+
+BASE_URL = 'https://10.10.10.10:8443/sdn/v2.0/'
+
+
+def _response(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return response
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker('test', failure_threshold=0.5,
+                                      window=4, min_calls=4,
+                                      reset_timeout=0.05)
+
+    def _fail(self, count):
+        for _ in range(count):
+            self.breaker.before_call()
+            self.breaker.record(False)
+
+    def test_opens_on_failure_rate(self):
+        self.breaker.before_call()
+        self.breaker.record(True)
+        self.breaker.before_call()
+        self.breaker.record(True)
+        self._fail(1)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self._fail(1)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_min_calls(self):
+        self._fail(3)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_open_fails_fast(self):
+        self._fail(4)
+        self.assertRaises(CircuitOpen, self.breaker.before_call)
+        try:
+            self.breaker.before_call()
+        except CircuitOpen as e:
+            self.assertTrue(isinstance(e, HpsdnclientError))
+            self.assertEqual(e.name, 'test')
+            self.assertTrue(0 < e.retry_after <= 0.05)
+
+    def test_half_open_probe_closes(self):
+        self._fail(4)
+        time.sleep(0.06)
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.breaker.before_call()
+        # Only one probe is allowed at a time
+        self.assertRaises(CircuitOpen, self.breaker.before_call)
+        self.breaker.record(True)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_half_open_probe_reopens(self):
+        self._fail(4)
+        time.sleep(0.06)
+        self.breaker.before_call()
+        self.breaker.record(False)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_cancel_releases_probe(self):
+        self._fail(4)
+        time.sleep(0.06)
+        self.breaker.before_call()
+        self.breaker.cancel()
+        self.breaker.before_call()
+
+    def test_to_dict(self):
+        self._fail(2)
+        self.assertEqual(self.breaker.to_dict(),
+                         {"state": CLOSED, "calls": 2, "failures": 2})
+
+
+class CircuitBreakersTests(unittest.TestCase):
+    def setUp(self):
+        self.breakers = CircuitBreakers(window=2, min_calls=2,
+                                        reset_timeout=60)
+
+    def test_for_url(self):
+        breakers = self.breakers.for_url(BASE_URL + 'of/datapaths')
+        self.assertEqual([b.name for b in breakers],
+                         ['10.10.10.10:8443', '10.10.10.10:8443/of'])
+
+    def test_family_isolation(self):
+        for _ in range(2):
+            self.breakers.call(BASE_URL + 'of/stats', lambda: _response(503))
+        self.assertRaises(CircuitOpen, self.breakers.call,
+                          BASE_URL + 'of/stats', lambda: _response(200))
+        # The controller breaker is open too, so every family fails fast
+        self.assertRaises(CircuitOpen, self.breakers.call,
+                          BASE_URL + 'net/links', lambda: _response(200))
+        states = self.breakers.states()
+        self.assertEqual(states['10.10.10.10:8443/of']['state'], OPEN)
+        self.assertEqual(states['10.10.10.10:8443']['state'], OPEN)
+        self.assertEqual(states['10.10.10.10:8443/net']['state'], CLOSED)
+
+    def test_exceptions_count_as_failures(self):
+        def send():
+            raise requests.ConnectionError()
+
+        for _ in range(2):
+            self.assertRaises(requests.ConnectionError,
+                              self.breakers.call, BASE_URL + 'apps', send)
+        self.assertEqual(self.breakers.states()['10.10.10.10:8443']['state'],
+                         OPEN)
+
+    def test_other_errors_do_not_count(self):
+        def send():
+            raise NotFound("nope")
+
+        for _ in range(2):
+            self.assertRaises(NotFound,
+                              self.breakers.call, BASE_URL + 'apps', send)
+        self.assertEqual(self.breakers.states()['10.10.10.10:8443']['state'],
+                         CLOSED)
+
+    def test_restclient_fails_fast(self):
+        auth = XAuthToken('10.10.10.10', 'sdn', 'skyline')
+        client = RestClient(auth, breakers=self.breakers)
+        client._get = MagicMock(side_effect=requests.Timeout())
+        for _ in range(2):
+            self.assertRaises(requests.Timeout,
+                              client.get, BASE_URL + 'of/datapaths')
+        self.assertRaises(CircuitOpen, client.get, BASE_URL + 'of/datapaths')
+        self.assertEqual(client._get.call_count, 2)
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import json
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import threading
+import unittest
+# Python3 compatibility
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+#PY3.3
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+from hpsdnclient import cli
+from hpsdnclient.tests.stub import StubController, StubState
+
+
+class CliTests(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubController(StubState(datapaths=3, flows=4)).start()
+        self.dpid = self.stub.state.dpids[0]
+        self.tmp = tempfile.mkdtemp()
+        self.socket = os.path.join(self.tmp, 'hpsdn.sock')
+        self.daemon = None
+
+    def tearDown(self):
+        if self.daemon is not None:
+            self.daemon.shutdown()
+            self.thread.join()
+        self.stub.stop()
+        shutil.rmtree(self.tmp)
+
+    def _run(self, *args, **kwargs):
+        argv = ['--controller', kwargs.get('controller', self.stub.address),
+                '--user', kwargs.get('user', 'sdn'), '--password', 'skyline',
+                '--socket', self.socket] + list(args)
+        out = StringIO()
+        stderr = sys.stderr
+        sys.stderr = StringIO()
+        try:
+            code = cli.main(argv, out)
+        finally:
+            self.error = sys.stderr.getvalue()
+            sys.stderr = stderr
+        value = out.getvalue()
+        return code, json.loads(value) if value else None
+
+    def _start_daemon(self):
+        api = cli.connect_api(self.stub.address, 'sdn', 'skyline')
+        self.daemon = cli.Daemon(api, self.stub.address, self.socket)
+        self.daemon.bind()
+        self.thread = threading.Thread(target=self.daemon.serve_forever,
+                                       args=(0.05,))
+        self.thread.start()
+
+    def test_parse_dpid(self):
+        self.assertEqual(cli.parse_dpid('00:00:00:00:00:00:00:01'),
+                         '00:00:00:00:00:00:00:01')
+        self.assertEqual(cli.parse_dpid('0x10'), 16)
+        self.assertEqual(cli.parse_dpid('3'), 3)
+
+    def test_direct(self):
+        code, datapaths = self._run('datapaths')
+        self.assertEqual(code, 0)
+        self.assertEqual([d["dpid"] for d in datapaths],
+                         self.stub.state.dpids)
+
+    def test_integer_dpid(self):
+        code, flows = self._run('flows', '1')
+        self.assertEqual(code, 0)
+        self.assertEqual(len(flows), 4)
+
+    def test_optional_argument(self):
+        code, links = self._run('links')
+        self.assertEqual(code, 0)
+        self.assertEqual(len(links), len(self.stub.state.links))
+        code, links = self._run('links', self.dpid)
+        self.assertTrue(links)
+        self.assertTrue(all(self.dpid in (l["src_dpid"], l["dst_dpid"])
+                            for l in links))
+
+    def test_add_flows_from_file(self):
+        path = os.path.join(self.tmp, 'flows.json')
+        with open(path, 'w') as f:
+            json.dump({"flows": [{"priority": 30000,
+                                  "match": [{"eth_type": "ipv4"}],
+                                  "actions": [{"output": 2}]}]}, f)
+        self.assertEqual(self._run('add-flows', self.dpid, path)[0], 0)
+        self.assertEqual(len(self.stub.state.flows[self.dpid]), 5)
+
+    def test_error(self):
+        code, value = self._run('flows', '0x99')
+        self.assertEqual(code, 1)
+        self.assertEqual(value, None)
+        self.assertTrue(self.error.startswith('Error: '))
+
+    def test_no_controller(self):
+        self.assertEqual(self._run('datapaths', controller='')[0], 1)
+
+    def test_daemon(self):
+        self._start_daemon()
+        self._run('datapaths')
+        code, flows = self._run('flows', self.dpid)
+        self.assertEqual(code, 0)
+        self.assertEqual(len(flows), 4)
+        # The daemon logged in once and served both commands
+        self.assertEqual(self.stub.requests['POST auth'], 1)
+        code, status = self._run('daemon-status')
+        self.assertEqual(status["requests"], 2)
+        self.assertEqual(status["controller"], self.stub.address)
+
+    def test_daemon_error(self):
+        self._start_daemon()
+        code, value = self._run('flows', '0x99')
+        self.assertEqual(code, 1)
+        self.assertTrue(self.error.startswith('Error: '))
+
+    def test_daemon_other_controller(self):
+        self._start_daemon()
+        other = StubController(StubState(datapaths=2)).start()
+        try:
+            code, datapaths = self._run('datapaths',
+                                        controller=other.address)
+        finally:
+            other.stop()
+        self.assertEqual(len(datapaths), 2)
+        self.assertEqual(self.daemon.requests, 0)
+
+    def test_daemon_other_user(self):
+        self._start_daemon()
+        code, datapaths = self._run('datapaths', user='admin')
+        self.assertEqual(code, 0)
+        self.assertEqual(len(datapaths), 3)
+        self.assertEqual(self.daemon.requests, 0)
+        reply = cli.request(self.socket, {"controller": self.stub.address,
+                                          "user": "admin",
+                                          "command": "datapaths"})
+        self.assertEqual(reply["error"], "WrongUser")
+        self.assertEqual(self._run('daemon-status')[1]["user"], 'sdn')
+
+    def test_socket_owned_by_other_user(self):
+        self._start_daemon()
+        with patch('hpsdnclient.cli._uid', return_value=os.getuid() + 1):
+            self.assertRaises(RuntimeError, cli.request, self.socket,
+                              {"command": "_status"})
+            code, value = self._run('datapaths')
+        self.assertEqual(code, 1)
+        self.assertTrue('owned by another user' in self.error)
+        self.assertEqual(self.daemon.requests, 0)
+
+    def test_daemon_stop(self):
+        self._start_daemon()
+        self.assertEqual(self._run('daemon-stop')[0], 0)
+        self.thread.join(5)
+        self.assertFalse(self.thread.is_alive())
+        self.assertFalse(os.path.exists(self.socket))
+        self.daemon = None
+        self.assertEqual(self._run('daemon-status')[0], 1)
+
+    def test_no_daemon(self):
+        self.assertEqual(cli.request(self.socket, {"command": "_status"}),
+                         None)
+
+
+class SocketPathTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        environ = patch.dict(os.environ)
+        environ.start()
+        self.addCleanup(environ.stop)
+        os.environ.pop('HPSDN_SOCKET', None)
+        os.environ.pop('XDG_RUNTIME_DIR', None)
+        tempdir = patch('tempfile.tempdir', self.tmp)
+        tempdir.start()
+        self.addCleanup(tempdir.stop)
+        self.directory = os.path.join(self.tmp,
+                                      'hpsdn-{0}'.format(os.getuid()))
+
+    def test_runtime_directory(self):
+        os.environ['XDG_RUNTIME_DIR'] = self.tmp
+        self.assertEqual(cli.default_socket(),
+                         os.path.join(self.tmp, 'hpsdn.sock'))
+
+    def test_private_directory(self):
+        path = cli.default_socket()
+        self.assertEqual(path, os.path.join(self.directory, 'hpsdn.sock'))
+        api = cli.connect_api('127.0.0.1', 'sdn', 'skyline')
+        daemon = cli.Daemon(api, '127.0.0.1', path)
+        daemon.bind()
+        daemon._server.server_close()
+        mode = stat.S_IMODE(os.stat(self.directory).st_mode)
+        self.assertEqual(mode, 0o700)
+
+    def test_shared_directory_refused(self):
+        os.mkdir(self.directory)
+        os.chmod(self.directory, 0o777)
+        api = cli.connect_api('127.0.0.1', 'sdn', 'skyline')
+        daemon = cli.Daemon(api, '127.0.0.1', cli.default_socket())
+        self.assertRaises(RuntimeError, daemon.bind)
@@ -14,6 +14,8 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import json
+import random
 import unittest
 import hpsdnclient.tests.data as test_data
 import hpsdnclient.datatypes as datatypes
@@ -119,6 +121,12 @@ class FactoryTests(unittest.TestCase):
         self.assertIn('self_', dir(obj))
         self.assertIn('System', datatypes.JsonObjectFactory.factories)
 
+    def test_factory_create_keywords(self):
+        data = {"self": "a", "ip": "10.0.0.1", "name": "c1"}
+        obj = datatypes.JsonObjectFactory.create('System', data)
+        self.assertEqual(obj.self_, "a")
+        self.assertEqual(obj.ip, "10.0.0.1")
+
     def test_create_license(self):
         self._test_type(test_data.LICENSE, datatypes.License)
 
@@ -223,3 +231,168 @@ class FactoryTests(unittest.TestCase):
 
     def test_create_next_hop(self):
         self._test_type(test_data.NEXT_HOP, datatypes.NextHop)
+
+
+def _attributes(cls):
+    return sorted(attr for attr in dir(cls())
+                  if not callable(getattr(cls(), attr))
+                  and not attr.startswith("__"))
+
+
+def _value(rng):
+    """ A random, non empty, match field or action value """
+    choice = rng.randint(0, 2)
+    if choice == 0:
+        return rng.randint(1, 65535)
+    if choice == 1:
+        return "10.0.{0}.{1}".format(rng.randint(0, 255), rng.randint(1, 254))
+    return {"eth_dst": "00:00:00:00:00:{0:02x}".format(rng.randint(1, 255))}
+
+
+def _entries(items):
+    return sorted(json.dumps(item, sort_keys=True) for item in items)
+
+
+def _values(items, key):
+    return [item[key] for item in items if key in item]
+
+
+class FlowFactoryTests(unittest.TestCase):
+    """ Tests decoding flows from the controller's wire format """
+
+    def test_single_actions(self):
+        flow = datatypes.Flow.factory({"actions": [{"push_vlan": 33024},
+                                                   {"output": 1},
+                                                   {"output": 2}]})
+        self.assertEqual(flow.actions.push_vlan, 33024)
+        self.assertEqual(flow.actions.output, [1, 2])
+
+    def test_repeated_actions(self):
+        flow = datatypes.Flow.factory({"actions": [
+            {"set_field": {"eth_dst": "00:00:00:00:00:01"}},
+            {"set_field": {"ipv4_dst": "10.0.0.1"}},
+            {"output": 3}]})
+        self.assertEqual(flow.actions.set_field,
+                         [{"eth_dst": "00:00:00:00:00:01"},
+                          {"ipv4_dst": "10.0.0.1"}])
+        self.assertEqual(flow.actions.output, 3)
+
+    def test_list_value_not_repeated(self):
+        flow = datatypes.Flow.factory({"actions": [{"output": [1, 2]}]})
+        self.assertEqual(flow.actions.output, [1, 2])
+
+    def test_data_not_modified(self):
+        data = json.loads(json.dumps(test_data.FLOW_MA))
+        datatypes.Flow.factory(data)
+        self.assertEqual(data, test_data.FLOW_MA)
+
+    def test_instructions(self):
+        flow = datatypes.Flow.factory({"instructions": [
+            {"apply_actions": [{"output": 1}]}, {"meter": 5}]})
+        self.assertTrue(all(isinstance(i, datatypes.Instruction)
+                            for i in flow.instructions))
+        self.assertEqual(flow.instructions[0].apply_actions, [{"output": 1}])
+        self.assertEqual(flow.instructions[1].meter, 5)
+
+    def test_objects_kept(self):
+        match = datatypes.Match(in_port=1)
+        actions = datatypes.Action(output=2)
+        flow = datatypes.Flow.factory({"match": match, "actions": actions})
+        self.assertTrue(flow.match is match)
+        self.assertTrue(flow.actions is actions)
+
+    def test_match_round_trip(self):
+        rng = random.Random(48)
+        fields = _attributes(datatypes.Match)
+        for _ in range(200):
+            match = [{name: _value(rng)}
+                     for name in rng.sample(fields, rng.randint(1, 10))]
+            flow = datatypes.Flow.factory({"match": match})
+            self.assertEqual(_entries(flow.match.to_dict()), _entries(match))
+
+    def test_action_round_trip(self):
+        rng = random.Random(49)
+        names = _attributes(datatypes.Action)
+        for _ in range(200):
+            actions = [{rng.choice(names): _value(rng)}
+                       for _ in range(rng.randint(1, 12))]
+            flow = datatypes.Flow.factory({"actions": actions})
+            result = flow.actions.to_dict()
+            # Every action is kept, as often as it was sent
+            self.assertEqual(_entries(result), _entries(actions))
+            # Actions of the same type stay in order
+            for name in names:
+                self.assertEqual(_values(result, name),
+                                 _values(actions, name))
+
+
+class ActionListTests(unittest.TestCase):
+    """ Tests the ActionList Class """
+
+    def setUp(self):
+        self.wire = [{"set_field": {"eth_dst": "00:00:00:00:00:01"}},
+                     {"output": 1},
+                     {"set_field": {"vlan_vid": 10}},
+                     {"output": 2}]
+
+    def test_from_dicts(self):
+        actions = datatypes.ActionList.from_dicts(self.wire)
+        self.assertEqual(actions.to_dict(), self.wire)
+        self.assertEqual(actions.values("output"), [1, 2])
+        self.assertEqual(actions, datatypes.ActionList(self.wire))
+
+    def test_pairs(self):
+        actions = datatypes.ActionList([("push_vlan", 33024), ("output", 1)])
+        self.assertEqual(actions.to_dict(),
+                         [{"push_vlan": 33024}, {"output": 1}])
+        self.assertRaises(TypeError, datatypes.ActionList, [("output",)])
+        self.assertRaises(TypeError, datatypes.ActionList, ["output"])
+
+    def test_from_action(self):
+        action = datatypes.Action(output=[1, 2], push_vlan=33024)
+        actions = datatypes.ActionList(action)
+        self.assertEqual(sorted(actions), sorted(
+            [("output", 1), ("output", 2), ("push_vlan", 33024)]))
+
+    def test_hash(self):
+        a = datatypes.ActionList.from_dicts(self.wire)
+        b = datatypes.ActionList.from_dicts(json.loads(json.dumps(self.wire)))
+        self.assertEqual(hash(a), hash(b))
+        self.assertEqual(len(set([a, b])), 1)
+        reordered = datatypes.ActionList(list(reversed(self.wire)))
+        self.assertNotEqual(a, reordered)
+        self.assertEqual(hash(datatypes.ActionList([("output", 1)])),
+                         hash((("output", 1),)))
+
+    def test_flow_to_dict(self):
+        flow = datatypes.Flow(
+            priority=100, actions=datatypes.ActionList(self.wire),
+            instructions=[datatypes.Instruction(
+                apply_actions=datatypes.ActionList([("output", 3)]))])
+        data = json.loads(json.dumps(flow.to_dict()))
+        self.assertEqual(data["actions"], self.wire)
+        self.assertEqual(data["instructions"][0]["apply_actions"],
+                         [{"output": 3}])
+        self.assertTrue(isinstance(datatypes.Flow.factory(data).actions,
+                                   datatypes.Action))
+
+    def test_decode_action_lists(self):
+        flow = datatypes.decode_action_lists({
+            "priority": 1, "actions": self.wire,
+            "instructions": [{"write_actions": [{"output": 3}]},
+                             {"meter": 1}]})
+        self.assertEqual(flow["actions"],
+                         datatypes.ActionList.from_dicts(self.wire))
+        self.assertEqual(flow["instructions"][0]["write_actions"],
+                         (("output", 3),))
+        group = datatypes.decode_action_lists(
+            json.loads(json.dumps(test_data.GROUP)))
+        group = datatypes.Group.factory(group)
+        self.assertEqual(group.buckets[0].actions, (("output", 24),))
+        self.assertEqual(group.to_dict()["buckets"][0]["actions"],
+                         [{"output": 24}])
+
+    def test_bucket(self):
+        bucket = datatypes.Bucket(
+            weight=1, actions=datatypes.ActionList([("output", 4)]))
+        self.assertEqual(bucket.to_dict()["actions"], [{"output": 4}])
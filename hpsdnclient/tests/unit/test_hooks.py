@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import json
+import unittest
+#PY3.3
+try:
+    from unittest.mock import MagicMock
+except ImportError:
+    from mock import MagicMock
+
+import requests
+
+from hpsdnclient.auth import XAuthToken
+from hpsdnclient.datatypes import Datapath
+from hpsdnclient.hooks import Hook, TemplateCache, url_template
+from hpsdnclient.rest import RestClient
+from hpsdnclient.tests.data import DATAPATH
+
+BASE_URL = 'https://10.10.10.10:8443/sdn/v2.0/'
+DPID = '00%3A00%3A00%3A00%3A00%3A00%3A00%3A01'
+
+
+def _response(status_code, body=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers['Content-Type'] = 'application/json'
+    response._content = json.dumps(body or {}).encode('UTF-8')
+    response._content_consumed = True
+    return response
+
+
+class RecordingHook(Hook):
+    def __init__(self):
+        self.before = []
+        self.after = []
+
+    def before_request(self, info):
+        self.before.append(info.template)
+
+    def after_request(self, info):
+        self.after.append(info)
+
+
+class UrlTemplateTests(unittest.TestCase):
+    def test_url_template(self):
+        cases = {
+            'of/datapaths/' + DPID + '/flows': 'of/datapaths/{dpid}/flows',
+            'of/datapaths/' + DPID + '/meters/7':
+            'of/datapaths/{dpid}/meters/{meter}',
+            'of/stats/ports?dpid=' + DPID + '&port_id=1': 'of/stats/ports',
+            'apps/com.hp.sdn.app/health': 'apps/{app}/health',
+            'licenses/installid': 'licenses/installid',
+            'net/clusters/12/tree': 'net/clusters/{cluster}/tree',
+            'diag/packets/1234/path': 'diag/packets/{packet}/path',
+            'net/nodes': 'net/nodes',
+            'foo/00:00:00:00:00:00:00:01': 'foo/{id}',
+        }
+        for path, template in cases.items():
+            self.assertEqual(url_template(BASE_URL + path), template)
+        self.assertEqual(url_template('http://foo.bar'), '/')
+
+    def test_template_cache(self):
+        cache = TemplateCache(size=1)
+        url = BASE_URL + 'of/datapaths/' + DPID
+        self.assertEqual(cache(url), 'of/datapaths/{dpid}')
+        self.assertEqual(cache(url), 'of/datapaths/{dpid}')
+        cache(BASE_URL + 'net/nodes')
+        self.assertEqual(len(cache._cache), 1)
+
+
+class RestClientHookTests(unittest.TestCase):
+    def setUp(self):
+        self.hook = RecordingHook()
+        auth = XAuthToken('10.10.10.10', 'sdn', 'skyline')
+        self.client = RestClient(auth, hooks=[self.hook])
+
+    def test_get(self):
+        response = _response(200, {"datapath": DATAPATH})
+        self.client._get = MagicMock(return_value=response)
+        url = BASE_URL + 'of/datapaths/' + DPID
+        result = self.client.get(url)
+        self.assertTrue(isinstance(result, Datapath))
+        self.assertEqual(self.hook.before, ['of/datapaths/{dpid}'])
+        info = self.hook.after[0]
+        self.assertEqual(info.method, 'GET')
+        self.assertEqual(info.url, url)
+        self.assertEqual(info.status, 200)
+        self.assertEqual(info.bytes_in, len(response.content))
+        self.assertTrue(info.decode_time >= 0)
+        self.assertTrue(info.latency >= info.decode_time)
+        self.assertEqual(info.error, None)
+
+    def test_post(self):
+        self.client._post = MagicMock(return_value=_response(201))
+        self.client.post(BASE_URL + 'of/datapaths/' + DPID + '/flows',
+                         '{"flow": {}}')
+        info = self.hook.after[0]
+        self.assertEqual(info.method, 'POST')
+        self.assertEqual(info.template, 'of/datapaths/{dpid}/flows')
+        self.assertEqual(info.bytes_out, len('{"flow": {}}'))
+        self.assertEqual(info.decode_time, None)
+
+    def test_error_status(self):
+        self.client._delete = MagicMock(return_value=_response(503))
+        self.assertRaises(requests.HTTPError, self.client.delete,
+                          BASE_URL + 'apps/x')
+        info = self.hook.after[0]
+        self.assertEqual(info.status, 503)
+        self.assertTrue(isinstance(info.error, requests.HTTPError))
+
+    def test_connection_error(self):
+        self.client._head = MagicMock(side_effect=requests.ConnectionError())
+        self.assertRaises(requests.ConnectionError, self.client.head,
+                          BASE_URL + 'net/nodes')
+        info = self.hook.after[0]
+        self.assertEqual(info.status, None)
+        self.assertTrue(isinstance(info.error, requests.ConnectionError))
+        data = json.loads(json.dumps(info.to_dict()))
+        self.assertEqual(data["error"], 'ConnectionError')
+        self.assertEqual(data["error_message"], str(info.error))
+
+    def test_no_hooks(self):
+        self.client.hooks = []
+        self.client._put = MagicMock(return_value=_response(200))
+        self.client.put(BASE_URL + 'apps/x/action', 'start')
+        self.assertEqual(self.hook.after, [])
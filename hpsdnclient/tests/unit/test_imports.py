@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import subprocess
+import sys
+import unittest
+
+import hpsdnclient
+
+
+def imported_modules(statement):
+    """ Returns the modules imported by running statement in a new
+    interpreter, using -X importtime where it is available """
+    if sys.version_info >= (3, 7):
+        output = subprocess.check_output(
+            [sys.executable, '-X', 'importtime', '-c', statement],
+            stderr=subprocess.STDOUT).decode('utf-8')
+        return set(line.split('|')[-1].strip()
+                   for line in output.splitlines()
+                   if line.startswith('import time:'))
+    output = subprocess.check_output(
+        [sys.executable, '-c',
+         statement + '\nimport sys\nprint("\\n".join(sys.modules))'])
+    return set(output.decode('utf-8').split())
+
+
+class ImportTests(unittest.TestCase):
+    def test_package_is_light(self):
+        if sys.version_info < (3, 7):
+            self.skipTest("Module __getattr__ needs Python 3.7")
+        modules = imported_modules('import hpsdnclient')
+        self.assertNotIn('requests', modules)
+        self.assertNotIn('hpsdnclient.datatypes', modules)
+        self.assertNotIn('hpsdnclient.rest', modules)
+
+    def test_datatypes_without_requests(self):
+        modules = imported_modules('import hpsdnclient.datatypes')
+        self.assertIn('hpsdnclient.datatypes', modules)
+        if sys.version_info >= (3, 7):
+            self.assertNotIn('requests', modules)
+
+    def test_rest_without_timing(self):
+        modules = imported_modules('import hpsdnclient.rest')
+        self.assertNotIn('hpsdnclient.timing', modules)
+        self.assertNotIn('cProfile', modules)
+
+    def test_metrics_without_timing(self):
+        modules = imported_modules('import hpsdnclient.metrics')
+        self.assertNotIn('hpsdnclient.timing', modules)
+        self.assertNotIn('cProfile', modules)
+
+    def test_lazy_attributes(self):
+        from hpsdnclient.api import Api
+        from hpsdnclient.auth import XAuthToken
+        from hpsdnclient.team import TeamApi
+        self.assertTrue(hpsdnclient.Api is Api)
+        self.assertTrue(hpsdnclient.XAuthToken is XAuthToken)
+        self.assertTrue(hpsdnclient.TeamApi is TeamApi)
+        self.assertIn('Api', dir(hpsdnclient))
+        self.assertRaises(AttributeError, getattr, hpsdnclient, 'Nope')
+        # Submodules resolve in a fresh interpreter, before and after the
+        # lazy classes
+        output = subprocess.check_output(
+            [sys.executable, '-c',
+             'import hpsdnclient as hp\n'
+             'print(hp.datatypes.__name__)\n'
+             'hp.XAuthToken\n'
+             'print(hp.error.__name__)\n'
+             'print(hp.utils.__name__)\n'])
+        self.assertEqual(output.decode('utf-8').split(),
+                         ['hpsdnclient.datatypes', 'hpsdnclient.error',
+                          'hpsdnclient.utils'])
+
+    def test_submodules_import_alone(self):
+        for module in ('core', 'net', 'of', 'team', 'watch'):
+            subprocess.check_call(
+                [sys.executable, '-c', 'import hpsdnclient.' + module])
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+from hpsdnclient.logs import LogArchive, LogMatch
+
+
+def _member(lines):
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr('logs/', b'')
+        z.writestr('logs/sdn.log', '\n'.join(lines).encode('utf-8'))
+        z.writestr('logs/audit.txt', b'ERROR not a log\n')
+    return data.getvalue()
+
+
+class LogArchiveTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'logs.zip')
+        with zipfile.ZipFile(self.path, 'w') as z:
+            z.writestr('readme.txt', b'team logs')
+            # One member stored, one compressed
+            info = zipfile.ZipInfo('10.0.0.1.zip')
+            info.compress_type = zipfile.ZIP_STORED
+            z.writestr(info, _member(['INFO start', 'ERROR disk full',
+                                      'INFO stop']))
+            info = zipfile.ZipInfo('10.0.0.2.zip')
+            info.compress_type = zipfile.ZIP_DEFLATED
+            z.writestr(info, _member(['ERROR boom'] +
+                                     ['INFO line {0}'.format(i)
+                                      for i in range(1000)]))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_members(self):
+        archive = LogArchive(self.path)
+        self.assertEqual(archive.members(), ['10.0.0.1.zip', '10.0.0.2.zip'])
+
+    def test_log_files(self):
+        archive = LogArchive(self.path)
+        for member in archive.members():
+            self.assertEqual(archive.log_files(member, '*.log'),
+                             ['logs/sdn.log'])
+            self.assertEqual(len(archive.log_files(member)), 2)
+
+    def test_lines(self):
+        archive = LogArchive(self.path)
+        self.assertEqual(list(archive.lines('10.0.0.1.zip', 'logs/sdn.log')),
+                         ['INFO start', 'ERROR disk full', 'INFO stop'])
+
+    def test_tail(self):
+        archive = LogArchive(self.path)
+        self.assertEqual(archive.tail('10.0.0.2.zip', 'logs/sdn.log', 2),
+                         ['INFO line 998', 'INFO line 999'])
+
+    def test_search(self):
+        archive = LogArchive(self.path)
+        matches = archive.search('ERROR', files='*.log')
+        self.assertEqual(matches, [
+            LogMatch('10.0.0.1.zip', 'logs/sdn.log', 2, 'ERROR disk full'),
+            LogMatch('10.0.0.2.zip', 'logs/sdn.log', 1, 'ERROR boom')])
+
+    def test_search_all_files(self):
+        archive = LogArchive(self.path)
+        matches = archive.search('^ERROR', workers=1)
+        self.assertEqual(len(matches), 4)
+        self.assertEqual([m.member for m in matches],
+                         ['10.0.0.1.zip', '10.0.0.1.zip',
+                          '10.0.0.2.zip', '10.0.0.2.zip'])
+
+    def test_search_max_matches(self):
+        archive = LogArchive(self.path)
+        matches = archive.search('INFO', members=['10.0.0.2.zip'],
+                                 max_matches=3)
+        self.assertEqual([m.lineno for m in matches], [2, 3, 4])
+
+    def test_search_errors(self):
+        archive = LogArchive(self.path)
+        self.assertRaises(KeyError, archive.search, 'x',
+                          members=['10.0.0.9.zip'])
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import random
+import unittest
+
+from hpsdnclient.hooks import RequestInfo
+from hpsdnclient.metrics import Histogram, MetricsCollector
+
+
+def _info(method, template, latency, status=200, decode_time=None):
+    info = RequestInfo(method, 'http://foo.bar', template, 10)
+    info.status = status
+    info.latency = latency
+    info.decode_time = decode_time
+    info.bytes_in = 100
+    info.phases = {'connect': None, 'wait': latency / 2}
+    return info
+
+
+class HistogramTests(unittest.TestCase):
+    def test_exact_small_values(self):
+        histogram = Histogram()
+        for i in range(1, 101):
+            histogram.record(i * 1e-6)
+        self.assertAlmostEqual(histogram.quantile(0.5), 50e-6)
+        self.assertAlmostEqual(histogram.quantile(1.0), 100e-6)
+        self.assertEqual(histogram.count, 100)
+
+    def test_relative_error(self):
+        rng = random.Random(42)
+        values = sorted(rng.expovariate(10.0) for _ in range(5000))
+        histogram = Histogram()
+        for value in values:
+            histogram.record(value)
+        for q in (0.5, 0.9, 0.99, 0.999):
+            expected = values[int(q * len(values)) - 1]
+            self.assertTrue(abs(histogram.quantile(q) - expected) <=
+                            expected * 0.02 + 1e-6)
+        self.assertEqual(histogram.quantile(1.0), values[-1])
+        # Far fewer buckets than values
+        self.assertTrue(len(histogram.counts) < 1000)
+
+    def test_bucket_bounds(self):
+        histogram = Histogram(bits=4)
+        for value in range(0, 5000):
+            low, high = histogram._bounds(histogram._index(value))
+            self.assertTrue(low <= value <= high)
+
+    def test_empty(self):
+        histogram = Histogram()
+        self.assertEqual(histogram.quantile(0.5), None)
+        self.assertEqual(histogram.to_dict()["mean"], None)
+
+    def test_cumulative(self):
+        histogram = Histogram()
+        for value in (0.001, 0.002, 0.2, 3.0):
+            histogram.record(value)
+        self.assertEqual(histogram.cumulative([0.005, 0.5, 5.0]), [2, 3, 4])
+
+
+class MetricsCollectorTests(unittest.TestCase):
+    def setUp(self):
+        self.metrics = MetricsCollector()
+        self.metrics.after_request(_info('GET', 'of/datapaths', 0.01, 200,
+                                         0.002))
+        self.metrics.after_request(_info('GET', 'of/datapaths', 0.3, 503))
+        self.metrics.after_request(_info('POST', 'of/datapaths/{dpid}/flows',
+                                         0.02, 201))
+
+    def test_to_dict(self):
+        stats = self.metrics.to_dict()
+        self.assertEqual(sorted(stats), ['GET of/datapaths',
+                                         'POST of/datapaths/{dpid}/flows'])
+        get = stats['GET of/datapaths']
+        self.assertEqual(get["latency"]["count"], 2)
+        self.assertEqual(get["decode"]["count"], 1)
+        self.assertEqual(get["statuses"], {200: 1, 503: 1})
+        self.assertEqual(get["bytes_in"], 200)
+        self.assertEqual(get["bytes_out"], 20)
+        self.assertEqual(list(get["phases"]), ['wait'])
+        self.assertEqual(get["phases"]["wait"]["count"], 2)
+
+    def test_to_prometheus(self):
+        text = self.metrics.to_prometheus(buckets=(0.1, 1.0))
+        lines = text.splitlines()
+        self.assertTrue('# TYPE hpsdnclient_request_duration_seconds '
+                        'histogram' in lines)
+        labels = 'method="GET",endpoint="of/datapaths"'
+        self.assertTrue('hpsdnclient_request_duration_seconds_bucket{' +
+                        labels + ',le="0.1"} 1' in lines)
+        self.assertTrue('hpsdnclient_request_duration_seconds_bucket{' +
+                        labels + ',le="+Inf"} 2' in lines)
+        self.assertTrue('hpsdnclient_request_duration_seconds_count{' +
+                        labels + '} 2' in lines)
+        self.assertTrue('hpsdnclient_request_phase_seconds_count{' +
+                        labels + ',phase="wait"} 2' in lines)
+        self.assertTrue('hpsdnclient_requests_total{' + labels +
+                        ',status="503"} 1' in lines)
+
+    def test_reset(self):
+        self.metrics.reset()
+        self.assertEqual(self.metrics.to_dict(), {})
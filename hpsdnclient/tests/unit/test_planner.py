@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import copy
+import threading
+import time
+import unittest
+
+from hpsdnclient.api import Api
+from hpsdnclient.auth import XAuthToken
+from hpsdnclient.datatypes import (Action, ActionList, Bucket, Flow, Group,
+                                   Instruction, Match, Meter)
+from hpsdnclient.planner import Plan, flow_dependencies, group_dependencies
+from hpsdnclient.tests.stub import StubController, StubState
+
+
+def _flow(port, group=None, meter=None):
+    instructions = []
+    if meter is not None:
+        instructions.append(Instruction(meter=meter))
+    if group is not None:
+        instructions.append(Instruction(apply_actions=[Action(group=group)]))
+    return Flow(priority=30000,
+                match=Match(eth_type="ipv4",
+                            ipv4_src="10.9.9.{0}".format(port)),
+                instructions=instructions)
+
+
+def _group(group_id, *groups):
+    buckets = [Bucket(actions=[Action(group=g)]) for g in groups]
+    return Group(id=group_id, type="all",
+                 buckets=buckets or [Bucket(actions=[Action(output=1)])])
+
+
+class RecordingApi(object):
+    """ Records the order of the calls made by a Plan """
+    def __init__(self, fail=None):
+        self.calls = []
+        self.fail = fail
+        self._lock = threading.Lock()
+
+    def _record(self, name, dpid, item):
+        time.sleep(0.005)
+        with self._lock:
+            self.calls.append((name, dpid, item))
+        if self.fail == (name, dpid):
+            raise ValueError("failed")
+
+    def add_group(self, dpid, group):
+        self._record('add_group', dpid, group.id)
+
+    def add_meter(self, dpid, meter):
+        self._record('add_meter', dpid, meter.id)
+
+    def add_flows(self, dpid, flows):
+        self._record('add_flows', dpid, len(flows))
+
+    def delete_flows(self, dpid, flows):
+        self._record('delete_flows', dpid, len(flows))
+
+    def delete_groups(self, dpid, group_id):
+        self._record('delete_groups', dpid, group_id)
+
+    def delete_meter(self, dpid, meter_id):
+        self._record('delete_meter', dpid, meter_id)
+
+    def order(self, dpid):
+        return [(name, item) for name, d, item in self.calls if d == dpid]
+
+
+class DependencyTests(unittest.TestCase):
+    def test_flow_dependencies(self):
+        flow = _flow(1, group=6, meter=2)
+        flow.actions = [Action(output=1), Action(group="5")]
+        self.assertEqual(flow_dependencies(flow), (set([5, 6]), set([2])))
+
+    def test_flow_dependencies_dicts(self):
+        flow = Flow(actions=[{"output": 1}, {"group": 5}],
+                    instructions=[{"meter": 2},
+                                  {"write_actions": [{"group": 7}]}])
+        self.assertEqual(flow_dependencies(flow), (set([5, 7]), set([2])))
+
+    def test_flow_dependencies_action_lists(self):
+        flow = Flow(actions=ActionList([("group", 5), ("output", 1)]),
+                    instructions=[Instruction(apply_actions=ActionList(
+                        [("group", 7), ("group", 8)]))])
+        self.assertEqual(flow_dependencies(flow), (set([5, 7, 8]), set()))
+
+    def test_repeated_group_actions(self):
+        flow = Flow.factory({"priority": 1,
+                             "actions": [{"group": 1}, {"group": 2}]})
+        self.assertEqual(flow.actions.group, [1, 2])
+        self.assertEqual(flow_dependencies(flow), (set([1, 2]), set()))
+        group = Group.factory({"id": 3, "type": "all", "buckets": [
+            {"actions": [{"group": 4}, {"group": 5}]}]})
+        self.assertEqual(group_dependencies(group), set([4, 5]))
+
+    def test_flow_without_dependencies(self):
+        flow = Flow(actions=Action(output=1))
+        self.assertEqual(flow_dependencies(flow), (set(), set()))
+
+    def test_group_dependencies(self):
+        group = _group(1, 2, 3)
+        group.buckets.append({"watch_group": 4, "actions": []})
+        self.assertEqual(group_dependencies(group), set([2, 3, 4]))
+
+
+class PlanTests(unittest.TestCase):
+    def setUp(self):
+        self.plan = Plan()
+        self.dpid = '00:00:00:00:00:00:00:01'
+        self.plan.add(self.dpid, _flow(1, group=1), _flow(2, meter=9),
+                      _flow(3), [_group(1, 2), _group(2, 3), _group(3)],
+                      Meter(id=9))
+
+    def _shape(self, layers):
+        return [sorted((c.kind, c.item_id if c.kind != 'flow'
+                        else len(c.item)) for c in layer)
+                for layer in layers]
+
+    def test_layers(self):
+        self.assertEqual(self._shape(self.plan.layers(self.dpid)), [
+            [('flow', 1), ('group', 3), ('meter', 9)],
+            [('flow', 1), ('group', 2)],
+            [('group', 1)],
+            [('flow', 1)]])
+
+    def test_remove_layers(self):
+        layers = self.plan.layers(1, remove=True)
+        self.assertEqual(self._shape(layers)[0], [('flow', 1)])
+        self.assertEqual(self._shape(layers)[-1],
+                         [('flow', 1), ('group', 3), ('meter', 9)])
+        self.assertTrue(all(c.action == 'delete' for l in layers for c in l))
+
+    def test_repeated_group_actions(self):
+        plan = Plan()
+        plan.add(1, Flow.factory({"priority": 1, "actions": [{"group": 1},
+                                                             {"group": 2}]}),
+                 Group.factory({"id": 3, "type": "all", "buckets": [
+                     {"actions": [{"group": 4}, {"group": 5}]}]}),
+                 [_group(1), _group(2), _group(4), _group(5)])
+        self.assertEqual(self._shape(plan.layers(1)), [
+            [('group', 1), ('group', 2), ('group', 4), ('group', 5)],
+            [('flow', 1), ('group', 3)]])
+
+    def test_cycle(self):
+        self.plan.add(self.dpid, _group(3, 1))
+        self.assertRaises(ValueError, self.plan.layers, self.dpid)
+
+    def test_external_dependencies(self):
+        plan = Plan()
+        plan.add(2, _flow(1, group=40, meter=41), _group(5, 40))
+        self.assertEqual(len(plan.layers(2)), 1)
+
+    def test_unknown_item(self):
+        self.assertRaises(TypeError, self.plan.add, self.dpid, Match())
+
+    def test_install_order(self):
+        self.plan.add(2, _flow(1, group=8), _group(8))
+        api = RecordingApi()
+        self.plan.install(api)
+        order = api.order(self.dpid)
+        self.assertEqual(len(order), 7)
+        position = dict((call, i) for i, call in enumerate(order))
+        self.assertTrue(position[('add_group', 3)] <
+                        position[('add_group', 2)] <
+                        position[('add_group', 1)])
+        self.assertTrue(position[('add_group', 1)] < len(order) - 1)
+        self.assertEqual(order[-1], ('add_flows', 1))
+        self.assertEqual(api.order(2), [('add_group', 8), ('add_flows', 1)])
+
+    def test_remove_order(self):
+        api = RecordingApi()
+        self.plan.remove(api)
+        order = api.order(self.dpid)
+        self.assertEqual(order[0], ('delete_flows', 1))
+        position = dict((call, i) for i, call in enumerate(order))
+        self.assertTrue(position[('delete_groups', 1)] <
+                        position[('delete_groups', 2)] <
+                        position[('delete_groups', 3)])
+
+    def test_install_failure(self):
+        api = RecordingApi(fail=('add_group', self.dpid))
+        self.assertRaises(ValueError, self.plan.install, api)
+        # Later layers are not installed
+        self.assertFalse(('add_group', 1) in api.order(self.dpid))
+
+
+class PlanStubTests(unittest.TestCase):
+    def test_install_and_remove(self):
+        stub = StubController(StubState(datapaths=3, flows=2)).start()
+        try:
+            api = Api(stub.address,
+                      XAuthToken(stub.address, 'sdn', 'skyline'))
+            before = copy.deepcopy((stub.state.flows, stub.state.groups,
+                                    stub.state.meters))
+            plan = Plan()
+            for d in stub.state.dpids:
+                plan.add(d, _flow(1, group=1, meter=2), _group(1, 3),
+                         _group(3), Meter(id=2))
+            plan.install(api)
+            for d in stub.state.dpids:
+                self.assertEqual(sorted(stub.state.groups[d]), [1, 3])
+                self.assertEqual(sorted(stub.state.meters[d]), [2])
+                self.assertEqual(len(stub.state.flows[d]), 3)
+            plan.remove(api)
+            self.assertEqual((stub.state.flows, stub.state.groups,
+                              stub.state.meters), before)
+        finally:
+            stub.stop()
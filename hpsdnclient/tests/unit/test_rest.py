@@ -18,6 +18,7 @@ import json
 import os
 import re
 import unittest
+import zlib
 #PY3.3
 import io
 try:
@@ -28,11 +29,22 @@ except ImportError:
 import httpretty
 import requests
 
+from hpsdnclient.api import Api
 from hpsdnclient.auth import XAuthToken
-from hpsdnclient.datatypes import Datapath
+from hpsdnclient.datatypes import Action, Datapath, Flow, Match
 from hpsdnclient.error import NotFound
-from hpsdnclient.rest import RestClient, UA
+from hpsdnclient.hooks import Hook
+from hpsdnclient.rest import RestClient, UA, encode_body, gzip_body
 from hpsdnclient.tests.data import AUTH, DATAPATH
+from hpsdnclient.tests.stub import StubController, StubState
+
+
+class RecordingHook(Hook):
+    def __init__(self):
+        self.infos = []
+
+    def after_request(self, info):
+        self.infos.append(info)
 
 
 class RestClientTests(unittest.TestCase):
@@ -122,7 +134,7 @@ class RestClientTests(unittest.TestCase):
         self.assertEqual(response.request.headers['content-type'],
                          'application/json')
         self.assertEqual(response.request.body,
-                         json.dumps({"some": "data"}))
+                         json.dumps({"some": "data"}).encode('utf-8'))
 
     @httpretty.activate
     def test__post_json(self):
@@ -143,7 +155,7 @@ class RestClientTests(unittest.TestCase):
         self.assertEqual(response.request.headers['content-type'],
                          'application/json')
         self.assertEqual(response.request.body,
-                         json.dumps({"some": "data"}))
+                         json.dumps({"some": "data"}).encode('utf-8'))
 
     @httpretty.activate
     def test__post_file(self):
@@ -206,7 +218,7 @@ class RestClientTests(unittest.TestCase):
         self.assertEqual(response.request.headers['content-type'],
                          'application/json')
         self.assertEqual(response.request.body,
-                         json.dumps({"some": "data"}))
+                         json.dumps({"some": "data"}).encode('utf-8'))
 
     @httpretty.activate
     def test__head(self):
@@ -353,3 +365,101 @@ class RestClientTests(unittest.TestCase):
         self.client._head.assert_called_with('http://foo.bar')
 
         self.assertTrue(isinstance(r, requests.Response))
+
+
+class EncodeBodyTests(unittest.TestCase):
+    def test_text(self):
+        self.assertEqual(encode_body(u'{"name": "caf\xe9"}'),
+                         b'{"name": "caf\xc3\xa9"}')
+
+    def test_bytes_unchanged(self):
+        for body in (b'{}', bytearray(b'{}'), memoryview(b'{}')):
+            self.assertTrue(encode_body(body) is body)
+
+    def test_memoryview_cast(self):
+        body = memoryview(bytearray(range(8))).cast('I')
+        encoded = encode_body(body)
+        self.assertEqual(len(encoded), 8)
+        self.assertEqual(encoded.tobytes(), bytes(bytearray(range(8))))
+
+    def test_empty(self):
+        self.assertEqual(encode_body(memoryview(b'')), b'')
+        self.assertEqual(encode_body(bytearray()), b'')
+        self.assertEqual(encode_body(None), None)
+
+
+class CompressionTests(unittest.TestCase):
+    def _start(self, gzip):
+        self.stub = StubController(StubState(datapaths=1, flows=50),
+                                   gzip=gzip).start()
+        self.addCleanup(self.stub.stop)
+        self.auth = XAuthToken(self.stub.address, 'sdn', 'skyline')
+        self.hook = RecordingHook()
+        self.api = Api(self.stub.address, self.auth, compress=512,
+                       hooks=[self.hook])
+        self.dpid = self.stub.state.dpids[0]
+        self.flows = [Flow(priority=100 + i, idle_timeout=30,
+                           match=Match(in_port=1, eth_type="ipv4",
+                                       ipv4_dst="10.0.{0}.1".format(i)),
+                           actions=Action(output=2))
+                      for i in range(20)]
+
+    def _last(self, method):
+        return [i for i in self.hook.infos if i.method == method][-1]
+
+    def test_gzip_body(self):
+        body = json.dumps({"flows": list(range(1000))}).encode('utf-8')
+        compressed = gzip_body(body)
+        self.assertTrue(len(compressed) < len(body))
+        self.assertEqual(zlib.decompress(compressed, 16 + zlib.MAX_WBITS),
+                         body)
+
+    def test_accepts_gzip(self):
+        self._start(False)
+        self.assertTrue('gzip' in UA['accept-encoding'])
+
+    def test_compressed_body(self):
+        self._start(True)
+        self.api.get_datapaths()
+        received = self.stub.bytes_received
+        self.api.add_flows(self.dpid, self.flows)
+        self.assertEqual(len(self.stub.state.flows[self.dpid]), 70)
+        info = self._last('POST')
+        self.assertEqual(info.bytes_out, self.stub.bytes_received - received)
+        self.assertTrue(info.bytes_out <
+                        len(json.dumps({"flows": [f.to_dict()
+                                                  for f in self.flows]})))
+
+    def test_small_body_uncompressed(self):
+        self._start(False)
+        self.api.add_flows(self.dpid, self.flows[0])
+        self.assertEqual(len(self.stub.state.flows[self.dpid]), 51)
+        self.assertEqual(self.api.restclient._uncompressed, set())
+
+    def test_refused_falls_back(self):
+        self._start(False)
+        self.api.add_flows(self.dpid, self.flows[:10])
+        self.api.add_flows(self.dpid, self.flows[10:])
+        self.assertEqual(len(self.stub.state.flows[self.dpid]), 70)
+        # Only the first request was refused and sent again
+        self.assertEqual(
+            self.stub.requests['POST of/datapaths/{dpid}/flows'], 3)
+        host = self.stub.address.split('://')[1]
+        self.assertEqual(self.api.restclient._uncompressed, set([host]))
+
+    def test_compressed_response(self):
+        self._start(True)
+        self.api.get_datapaths()
+        sent = self.stub.bytes_sent
+        flows = self.api.get_flows(self.dpid)
+        self.assertEqual(len(flows), 50)
+        info = self._last('GET')
+        self.assertEqual(info.bytes_in, self.stub.bytes_sent - sent)
+        uncompressed = json.dumps({"flows": self.stub.state.flows[self.dpid],
+                                   "version": "1.0.0"})
+        self.assertTrue(info.bytes_in < len(uncompressed) / 2)
+
+    def test_download_not_encoded(self):
+        self._start(True)
+        args = self.api.restclient._download_args()
+        self.assertEqual(args["headers"]["accept-encoding"], 'identity')
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import unittest
+#PY3.3
+try:
+    from unittest.mock import MagicMock, patch
+except ImportError:
+    from mock import MagicMock, patch
+
+import requests
+
+from hpsdnclient.auth import XAuthToken
+from hpsdnclient.rest import RestClient
+from hpsdnclient.retry import RetryPolicy
+
+
+def _response(status_code, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    if headers:
+        response.headers.update(headers)
+    return response
+
+
+@patch('hpsdnclient.retry.time.sleep')
+class RetryPolicyTests(unittest.TestCase):
+    def setUp(self):
+        self.policy = RetryPolicy(max_attempts=3, backoff=0.1, jitter=False)
+
+    def test_is_retryable(self, sleep):
+        self.assertTrue(self.policy.is_retryable('GET'))
+        self.assertTrue(self.policy.is_retryable('put'))
+        self.assertTrue(self.policy.is_retryable('DELETE'))
+        self.assertFalse(self.policy.is_retryable('POST'))
+        self.assertTrue(self.policy.is_retryable('POST', idempotent=True))
+        self.assertFalse(self.policy.is_retryable('GET', idempotent=False))
+
+    def test_backoff_time(self, sleep):
+        self.assertEqual(self.policy.backoff_time(1), 0.1)
+        self.assertEqual(self.policy.backoff_time(2), 0.2)
+        self.assertEqual(self.policy.backoff_time(3), 0.4)
+        self.policy.max_backoff = 0.3
+        self.assertEqual(self.policy.backoff_time(3), 0.3)
+
+    def test_backoff_time_jitter(self, sleep):
+        self.policy.jitter = True
+        for attempt in range(1, 6):
+            delay = self.policy.backoff_time(attempt)
+            self.assertTrue(0 <= delay <= 0.1 * 2 ** (attempt - 1))
+
+    def test_backoff_time_retry_after(self, sleep):
+        response = _response(503, {'Retry-After': '2'})
+        self.assertEqual(self.policy.backoff_time(1, response), 2.0)
+
+    def test_success_first_attempt(self, sleep):
+        send = MagicMock(return_value=_response(200))
+        r = self.policy.call('GET', send)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(send.call_count, 1)
+        self.assertFalse(sleep.called)
+        self.assertEqual(self.policy.stats.attempts, 1)
+        self.assertEqual(self.policy.stats.retries, 0)
+
+    def test_retry_on_status(self, sleep):
+        send = MagicMock(side_effect=[_response(503), _response(502),
+                                      _response(200)])
+        r = self.policy.call('GET', send)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(send.call_count, 3)
+        self.assertEqual(sleep.call_count, 2)
+        stats = self.policy.stats.to_dict()
+        self.assertEqual(stats["requests"], 1)
+        self.assertEqual(stats["attempts"], 3)
+        self.assertEqual(stats["retries"], 2)
+        self.assertEqual(stats["giveups"], 0)
+
+    def test_retry_on_exception(self, sleep):
+        send = MagicMock(side_effect=[requests.ConnectionError(),
+                                      _response(200)])
+        r = self.policy.call('DELETE', send)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(send.call_count, 2)
+
+    def test_gives_up_on_status(self, sleep):
+        send = MagicMock(return_value=_response(503))
+        r = self.policy.call('PUT', send)
+        self.assertEqual(r.status_code, 503)
+        self.assertEqual(send.call_count, 3)
+        self.assertEqual(self.policy.stats.giveups, 1)
+
+    def test_gives_up_on_exception(self, sleep):
+        send = MagicMock(side_effect=requests.Timeout())
+        self.assertRaises(requests.Timeout, self.policy.call, 'GET', send)
+        self.assertEqual(send.call_count, 3)
+        self.assertEqual(self.policy.stats.giveups, 1)
+
+    def test_max_elapsed(self, sleep):
+        self.policy.max_elapsed = 0.05
+        send = MagicMock(return_value=_response(503))
+        self.policy.call('GET', send)
+        self.assertEqual(send.call_count, 1)
+
+    def test_post_not_retried(self, sleep):
+        send = MagicMock(side_effect=requests.ConnectionError())
+        self.assertRaises(requests.ConnectionError,
+                          self.policy.call, 'POST', send)
+        self.assertEqual(send.call_count, 1)
+        self.assertEqual(self.policy.stats.giveups, 0)
+
+    def test_idempotent_post_retried(self, sleep):
+        send = MagicMock(side_effect=[_response(503), _response(201)])
+        r = self.policy.call('POST', send, idempotent=True)
+        self.assertEqual(r.status_code, 201)
+        self.assertEqual(send.call_count, 2)
+
+    def test_non_retry_status(self, sleep):
+        send = MagicMock(return_value=_response(404))
+        r = self.policy.call('GET', send)
+        self.assertEqual(r.status_code, 404)
+        self.assertEqual(send.call_count, 1)
+
+
+@patch('hpsdnclient.retry.time.sleep')
+class RestClientRetryTests(unittest.TestCase):
+    def setUp(self):
+        auth = XAuthToken('10.10.10.10', 'sdn', 'skyline')
+        self.policy = RetryPolicy(backoff=0.1)
+        self.client = RestClient(auth, retry=self.policy)
+
+    def test_put_retried(self, sleep):
+        self.client._put = MagicMock(side_effect=[_response(503),
+                                                  _response(200)])
+        r = self.client.put('http://foo.bar', '{}')
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(self.client._put.call_count, 2)
+        self.client._put.assert_called_with('http://foo.bar', '{}')
+
+    def test_post_not_retried(self, sleep):
+        self.client._post = MagicMock(side_effect=requests.ConnectionError())
+        self.assertRaises(requests.ConnectionError,
+                          self.client.post, 'http://foo.bar', '{}')
+        self.assertEqual(self.client._post.call_count, 1)
+
+    def test_post_idempotent_retried(self, sleep):
+        self.client._post = MagicMock(side_effect=[requests.ConnectionError(),
+                                                   _response(201)])
+        r = self.client.post('http://foo.bar', '{}', idempotent=True)
+        self.assertEqual(r.status_code, 201)
+        self.client._post.assert_called_with('http://foo.bar', '{}', False)
+
+    def test_gives_up_raises_http_error(self, sleep):
+        self.client._delete = MagicMock(return_value=_response(503))
+        self.assertRaises(requests.HTTPError,
+                          self.client.delete, 'http://foo.bar')
+        self.assertEqual(self.client._delete.call_count, 3)
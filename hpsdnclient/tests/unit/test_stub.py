@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import time
+import unittest
+
+import requests
+
+from hpsdnclient.api import Api
+from hpsdnclient.auth import XAuthToken
+from hpsdnclient.datatypes import (Action, ActionList, Bucket, Flow, Group,
+                                   Instruction, Match)
+from hpsdnclient.tests.stub import Faults, StubController, StubState, dpid
+from hpsdnclient.utils import Dpid
+
+
+class StubStateTests(unittest.TestCase):
+    def test_dpid(self):
+        self.assertEqual(dpid(1), '00:00:00:00:00:00:00:01')
+        self.assertEqual(dpid(0x1ff), '00:00:00:00:00:00:01:ff')
+
+    def test_sizes(self):
+        state = StubState(datapaths=5, flows=7, links=6, ports=4, hosts=2)
+        self.assertEqual(len(state.dpids), 5)
+        self.assertEqual(len(state.flows[state.dpids[0]]), 7)
+        self.assertEqual(len(state.ports[state.dpids[0]]), 4)
+        # Links are reported in both directions
+        self.assertEqual(len(state.links), 12)
+        self.assertEqual(len(state.nodes), 10)
+
+    def test_seeded(self):
+        a = StubState(flows=3, seed=1)
+        b = StubState(flows=3, seed=1)
+        self.assertEqual(a.flows, b.flows)
+
+    def test_path(self):
+        state = StubState(datapaths=6)
+        path = state.path(state.dpids[0], state.dpids[3])
+        self.assertEqual(len(path), 3)
+        self.assertEqual(path[0]["src_dpid"], state.dpids[0])
+        self.assertEqual(path[-1]["dst_dpid"], state.dpids[3])
+
+
+class StubControllerTests(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubController(StubState(datapaths=3, flows=5)).start()
+        self.auth = XAuthToken(self.stub.address, 'sdn', 'skyline')
+        self.api = Api(self.stub.address, self.auth)
+        self.dpid = self.stub.state.dpids[0]
+
+    def tearDown(self):
+        self.stub.stop()
+
+    def test_login(self):
+        self.auth.get_auth()
+        self.assertTrue(self.auth.token)
+        self.assertEqual(self.stub.requests['POST auth'], 1)
+
+    def test_unauthorized(self):
+        r = requests.get(self.stub.address + '/sdn/v2.0/of/datapaths')
+        self.assertEqual(r.status_code, 401)
+
+    def test_datapaths(self):
+        datapaths = self.api.get_datapaths()
+        self.assertEqual([d.dpid for d in datapaths], self.stub.state.dpids)
+        datapath = self.api.get_datapath_detail(self.dpid)
+        self.assertEqual(datapath.dpid, self.dpid)
+
+    def test_not_found(self):
+        self.assertRaises(Exception, self.api.get_datapath_detail,
+                          '00:00:00:00:00:00:00:99')
+
+    def test_flows(self):
+        self.assertEqual(len(self.api.get_flows(self.dpid)), 5)
+        flow = Flow(priority=30000, idle_timeout=30,
+                    match=Match(eth_type="ipv4", ipv4_src="10.0.0.1"),
+                    actions=Action(output=1))
+        self.api.add_flows(self.dpid, flow)
+        flows = self.api.get_flows(self.dpid)
+        self.assertEqual(len(flows), 6)
+        self.assertEqual(flows[-1].priority, 30000)
+
+    def test_ports_and_stats(self):
+        self.assertEqual(len(self.api.get_ports(self.dpid)), 8)
+        self.assertEqual(self.api.get_port_detail(self.dpid, 2).id, 2)
+        stats = self.api.get_port_stats(self.dpid)
+        self.assertEqual(len(stats[0].port_stats), 8)
+
+    def test_topology(self):
+        self.assertEqual(len(self.api.get_links()), 6)
+        self.assertEqual(len(self.api.get_nodes()), 3)
+        self.assertEqual(len(self.api.get_clusters()), 1)
+        state = self.stub.state
+        path = self.api.get_forward_path(state.dpids[0], state.dpids[1])
+        self.assertEqual(path.links[0]["dst_dpid"], state.dpids[1])
+
+    def test_integer_dpids(self):
+        flows = self.api.get_flows(1)
+        self.assertEqual(len(flows), 5)
+        self.assertEqual(len(self.api.get_flows(Dpid(1))), 5)
+        self.assertEqual(len(self.api.get_links(2)), 4)
+        self.assertEqual(self.api.get_datapath_detail(3).dpid,
+                         self.stub.state.dpids[2])
+
+    def test_int_dpids_decode(self):
+        api = Api(self.stub.address, self.auth, int_dpids=True)
+        links = api.get_links()
+        self.assertTrue(isinstance(links[0].src_dpid, Dpid))
+        self.assertEqual(links[0].src_dpid, self.stub.state.dpids[0])
+        # One Dpid per datapath is shared by every object
+        dpids = set(id(link.src_dpid) for link in links)
+        dpids.update(id(link.dst_dpid) for link in links)
+        self.assertEqual(len(dpids), 3)
+        datapath = api.get_datapath_detail(links[0].src_dpid)
+        self.assertTrue(datapath.dpid is links[0].src_dpid)
+        self.assertEqual(datapath.to_dict()["dpid"], self.stub.state.dpids[0])
+
+    def test_action_lists_decode(self):
+        api = Api(self.stub.address, self.auth, int_dpids=True,
+                  action_lists=True)
+        actions = [{"set_field": {"vlan_vid": 10}}, {"output": 1},
+                   {"group": 7}, {"output": 2}]
+        flow = Flow(priority=100, match=Match(in_port=9),
+                    actions=ActionList(actions),
+                    instructions=[Instruction(apply_actions=ActionList(
+                        [("output", 4)]))])
+        api.add_flows(self.dpid, flow)
+        self.assertEqual(self.stub.state.flows[self.dpid][-1]["actions"],
+                         actions)
+        added = [f for f in api.get_flows(self.dpid) if f.priority == 100][0]
+        self.assertTrue(isinstance(added.actions, ActionList))
+        self.assertEqual(added.actions.to_dict(), actions)
+        self.assertEqual(added.instructions[0].apply_actions,
+                         (("output", 4),))
+        group = Group(id=7, type="all",
+                      buckets=[Bucket(actions=ActionList([("output", 5)]))])
+        api.add_group(self.dpid, group)
+        added = api.get_group_details(self.dpid, 7)
+        self.assertTrue(isinstance(added.buckets[0], Bucket))
+        self.assertEqual(added.buckets[0].actions, ActionList([("output", 5)]))
+        # Group features list action names, not actions
+        self.assertTrue(isinstance(
+            api.get_group_features(self.dpid).actions, list))
+
+    def test_logs(self):
+        import os
+        import shutil
+        import tempfile
+        directory = tempfile.mkdtemp()
+        try:
+            path = self.api.download_logs(directory)
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), self.stub.state.log_archive())
+        finally:
+            shutil.rmtree(directory)
+        self.assertFalse(os.path.exists(directory))
+
+    def test_requests_counted(self):
+        self.api.get_flows(self.dpid)
+        self.api.get_flows(self.stub.state.dpids[1])
+        self.assertEqual(self.stub.requests['GET of/datapaths/{dpid}/flows'],
+                         2)
+
+
+class FaultTests(unittest.TestCase):
+    def _start(self, faults):
+        self.stub = StubController(StubState(datapaths=1), faults).start()
+        self.addCleanup(self.stub.stop)
+        self.url = self.stub.address + '/sdn/v2.0/of/datapaths'
+        self.headers = {'X-Auth-Token': 'token'}
+
+    def test_latency(self):
+        self._start(Faults(latency=0.1))
+        start = time.time()
+        requests.get(self.url, headers=self.headers)
+        self.assertTrue(time.time() - start >= 0.1)
+
+    def test_errors(self):
+        self._start(Faults(error_rate=1.0, error_status=500))
+        r = requests.get(self.url, headers=self.headers)
+        self.assertEqual(r.status_code, 500)
+
+    def test_paths(self):
+        self._start(Faults(error_rate=1.0, paths='^net/'))
+        r = requests.get(self.url, headers=self.headers)
+        self.assertEqual(r.status_code, 200)
+
+    def test_drop(self):
+        self._start(Faults(drop_rate=1.0))
+        self.assertRaises(requests.ConnectionError, requests.get, self.url,
+                          headers=self.headers)
+
+    def test_bandwidth(self):
+        self._start(Faults(bandwidth=10000))
+        start = time.time()
+        r = requests.post(self.url + '/00:00:00:00:00:00:00:01/flows',
+                          data=b' ' * 1000, headers=self.headers)
+        self.assertTrue(time.time() - start >= 0.1)
+        self.assertEqual(self.stub.bytes_received, 1000)
+        self.assertEqual(self.stub.bytes_sent, len(r.content))
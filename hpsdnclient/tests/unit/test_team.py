@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import json
+import unittest
+#PY3.3
+try:
+    from unittest.mock import MagicMock, patch
+except ImportError:
+    from mock import MagicMock, patch
+
+import requests
+
+from hpsdnclient.auth import XAuthToken
+from hpsdnclient.datatypes import (ControllerNode, Datapath,
+                                   DatapathControllers, JsonObjectFactory,
+                                   System)
+from hpsdnclient.team import AffinityTable, TeamApi, TeamRestClient, url_dpid
+from hpsdnclient.tests.data import DATAPATH
+from hpsdnclient.tests.stub import Faults, StubController, StubState
+
+CONTROLLERS = ['10.0.0.1', '10.0.0.2', '10.0.0.3']
+
+
+def _response(status_code=200, body=None):
+    response = requests.Response()
+    response.status_code = status_code
+    if body is not None:
+        response._content = json.dumps(body).encode("UTF-8")
+        response.headers['Content-Type'] = 'application/json'
+    return response
+
+
+def _host(url):
+    return url.split('/')[2].split(':')[0]
+
+
+class TeamRestClientTests(unittest.TestCase):
+    def setUp(self):
+        auth = XAuthToken('10.0.0.100', 'sdn', 'skyline')
+        self.client = TeamRestClient(auth, CONTROLLERS, cooldown=60)
+        self.url = 'https://10.0.0.1:8443/sdn/v2.0/of/datapaths'
+
+    def test_requires_controllers(self):
+        self.assertRaises(ValueError, TeamRestClient, None, [])
+
+    @patch('hpsdnclient.rest.requests.get')
+    def test_reads_least_outstanding(self, get):
+        get.return_value = _response()
+        self.client.members[0].outstanding = 2
+        self.client.members[1].outstanding = 1
+        self.client._get(self.url)
+        self.assertEqual(_host(get.call_args[0][0]), '10.0.0.3')
+
+    @patch('hpsdnclient.rest.requests.get')
+    def test_reads_latency_tie_break(self, get):
+        get.return_value = _response()
+        self.client.members[0].latency = 0.5
+        self.client.members[1].latency = 0.1
+        self.client.members[2].latency = 0.3
+        self.client._get(self.url)
+        self.assertEqual(_host(get.call_args[0][0]), '10.0.0.2')
+
+    @patch('hpsdnclient.rest.requests.get')
+    def test_reads_fail_over(self, get):
+        def fake_get(url, **kwargs):
+            if _host(url) != '10.0.0.3':
+                raise requests.ConnectionError()
+            return _response()
+        get.side_effect = fake_get
+        r = self.client._get(self.url)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(get.call_count, 3)
+        state = self.client.members_state()
+        self.assertFalse(state[0]["healthy"])
+        self.assertFalse(state[1]["healthy"])
+        self.assertTrue(state[2]["healthy"])
+        self.assertEqual(state[0]["failures"], 1)
+        self.assertEqual(state[0]["outstanding"], 0)
+        # Unhealthy members are skipped
+        self.client._get(self.url)
+        self.assertEqual(get.call_count, 4)
+
+    @patch('hpsdnclient.rest.requests.get')
+    def test_reads_all_down(self, get):
+        get.side_effect = requests.Timeout()
+        self.assertRaises(requests.Timeout, self.client._get, self.url)
+        self.assertEqual(get.call_count, 3)
+
+    @patch('hpsdnclient.rest.requests.post')
+    def test_writes_go_to_leader(self, post):
+        post.return_value = _response(201)
+        self.client.set_leader('10.0.0.2')
+        self.client.members[1].outstanding = 5
+        self.client._post(self.url, '{}')
+        self.assertEqual(_host(post.call_args[0][0]), '10.0.0.2')
+
+    @patch('hpsdnclient.rest.requests.put')
+    def test_writes_fail_over(self, put):
+        def fake_put(url, **kwargs):
+            if _host(url) == '10.0.0.1':
+                raise requests.ConnectionError()
+            return _response()
+        put.side_effect = fake_put
+        self.client._put(self.url, '{}')
+        self.assertEqual(_host(put.call_args[0][0]), '10.0.0.2')
+        self.assertEqual(self.client.leader.address, '10.0.0.2')
+
+    @patch('hpsdnclient.rest.requests.delete')
+    def test_writes_no_fail_over_on_read_timeout(self, delete):
+        delete.side_effect = requests.ReadTimeout()
+        self.assertRaises(requests.ReadTimeout,
+                          self.client._delete, self.url)
+        self.assertEqual(delete.call_count, 1)
+
+    def test_set_leader_unknown(self):
+        self.assertRaises(ValueError, self.client.set_leader, '10.0.0.9')
+
+    @patch('hpsdnclient.rest.requests.get')
+    def test_latency_tracked(self, get):
+        get.return_value = _response()
+        self.client._get(self.url)
+        latencies = [m["latency"] for m in self.client.members_state()]
+        self.assertEqual(len([l for l in latencies if l is not None]), 1)
+
+    @patch('hpsdnclient.rest.requests.get')
+    def test_other_urls_not_rewritten(self, get):
+        get.return_value = _response()
+        self.client._get('http://foo.bar')
+        get.assert_called_with('http://foo.bar', **self.client.args)
+
+
+class TeamApiTests(unittest.TestCase):
+    def setUp(self):
+        auth = XAuthToken('10.0.0.100', 'sdn', 'skyline')
+        self.api = TeamApi(CONTROLLERS, auth)
+
+    def test_instantiation(self):
+        self.assertEqual(self.api.controller, '10.0.0.1')
+        self.assertTrue(isinstance(self.api.restclient, TeamRestClient))
+
+    @patch('hpsdnclient.rest.requests.get')
+    def test_get_datapaths(self, get):
+        get.return_value = _response(body={"datapaths": [DATAPATH]})
+        datapaths = self.api.get_datapaths()
+        self.assertEqual(datapaths[0].dpid, DATAPATH["dpid"])
+
+    def test_discover_leader(self):
+        self.api.get_systems = MagicMock(return_value=[
+            System(ip='10.0.0.1', role='member'),
+            System(ip='10.0.0.3', role='leader')])
+        self.assertEqual(self.api.discover_leader(), '10.0.0.3')
+        self.assertEqual(self.api.restclient.leader.address, '10.0.0.3')
+
+    def test_discover_leader_unknown(self):
+        self.api.get_systems = MagicMock(return_value=[
+            System(ip='10.0.0.9', role='leader')])
+        self.assertEqual(self.api.discover_leader(), None)
+
+
+class AffinityTests(unittest.TestCase):
+    def setUp(self):
+        auth = XAuthToken('10.0.0.100', 'sdn', 'skyline')
+        self.api = TeamApi(CONTROLLERS, auth, affinity=60)
+        region = JsonObjectFactory.create('Region', {
+            "uid": "1",
+            "master": {"ip": "10.0.0.2", "name": "c2"},
+            "slaves": [{"ip": "10.0.0.1", "name": "c1"}],
+            "devices": [{"ip": "192.168.0.10"}]})
+        self.api.get_regions = MagicMock(return_value=[region])
+        self.api.get_datapaths = MagicMock(return_value=[
+            Datapath(dpid='00:00:00:00:00:00:00:01',
+                     device_ip='192.168.0.10'),
+            Datapath(dpid='00:00:00:00:00:00:00:02',
+                     device_ip='192.168.0.99')])
+        self.api.get_datapath_controllers = MagicMock(
+            return_value=DatapathControllers(master=None))
+        self.table = self.api.restclient.affinity
+
+    def test_url_dpid(self):
+        base = 'https://10.0.0.1:8443/sdn/v2.0/of/'
+        dpid = '00:00:00:00:00:00:00:01'
+        quoted = '00%3A00%3A00%3A00%3A00%3A00%3A00%3A01'
+        self.assertEqual(url_dpid(base + 'datapaths/' + quoted), dpid)
+        self.assertEqual(url_dpid(base + 'datapaths/' + quoted + '/flows'),
+                         dpid)
+        self.assertEqual(url_dpid(base + 'stats/ports?dpid=' + quoted), dpid)
+        self.assertEqual(url_dpid(base + 'stats/meters?dpid=' + quoted +
+                                  '&meter=1'), dpid)
+        self.assertEqual(url_dpid(base + 'datapaths'), None)
+        self.assertEqual(url_dpid(base + 'stats'), None)
+
+    def test_region_with_controller_nodes(self):
+        region = self.api.get_regions()[0]
+        self.assertTrue(isinstance(region.master, ControllerNode))
+        self.assertEqual(region.slaves[0].ip, "10.0.0.1")
+
+    def test_lookup_refreshes(self):
+        self.assertTrue(isinstance(self.table, AffinityTable))
+        self.assertEqual(self.table.lookup('00:00:00:00:00:00:00:01'),
+                         '10.0.0.2')
+        self.assertEqual(self.table.lookup('00:00:00:00:00:00:00:02'), None)
+        self.table.lookup('00:00:00:00:00:00:00:01')
+        self.assertEqual(self.api.get_regions.call_count, 1)
+
+    def test_lookup_learns_misses(self):
+        self.api.get_datapath_controllers.return_value = DatapathControllers(
+            master={"ip": "10.0.0.3"})
+        self.assertEqual(self.table.lookup('00:00:00:00:00:00:00:02'),
+                         '10.0.0.3')
+        self.table.lookup('00:00:00:00:00:00:00:02')
+        self.assertEqual(self.api.get_datapath_controllers.call_count, 1)
+
+    def test_lookup_misses_once_per_interval(self):
+        self.table.lookup('00:00:00:00:00:00:00:02')
+        self.table.lookup('00:00:00:00:00:00:00:02')
+        self.assertEqual(self.api.get_datapath_controllers.call_count, 1)
+        self.table.updated = 0
+        self.table.lookup('00:00:00:00:00:00:00:02')
+        self.assertEqual(self.api.get_datapath_controllers.call_count, 2)
+
+    def test_lookup_refresh_interval(self):
+        self.table.interval = 0
+        self.table.lookup('00:00:00:00:00:00:00:01')
+        self.table.lookup('00:00:00:00:00:00:00:01')
+        self.assertEqual(self.api.get_regions.call_count, 2)
+
+    def test_refresh_errors_keep_routes(self):
+        self.table.lookup('00:00:00:00:00:00:00:01')
+        self.table.updated = 0
+        self.api.get_regions.side_effect = requests.ConnectionError()
+        self.assertEqual(self.table.lookup('00:00:00:00:00:00:00:01'),
+                         '10.0.0.2')
+
+    def test_update(self):
+        self.table.updated = 1e12
+        self.table.update('00:00:00:00:00:00:00:09',
+                          DatapathControllers(master='10.0.0.3'))
+        self.assertEqual(self.table.lookup('00:00:00:00:00:00:00:09'),
+                         '10.0.0.3')
+
+    @patch('hpsdnclient.rest.requests.post')
+    def test_writes_go_to_master(self, post):
+        post.return_value = _response(201)
+        url = ('https://10.0.0.1:8443/sdn/v2.0/of/datapaths/'
+               '00%3A00%3A00%3A00%3A00%3A00%3A00%3A01/flows')
+        self.api.restclient._post(url, '{}')
+        self.assertEqual(_host(post.call_args[0][0]), '10.0.0.2')
+        # The leader does not change
+        self.assertEqual(self.api.restclient.leader.address, '10.0.0.1')
+
+    @patch('hpsdnclient.rest.requests.get')
+    def test_reads_go_to_master(self, get):
+        get.return_value = _response(body={"flows": []})
+        self.api.restclient.members[1].outstanding = 10
+        self.api.get_flows('00:00:00:00:00:00:00:01')
+        self.assertEqual(_host(get.call_args[0][0]), '10.0.0.2')
+
+    @patch('hpsdnclient.rest.requests.get')
+    def test_reads_go_to_learned_master(self, get):
+        def fake_get(url, **kwargs):
+            if url.endswith('/controllers'):
+                return _response(body={"controllers": {
+                    "master": {"ip": "10.0.0.3"}, "slaves": []}})
+            return _response(body={"flows": []})
+        get.side_effect = fake_get
+        del self.api.get_datapath_controllers
+        self.api.get_flows('00:00:00:00:00:00:00:09')
+        self.assertEqual(_host(get.call_args[0][0]), '10.0.0.3')
+        self.assertEqual(self.table.lookup('00:00:00:00:00:00:00:09'),
+                         '10.0.0.3')
+
+    @patch('hpsdnclient.rest.requests.get')
+    def test_master_down_fails_over(self, get):
+        def fake_get(url, **kwargs):
+            if _host(url) == '10.0.0.2':
+                raise requests.ConnectionError()
+            return _response(body={"flows": []})
+        get.side_effect = fake_get
+        self.api.get_flows('00:00:00:00:00:00:00:01')
+        self.assertNotEqual(_host(get.call_args[0][0]), '10.0.0.2')
+
+
+class TeamLoginTests(unittest.TestCase):
+    def setUp(self):
+        state = StubState(datapaths=1)
+        # The first member is down while the client logs in
+        down = Faults(drop_rate=1.0, paths='^auth$')
+        self.stubs = [StubController(state, down).start(),
+                      StubController(state).start()]
+        for stub in self.stubs:
+            self.addCleanup(stub.stop)
+        addresses = [s.address for s in self.stubs]
+        self.auth = XAuthToken(addresses[0], 'sdn', 'skyline')
+        self.api = TeamApi(addresses, self.auth)
+
+    def test_login_fails_over(self):
+        self.auth.get_auth()
+        self.assertEqual(self.stubs[0].requests.get('POST auth'), 1)
+        self.assertEqual(self.stubs[1].requests.get('POST auth'), 1)
+        state = self.api.restclient.members_state()
+        self.assertEqual(state[0]["failures"], 1)
+        self.assertEqual(len(self.api.get_datapaths()), 1)
+
+    def test_logout_fails_over(self):
+        self.api.get_datapaths()
+        self.stubs[0].faults = Faults(drop_rate=1.0)
+        self.auth.delete_auth()
+        self.assertEqual(self.auth.token, None)
+        self.assertEqual(self.stubs[1].requests.get('DELETE auth'), 1)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import json
+import unittest
+
+from hpsdnclient.api import Api
+from hpsdnclient.auth import XAuthToken
+from hpsdnclient.datatypes import Action, Flow, Match
+from hpsdnclient.error import TransactionError
+from hpsdnclient.template import FlowBatch, FlowTemplate, Placeholder
+from hpsdnclient.tests.stub import Faults, StubController, StubState
+from hpsdnclient.transaction import Transaction
+
+
+def _flow(ip, priority=30000, port=1):
+    match = Match(eth_type="ipv4", ipv4_src=ip)
+    return Flow(priority=priority, match=match, actions=Action(output=port),
+                hard_timeout=30)
+
+
+class FlowTemplateTests(unittest.TestCase):
+    def setUp(self):
+        self.template = FlowTemplate(_flow(Placeholder("ip")))
+
+    def test_render(self):
+        for ip in ("10.0.0.1", u"10.0.0.é", 'a"b\\c%s%d'):
+            self.assertEqual(json.loads(self.template.render({"ip": ip})),
+                             _flow(ip).to_dict())
+
+    def test_render_single_value(self):
+        self.assertEqual(self.template.render("10.0.0.1"),
+                         self.template.render({"ip": "10.0.0.1"}))
+        self.assertEqual(self.template.fields, ["ip"])
+
+    def test_render_values(self):
+        template = FlowTemplate(_flow(Placeholder("ip"), Placeholder("prio"),
+                                      Placeholder("port")))
+        expected = _flow("10.0.0.2", 100, 3).to_dict()
+        values = {"ip": "10.0.0.2", "prio": 100, "port": 3}
+        self.assertEqual(json.loads(template.render(values)), expected)
+        row = [values[name] for name in template.fields]
+        self.assertEqual(json.loads(template.render(row)), expected)
+        self.assertRaises(KeyError, template.render, row[:2])
+        self.assertRaises(KeyError, template.render, {"ip": "10.0.0.2"})
+
+    def test_repeated_placeholder(self):
+        value = Placeholder("v")
+        flow = _flow("10.0.0.1", value)
+        flow.cookie = value
+        flow.idle_timeout = 5
+        template = FlowTemplate(flow)
+        data = json.loads(template.render(7))
+        self.assertEqual((data["priority"], data["cookie"]), (7, 7))
+        self.assertEqual(data["idle_timeout"], 5)
+
+    def test_other_values(self):
+        flow = _flow(Placeholder("ip"))
+        flow.cookie = Placeholder("cookie")
+        template = FlowTemplate(flow)
+        for value in (True, None, 1.5, {"a": 1}):
+            data = json.loads(template.render({"ip": "1", "cookie": value}))
+            self.assertEqual(data["cookie"], value)
+
+    def test_invalid(self):
+        self.assertRaises(TypeError, FlowTemplate, Match())
+        self.assertRaises(TypeError, FlowTemplate, _flow(object()))
+
+    def test_batch(self):
+        ips = ["10.0.{0}.{1}".format(i // 250, i % 250) for i in range(5)]
+        batch = self.template.batch(ips)
+        self.assertTrue(isinstance(batch, FlowBatch))
+        self.assertEqual(len(batch), 5)
+        self.assertEqual(json.loads(batch.data),
+                         {"flows": [_flow(ip).to_dict() for ip in ips]})
+
+    def test_batches(self):
+        batches = list(self.template.batches(
+            ("10.0.0.{0}".format(i) for i in range(25)), size=10))
+        self.assertEqual([len(b) for b in batches], [10, 10, 5])
+
+
+class FlowBatchApiTests(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubController(StubState(datapaths=2, flows=0)).start()
+        self.api = Api(self.stub.address,
+                       XAuthToken(self.stub.address, 'sdn', 'skyline'))
+        self.template = FlowTemplate(_flow(Placeholder("ip")))
+        self.dpid = self.stub.state.dpids[0]
+
+    def tearDown(self):
+        self.stub.stop()
+
+    def test_add_and_delete_flows(self):
+        ips = ["10.0.0.{0}".format(i) for i in range(10)]
+        self.api.add_flows(self.dpid, self.template.batch(ips))
+        flows = self.api.get_flows(self.dpid)
+        self.assertEqual(sorted(f.match.ipv4_src for f in flows), sorted(ips))
+        self.api.delete_flows(self.dpid, self.template.batch(ips[:4]))
+        self.assertEqual(len(self.stub.state.flows[self.dpid]), 6)
+
+    def test_encoded_bodies(self):
+        batch = self.template.batch(["10.0.0.1", "10.0.0.2"])
+        self.assertTrue(batch.body is batch.body)
+        self.api.add_flows(self.dpid, batch.body)
+        # A slice of a larger buffer is sent without copying it
+        body = json.dumps({"flow": _flow("10.0.0.3").to_dict()})
+        buffer = bytearray(b'  ' + body.encode('utf-8') + b'  ')
+        self.api.add_flows(self.dpid, memoryview(buffer)[2:-2])
+        self.api.add_flows(self.dpid, bytearray(
+            self.template.batch(["10.0.0.4"]).body))
+        self.assertEqual(len(self.stub.state.flows[self.dpid]), 4)
+        self.api.delete_flows(self.dpid, batch)
+        self.assertEqual(len(self.stub.state.flows[self.dpid]), 2)
+
+    def test_transaction_encoded_bodies(self):
+        tx = Transaction(self.api)
+        tx.add_flows(self.dpid, _flow("10.0.0.1"))
+        tx.add_flows(self.dpid, self.template.batch(["10.0.0.2"]).body)
+        tx.delete_flows(self.dpid, self.template.batch(["10.0.0.1"]).body)
+        self.assertEqual(len(tx.changes[self.dpid]), 3)
+        tx.commit()
+        flows = self.stub.state.flows[self.dpid]
+        self.assertEqual([f["match"][-1] for f in flows],
+                         [{"ipv4_src": "10.0.0.2"}])
+
+    def test_transaction(self):
+        other = self.stub.state.dpids[1]
+        self.stub.faults = Faults(error_rate=1.0, latency=0.2,
+                                  paths='%3A02/flows')
+        tx = Transaction(self.api)
+        tx.add_flows(self.dpid, self.template.batch(["10.0.0.1"]))
+        tx.add_flows(self.dpid, _flow("10.0.0.2"))
+        tx.add_flows(other, self.template.batch(["10.0.0.1"]))
+        self.assertRaises(TransactionError, tx.commit)
+        self.assertEqual(len(tx.result.datapaths[self.dpid].applied), 2)
+        self.assertEqual(self.stub.state.flows[self.dpid], [])
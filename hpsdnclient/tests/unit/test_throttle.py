@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import threading
+import time
+import unittest
+#PY3.3
+try:
+    from unittest.mock import MagicMock
+except ImportError:
+    from mock import MagicMock
+
+import requests
+
+from hpsdnclient.auth import XAuthToken
+from hpsdnclient.rest import RestClient
+from hpsdnclient.throttle import (AdaptiveLimiter, Governor, Throttle,
+                                  TokenBucket)
+
+BASE_URL = 'https://10.10.10.10:8443/sdn/v2.0/'
+
+
+def _response(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return response
+
+
+class TokenBucketTests(unittest.TestCase):
+    def test_burst(self):
+        bucket = TokenBucket(rate=1, burst=3)
+        self.assertTrue(bucket.try_acquire())
+        self.assertTrue(bucket.try_acquire())
+        self.assertTrue(bucket.try_acquire())
+        self.assertFalse(bucket.try_acquire())
+
+    def test_refill(self):
+        bucket = TokenBucket(rate=100, burst=1)
+        self.assertTrue(bucket.try_acquire())
+        self.assertFalse(bucket.try_acquire())
+        time.sleep(0.02)
+        self.assertTrue(bucket.try_acquire())
+
+    def test_acquire_blocks(self):
+        bucket = TokenBucket(rate=50, burst=1)
+        start = time.time()
+        for _ in range(3):
+            bucket.acquire()
+        self.assertTrue(time.time() - start >= 0.035)
+
+
+class AdaptiveLimiterTests(unittest.TestCase):
+    def test_additive_increase(self):
+        limiter = AdaptiveLimiter(initial=2, max_limit=4)
+        for _ in range(20):
+            limiter.acquire()
+            limiter.release(0.01)
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.inflight, 0)
+
+    def test_multiplicative_decrease_on_errors(self):
+        limiter = AdaptiveLimiter(initial=8, error_threshold=0.1, window=10)
+        for _ in range(8):
+            limiter.acquire()
+            limiter.release(0.01)
+        before = limiter.limit
+        limiter.acquire()
+        limiter.release(0.01, error=True)
+        self.assertEqual(limiter.limit, before * 0.5)
+
+    def test_single_decrease_per_window(self):
+        limiter = AdaptiveLimiter(initial=8, window=10)
+        for _ in range(8):
+            limiter.acquire()
+            limiter.release(0.01)
+        for _ in range(3):
+            limiter.acquire()
+            limiter.release(0.01, error=True)
+        self.assertTrue(limiter.limit > 2)
+
+    def test_latency_target(self):
+        limiter = AdaptiveLimiter(initial=4, latency_target=0.1)
+        for _ in range(4):
+            limiter.acquire()
+            limiter.release(0.5)
+        self.assertEqual(limiter.limit, 2)
+
+    def test_min_limit(self):
+        limiter = AdaptiveLimiter(initial=2, min_limit=1, window=2)
+        for _ in range(10):
+            limiter.acquire()
+            limiter.release(0.01, error=True)
+        self.assertEqual(limiter.limit, 1)
+
+    def test_concurrency_bounded(self):
+        limiter = AdaptiveLimiter(initial=2, max_limit=2)
+        state = {"active": 0, "peak": 0}
+        lock = threading.Lock()
+
+        def worker():
+            limiter.acquire()
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.01)
+            with lock:
+                state["active"] -= 1
+            limiter.release(0.01)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(state["peak"], 2)
+
+
+class GovernorTests(unittest.TestCase):
+    def test_family_selection(self):
+        of = Throttle(limiter=AdaptiveLimiter())
+        default = Throttle()
+        governor = Governor(families={'of': of}, default=default)
+        self.assertEqual(governor.throttle(BASE_URL + 'of/datapaths'), of)
+        self.assertEqual(governor.throttle(BASE_URL + 'net/links'), default)
+
+    def test_error_status_recorded(self):
+        limiter = AdaptiveLimiter(initial=4, window=1)
+        limiter.release = MagicMock(wraps=limiter.release)
+        governor = Governor(families={'of': Throttle(limiter=limiter)})
+        governor.call(BASE_URL + 'of/stats', lambda: _response(500))
+        self.assertTrue(limiter.release.call_args[0][1])
+        governor.call(BASE_URL + 'of/stats', lambda: _response(200))
+        self.assertFalse(limiter.release.call_args[0][1])
+
+    def test_exception_recorded(self):
+        limiter = AdaptiveLimiter(initial=4)
+        governor = Governor(families={'net': Throttle(limiter=limiter)})
+
+        def send():
+            raise requests.ConnectionError()
+
+        self.assertRaises(requests.ConnectionError,
+                          governor.call, BASE_URL + 'net/links', send)
+        self.assertEqual(limiter.inflight, 0)
+
+    def test_to_dict(self):
+        governor = Governor(
+            families={'of': Throttle(TokenBucket(10, 5), AdaptiveLimiter(4))})
+        data = governor.to_dict()
+        self.assertEqual(data['of']['rate'], 10)
+        self.assertEqual(data['of']['limit'], 4)
+        self.assertEqual(data['of']['inflight'], 0)
+
+    def test_restclient_uses_governor(self):
+        governor = Governor()
+        governor.call = MagicMock(return_value=_response(200))
+        auth = XAuthToken('10.10.10.10', 'sdn', 'skyline')
+        client = RestClient(auth, governor=governor)
+        client.put(BASE_URL + 'of/datapaths', '{}')
+        self.assertEqual(governor.call.call_args[0][0],
+                         BASE_URL + 'of/datapaths')
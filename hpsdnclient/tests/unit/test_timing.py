@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import datetime
+import json
+import threading
+import unittest
+# Python3 compatibility
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+import requests
+
+from hpsdnclient.api import Api
+from hpsdnclient.auth import XAuthToken
+from hpsdnclient.hooks import Hook
+from hpsdnclient.tests.data import DATAPATH
+from hpsdnclient.timing import DecodeProfiler, timing_session, tracemalloc
+
+BODY = json.dumps({"datapaths": [DATAPATH] * 50}).encode('UTF-8')
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+class LastRequest(Hook):
+    def after_request(self, info):
+        self.info = info
+
+
+class TimingTests(unittest.TestCase):
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), Handler)
+        thread = threading.Thread(target=self.server.serve_forever,
+                                  args=(0.05,))
+        thread.daemon = True
+        thread.start()
+        self.controller = 'http://127.0.0.1:{0}'.format(
+            self.server.server_port)
+        self.auth = XAuthToken(self.controller, 'sdn', 'skyline')
+        self.auth.token = 'token'
+        self.auth.token_expiration = datetime.datetime.max
+        self.hook = LastRequest()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_phases(self):
+        session = timing_session()
+        api = Api(self.controller, self.auth, session=session,
+                  hooks=[self.hook])
+        self.assertEqual(len(api.get_datapaths()), 50)
+        phases = self.hook.info.phases
+        self.assertEqual(sorted(phases), ['connect', 'decode', 'materialize',
+                                          'transfer', 'wait'])
+        self.assertTrue(phases['connect'] > 0)
+        self.assertTrue(phases['decode'] + phases['materialize'] <=
+                        self.hook.info.decode_time)
+        # The connection is kept alive
+        api.get_datapaths()
+        self.assertEqual(self.hook.info.phases['connect'], 0)
+        session.close()
+
+    def test_phases_without_session(self):
+        api = Api(self.controller, self.auth, hooks=[self.hook])
+        api.get_datapaths()
+        self.assertEqual(self.hook.info.phases['connect'], None)
+        self.assertTrue(self.hook.info.phases['wait'] > 0)
+
+    def test_phases_with_plain_session(self):
+        session = requests.Session()
+        self.addCleanup(session.close)
+        api = Api(self.controller, self.auth, session=session,
+                  hooks=[self.hook])
+        api.get_datapaths()
+        self.assertEqual(self.hook.info.phases['connect'], None)
+        self.assertTrue(self.hook.info.phases['wait'] > 0)
+
+    def test_cprofile(self):
+        api = Api(self.controller, self.auth, hooks=[self.hook],
+                  profile='cprofile')
+        api.get_datapaths()
+        self.assertTrue('function calls' in self.hook.info.profile)
+
+    @unittest.skipIf(tracemalloc is None, "tracemalloc is not available")
+    def test_tracemalloc(self):
+        api = Api(self.controller, self.auth, hooks=[self.hook],
+                  profile='tracemalloc')
+        api.get_datapaths()
+        self.assertTrue(self.hook.info.profile.startswith('Peak: '))
+
+    def test_profiler_mode(self):
+        self.assertRaises(ValueError, DecodeProfiler, 'perf')
+
+    def test_profiler_busy(self):
+        profiler = DecodeProfiler()
+        profiler._lock.acquire()
+        self.assertEqual(profiler.call(len, 'abc'), (3, None))
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import copy
+import re
+import unittest
+
+from hpsdnclient.api import Api
+from hpsdnclient.auth import XAuthToken
+from hpsdnclient.datatypes import Action, Flow, Group, Match, Meter
+from hpsdnclient.error import HpsdnclientError, TransactionError
+from hpsdnclient.tests.stub import Faults, StubController, StubState
+from hpsdnclient.transaction import (COMMITTED, flow_key, INCONSISTENT,
+                                     ROLLED_BACK, UNCHANGED, Transaction)
+from hpsdnclient.utils import quote_dpid
+
+
+def _flow(port):
+    match = Match(eth_type="ipv4", ipv4_src="10.9.9.{0}".format(port))
+    return Flow(priority=30000, match=match, actions=Action(output=port))
+
+
+def _group(group_id, port):
+    return Group(id=group_id, type="all",
+                 buckets=[{"actions": [{"output": port}]}])
+
+
+class TransactionTests(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubController(StubState(datapaths=3, flows=2)).start()
+        self.state = self.stub.state
+        self.dpids = self.state.dpids
+        auth = XAuthToken(self.stub.address, 'sdn', 'skyline')
+        self.api = Api(self.stub.address, auth)
+        for d in self.dpids:
+            self.state.groups[d][7] = _group(7, 1).to_dict()
+            self.state.meters[d][3] = {"id": 3, "flags": ["kbps"],
+                                       "bands": []}
+        self.before = self._snapshot()
+
+    def tearDown(self):
+        self.stub.stop()
+
+    def _snapshot(self):
+        return copy.deepcopy((self.state.flows, self.state.groups,
+                              self.state.meters))
+
+    def _fail(self, dpid, resource):
+        self.stub.faults = Faults(error_rate=1.0, paths='^of/datapaths/' +
+                                  re.escape(quote_dpid(dpid)) + '/' + resource)
+
+    def _changes(self, tx):
+        for d in self.dpids:
+            tx.add_group(d, _group(8, 2))
+            tx.add_meter(d, Meter(id=4, flags=["kbps"]))
+            tx.add_flows(d, _flow(1))
+            tx.add_flows(d, [_flow(2), _flow(3)])
+
+    def test_commit(self):
+        tx = Transaction(self.api)
+        self._changes(tx)
+        result = tx.commit()
+        self.assertTrue(result.committed)
+        self.assertTrue(result.elapsed > 0)
+        for d in self.dpids:
+            self.assertEqual(result.datapaths[d].state, COMMITTED)
+            self.assertEqual(len(self.state.flows[d]), 5)
+            self.assertEqual(sorted(self.state.groups[d]), [7, 8])
+            self.assertEqual(sorted(self.state.meters[d]), [3, 4])
+            # The flow adds are sent in one request
+            self.assertEqual(self.stub.requests[
+                'POST of/datapaths/{dpid}/flows'], 3)
+        self.assertEqual(tx.changes, {})
+
+    def test_merges_flow_changes(self):
+        tx = Transaction(self.api)
+        tx.add_flows(1, _flow(1))
+        tx.add_flows(self.dpids[0], _flow(2))
+        tx.delete_flows(1, _flow(3))
+        tx.add_flows(1, _flow(4))
+        changes = tx.changes[self.dpids[0]]
+        self.assertEqual([(c.action, len(c.item)) for c in changes],
+                         [('add', 2), ('delete', 1), ('add', 1)])
+
+    def test_rollback(self):
+        self._fail(self.dpids[2], 'flows')
+        tx = Transaction(self.api)
+        self._changes(tx)
+        try:
+            tx.commit()
+            self.fail("TransactionError not raised")
+        except TransactionError as e:
+            self.assertTrue(isinstance(e, HpsdnclientError))
+            result = e.result
+        self.assertFalse(result.committed)
+        failed = result.failed()
+        self.assertEqual(failed.dpid, self.dpids[2])
+        self.assertEqual(failed.state, ROLLED_BACK)
+        self.assertEqual(len(failed.applied), 2)
+        for d in self.dpids:
+            self.assertTrue(result.datapaths[d].state in (ROLLED_BACK,
+                                                          UNCHANGED))
+        self.assertEqual(self._snapshot(), self.before)
+        self.assertTrue(tx.result is result)
+
+    def test_rollback_updates_and_deletes(self):
+        self._fail(self.dpids[1], 'groups')
+        flow = self.state.flows[self.dpids[0]][0]
+        old_flow = Flow.factory(copy.deepcopy(flow))
+        new_flow = Flow.factory(copy.deepcopy(flow))
+        new_flow.idle_timeout = 99
+        # One datapath at a time, so the first has its changes applied
+        # before the second fails
+        tx = Transaction(self.api, parallel=1)
+        tx.update_flows(self.dpids[0], new_flow)
+        tx.delete_flows(self.dpids[0], _flow(1))
+        tx.delete_flows(self.dpids[0], Flow(priority=old_flow.priority,
+                                            match=old_flow.match))
+        tx.update_group(self.dpids[0], 7, _group(7, 5))
+        tx.delete_meter(self.dpids[0], 3)
+        tx.add_group(self.dpids[1], _group(9, 1))
+        self.assertRaises(TransactionError, tx.commit)
+        first = tx.result.datapaths[self.dpids[0]]
+        self.assertEqual(first.state, ROLLED_BACK)
+        self.assertEqual(len(first.applied), 4)
+        self.assertEqual(tx.result.datapaths[self.dpids[1]].state,
+                         UNCHANGED)
+        self.assertEqual(self.state.groups, self.before[1])
+        self.assertEqual(self.state.meters, self.before[2])
+        flows = self.state.flows[self.dpids[0]]
+        self.assertEqual(len(flows), 2)
+        restored = dict((flow_key(Flow.factory(f)), Flow.factory(f))
+                        for f in flows)
+        for original in self.before[0][self.dpids[0]]:
+            original = Flow.factory(original)
+            self.assertEqual(restored[flow_key(original)].to_dict(),
+                             original.to_dict())
+
+    def test_rollback_failure(self):
+        tx = Transaction(self.api)
+        tx.add_group(self.dpids[0], _group(8, 2))
+        tx.add_flows(self.dpids[0], _flow(1))
+        self._fail(self.dpids[0], '(flows|groups/8)')
+        self.assertRaises(TransactionError, tx.commit)
+        result = tx.result.datapaths[self.dpids[0]]
+        self.assertEqual(result.state, INCONSISTENT)
+        self.assertEqual(len(result.rollback_errors), 1)
+        self.assertEqual(result.to_dict()["applied"], 1)
+
+    def test_context_manager(self):
+        with Transaction(self.api) as tx:
+            tx.add_flows(self.dpids[0], _flow(1))
+        self.assertEqual(tx.result.datapaths[self.dpids[0]].state, COMMITTED)
+        try:
+            with Transaction(self.api) as tx:
+                tx.add_flows(self.dpids[0], _flow(2))
+                raise ValueError()
+        except ValueError:
+            pass
+        self.assertEqual(tx.result, None)
+        self.assertEqual(len(self.state.flows[self.dpids[0]]), 3)
@@ -0,0 +1,302 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import hashlib
+import io
+import os
+import re
+import shutil
+import tempfile
+import threading
+import unittest
+#PY3.3
+try:
+    from unittest.mock import MagicMock, patch
+except ImportError:
+    from mock import MagicMock, patch
+
+import httpretty
+import requests
+
+from hpsdnclient.api import Api
+from hpsdnclient.auth import XAuthToken
+from hpsdnclient.error import TransferError
+from hpsdnclient.rest import RestClient
+from hpsdnclient.tests.data import AUTH
+from hpsdnclient.transfer import (attachment_filename, Downloader,
+                                  TransferStats, UploadStream)
+
+DATA = bytes(bytearray(range(256))) * 40
+
+URL = 'https://10.10.10.10:8443/sdn/v2.0/logs'
+
+
+class FlakyIO(io.BytesIO):
+    """ Drops the connection once ``fail_after`` bytes have been read """
+    def __init__(self, data, fail_after=None):
+        io.BytesIO.__init__(self, data)
+        self.fail_after = fail_after
+
+    def read(self, size=-1):
+        if self.fail_after is not None and self.tell() >= self.fail_after:
+            raise requests.ConnectionError("connection reset")
+        if self.fail_after is not None:
+            size = min(size, self.fail_after - self.tell())
+        return io.BytesIO.read(self, size)
+
+
+class FakeLogServer(object):
+    """ Serves DATA, honouring Range headers if ``ranges`` is set. The
+    first ``failures`` responses drop after ``fail_after`` bytes """
+    def __init__(self, ranges=True, failures=0, fail_after=None):
+        self.ranges = ranges
+        self.failures = failures
+        self.fail_after = fail_after
+        self.requested = []
+        self._lock = threading.Lock()
+
+    def get(self, url, headers=None):
+        value = (headers or {}).get('Range')
+        self.requested.append(value)
+        response = requests.Response()
+        response.headers['Content-Type'] = 'application/zip'
+        response.headers['Content-Disposition'] = \
+            'attachment; filename=logs.zip'
+        body = DATA
+        response.status_code = 200
+        if self.ranges:
+            response.headers['Accept-Ranges'] = 'bytes'
+            match = re.match(r'bytes=(\d+)-(\d*)', value or '')
+            if match is not None:
+                start = int(match.group(1))
+                end = int(match.group(2) or len(DATA) - 1)
+                if start >= len(DATA):
+                    response.status_code = 416
+                    response.headers['Content-Range'] = \
+                        'bytes */{0}'.format(len(DATA))
+                    response.raw = io.BytesIO(b'')
+                    return response
+                body = DATA[start:end + 1]
+                response.status_code = 206
+                response.headers['Content-Range'] = \
+                    'bytes {0}-{1}/{2}'.format(start, end, len(DATA))
+        response.headers['Content-Length'] = str(len(body))
+        fail_after = None
+        with self._lock:
+            if self.failures > 0:
+                self.failures -= 1
+                fail_after = self.fail_after
+        response.raw = FlakyIO(body, fail_after)
+        return response
+
+
+class UploadStreamTests(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.zip')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(DATA)
+        auth = XAuthToken('10.10.10.10', 'sdn', 'skyline')
+        self.api = Api('10.10.10.10', auth)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_len(self):
+        stream = UploadStream(self.path)
+        self.assertEqual(len(stream), len(DATA))
+        self.assertEqual(stream.filename, os.path.basename(self.path))
+
+    def test_chunks(self):
+        stream = UploadStream(self.path, chunk_size=4096)
+        sizes = []
+        data = b''
+        for chunk in stream:
+            sizes.append(len(chunk))
+            data += bytes(chunk)
+        self.assertEqual(sizes, [4096, 4096, 2048])
+        self.assertEqual(data, DATA)
+
+    def test_progress_and_checksum(self):
+        calls = []
+        stream = UploadStream(self.path, chunk_size=4096,
+                              progress=lambda s, t: calls.append((s, t)),
+                              checksum='sha256')
+        for _ in stream:
+            pass
+        self.assertEqual(calls, [(4096, 10240), (8192, 10240),
+                                 (10240, 10240)])
+        self.assertEqual(stream.stats.size, len(DATA))
+        self.assertEqual(stream.stats.checksum,
+                         hashlib.sha256(DATA).hexdigest())
+
+    def test_iterate_again(self):
+        stream = UploadStream(self.path, chunk_size=4096, checksum='md5')
+        first = b''.join(bytes(c) for c in stream)
+        second = b''.join(bytes(c) for c in stream)
+        self.assertEqual(first, second)
+        self.assertEqual(stream.sent, len(DATA))
+        self.assertEqual(stream.stats.checksum, hashlib.md5(DATA).hexdigest())
+
+    def test_stats(self):
+        stats = TransferStats(100, 2.0, 'abc')
+        self.assertEqual(stats.to_dict(), {"size": 100,
+                                           "elapsed": 2.0,
+                                           "throughput": 50.0,
+                                           "checksum": 'abc'})
+
+    @patch('hpsdnclient.rest.requests.post')
+    def test_upload_app(self, post):
+        sent = {}
+
+        def fake_post(url, data, **kwargs):
+            sent["body"] = b''.join(data)
+            sent["headers"] = kwargs["headers"]
+            response = requests.Response()
+            response.status_code = 201
+            return response
+
+        post.side_effect = fake_post
+        stats = self.api.upload_app(self.path, checksum='sha1',
+                                    chunk_size=1000)
+        self.assertEqual(post.call_args[0][0],
+                         'https://10.10.10.10:8443/sdn/v2.0/apps')
+        self.assertEqual(sent["body"], DATA)
+        self.assertEqual(sent["headers"]['content-type'], 'application/zip')
+        self.assertEqual(sent["headers"]['Filename'],
+                         os.path.basename(self.path))
+        self.assertEqual(stats.size, len(DATA))
+        self.assertEqual(stats.checksum, hashlib.sha1(DATA).hexdigest())
+
+    @httpretty.activate
+    def test_upload_empty_app(self):
+        httpretty.register_uri(httpretty.POST,
+                               'https://10.10.10.10:8443/sdn/v2.0/auth',
+                               body=AUTH,
+                               status=201)
+        httpretty.register_uri(httpretty.POST,
+                               'https://10.10.10.10:8443/sdn/v2.0/apps',
+                               status=201)
+        with open(self.path, 'wb'):
+            pass
+        stats = self.api.upload_app(self.path)
+        self.assertEqual(httpretty.last_request().body, b'')
+        self.assertEqual(stats.size, 0)
+
+
+class DownloaderTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'logs.zip')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def _read(self):
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def test_attachment_filename(self):
+        response = requests.Response()
+        response.headers['Content-Disposition'] = \
+            'attachment; filename="../../etc/logs.zip"'
+        self.assertEqual(attachment_filename(response), 'logs.zip')
+        del response.headers['Content-Disposition']
+        self.assertEqual(attachment_filename(response, URL), 'logs')
+
+    def test_fetch_to_directory(self):
+        server = FakeLogServer()
+        downloader = Downloader(server.get, chunk_size=1000)
+        self.assertEqual(downloader.fetch(URL, self.dir), self.path)
+        self.assertEqual(self._read(), DATA)
+        self.assertEqual(os.listdir(self.dir), ['logs.zip'])
+        self.assertEqual(downloader.stats.size, len(DATA))
+        self.assertEqual(server.requested, [None])
+
+    def test_resume_after_drop(self):
+        server = FakeLogServer(failures=1, fail_after=3000)
+        calls = []
+        downloader = Downloader(server.get, chunk_size=1000,
+                                progress=lambda r, t: calls.append((r, t)))
+        downloader.fetch(URL, self.path)
+        self.assertEqual(self._read(), DATA)
+        self.assertEqual(server.requested, [None, 'bytes=3000-'])
+        self.assertEqual(calls[-1], (len(DATA), len(DATA)))
+
+    def test_no_resume(self):
+        server = FakeLogServer(failures=1, fail_after=3000)
+        downloader = Downloader(server.get, resume=False)
+        self.assertRaises(requests.ConnectionError,
+                          downloader.fetch, URL, self.path)
+
+    def test_restart_without_ranges(self):
+        server = FakeLogServer(ranges=False, failures=1, fail_after=3000)
+        Downloader(server.get, chunk_size=1000).fetch(URL, self.path)
+        self.assertEqual(self._read(), DATA)
+        self.assertEqual(server.requested, [None, 'bytes=3000-'])
+
+    def test_resume_part_file(self):
+        with open(self.path + '.part', 'wb') as f:
+            f.write(DATA[:4000])
+        server = FakeLogServer()
+        downloader = Downloader(server.get)
+        downloader.fetch(URL, self.path)
+        self.assertEqual(self._read(), DATA)
+        self.assertEqual(server.requested, [None, 'bytes=4000-'])
+        self.assertEqual(downloader.stats.size, len(DATA) - 4000)
+
+    def test_complete_part_file(self):
+        with open(self.path + '.part', 'wb') as f:
+            f.write(DATA)
+        server = FakeLogServer()
+        Downloader(server.get).fetch(URL, self.path)
+        self.assertEqual(self._read(), DATA)
+
+    def test_parallel(self):
+        server = FakeLogServer()
+        first = server.get(URL)
+        # One of the ranges drops after 500 bytes and is resumed
+        server.failures = 1
+        server.fail_after = 500
+        downloader = Downloader(server.get, chunk_size=1000, parallel=4)
+        downloader.fetch(URL, self.path, first)
+        self.assertEqual(self._read(), DATA)
+        ranges = ['bytes=0-2559', 'bytes=2560-5119',
+                  'bytes=5120-7679', 'bytes=7680-10239']
+        resumed = [r for r in server.requested[1:] if r not in ranges]
+        self.assertEqual(sorted(set(server.requested[1:]) - set(resumed)),
+                         ranges)
+        self.assertEqual(len(resumed), 1)
+        self.assertTrue(resumed[0] in ['bytes=500-2559', 'bytes=3060-5119',
+                                       'bytes=5620-7679', 'bytes=8180-10239'])
+        self.assertEqual(downloader.stats.size, len(DATA))
+
+    def test_parallel_range_ignored(self):
+        server = FakeLogServer()
+        first = server.get(URL)
+        server.ranges = False
+        downloader = Downloader(server.get, parallel=2)
+        self.assertRaises(TransferError, downloader.fetch, URL, self.path,
+                          first)
+
+    def test_restclient_download(self):
+        server = FakeLogServer(failures=1, fail_after=3000)
+        client = RestClient(XAuthToken('10.10.10.10', 'sdn', 'skyline'))
+        client._get = MagicMock(
+            side_effect=lambda url, is_file, headers: server.get(url,
+                                                                 headers))
+        self.assertEqual(client.download(URL, self.dir), self.path)
+        self.assertEqual(self._read(), DATA)
+        client._get.assert_called_with(URL, True, {'Range': 'bytes=3000-'})
@@ -14,7 +14,13 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import threading
 import unittest
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 from hpsdnclient import utils as utils
 
 class TestUtils(unittest.TestCase):
@@ -44,4 +50,197 @@ class TestUtils(unittest.TestCase):
         tmp = utils.hex_to_string(self.dpid_hex, utils.DPID)
         self.assertEqual(tmp, self.dpid_string)
 
+    def test_endpoint_family(self):
+        base = 'https://10.10.10.10:8443/sdn/v2.0/'
+        self.assertEqual(utils.endpoint_family(base + 'of/datapaths'), 'of')
+        self.assertEqual(utils.endpoint_family(base + 'net/links'), 'net')
+        self.assertEqual(utils.endpoint_family(base + 'diag/packets'), 'diag')
+        self.assertEqual(utils.endpoint_family(base + 'apps'), 'core')
+        self.assertEqual(utils.endpoint_family(base + 'of?x=1'), 'of')
+        self.assertEqual(utils.endpoint_family('http://foo.bar'), 'core')
+
+    def test_string_to_hex_letters(self):
+        self.assertEqual(utils.string_to_hex('0a:00:27:00:00:0f', utils.MAC),
+                         '0xa002700000f')
+        self.assertEqual(utils.string_to_hex('00:00:00:00:00:00', utils.MAC),
+                         '0x0')
+
+    def test_hex_to_string_zeros(self):
+        self.assertEqual(utils.hex_to_string('0x0', utils.MAC),
+                         '00:00:00:00:00:00')
+        self.assertEqual(utils.hex_to_string('0X0A', utils.MAC),
+                         '00:00:00:00:00:0a')
+        self.assertEqual(utils.hex_to_string(0x10, utils.DPID),
+                         '00:00:00:00:00:00:00:10')
+        self.assertRaises(ValueError, utils.hex_to_string, '0x1000000000000',
+                          utils.MAC)
+
+
+class TestBatchConversion(unittest.TestCase):
+
+    def test_round_trip(self):
+        values = [0, 1, 0xff, 0x123456789abcdef0, 2 ** 64 - 1]
+        strings = utils.ints_to_strings(values)
+        self.assertEqual(strings[2], '00:00:00:00:00:00:00:ff')
+        self.assertEqual(strings[4], 'ff:ff:ff:ff:ff:ff:ff:ff')
+        self.assertEqual(utils.strings_to_ints(strings), values)
+
+    def test_mac(self):
+        self.assertEqual(utils.ints_to_strings([0xa002700000f], utils.MAC),
+                         ['0a:00:27:00:00:0f'])
+        self.assertRaises(ValueError, utils.ints_to_strings, [2 ** 48],
+                          utils.MAC)
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_numpy_round_trip(self):
+        values = numpy.array([0, 1, 0xff, 0x123456789abcdef0, 2 ** 64 - 1],
+                             dtype=numpy.uint64)
+        strings = utils.ints_to_strings(values)
+        self.assertEqual(list(strings),
+                         utils.ints_to_strings([int(v) for v in values]))
+        ints = utils.strings_to_ints(strings)
+        self.assertEqual(ints.dtype, numpy.uint64)
+        self.assertTrue((ints == values).all())
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_numpy_mac(self):
+        strings = utils.ints_to_strings(numpy.array([0xa002700000f]),
+                                        utils.MAC)
+        self.assertEqual(list(strings), ['0a:00:27:00:00:0f'])
+        ints = utils.strings_to_ints(numpy.array(['0A:00:27:00:00:0F']))
+        self.assertEqual(int(ints[0]), 0xa002700000f)
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_numpy_invalid(self):
+        self.assertRaises(ValueError, utils.strings_to_ints,
+                          numpy.array(['00:00:00:00:00:0g']))
+        self.assertRaises(ValueError, utils.strings_to_ints,
+                          numpy.array(['00-00-00-00-00-01']))
+        self.assertRaises(ValueError, utils.ints_to_strings,
+                          numpy.array([2 ** 48]), utils.MAC)
+
+
+class TestAddress(unittest.TestCase):
+
+    def test_dpid(self):
+        dpid = utils.Dpid('00:00:00:00:00:00:00:0A')
+        self.assertEqual(dpid.value, 10)
+        self.assertEqual(str(dpid), '00:00:00:00:00:00:00:0a')
+        self.assertEqual(repr(dpid), "Dpid('00:00:00:00:00:00:00:0a')")
+        self.assertEqual(int(dpid), 10)
+        self.assertEqual(hex(dpid), '0xa')
+        self.assertEqual(utils.Dpid(dpid), dpid)
+
+    def test_range(self):
+        self.assertRaises(ValueError, utils.MacAddress, 2 ** 48)
+        self.assertRaises(ValueError, utils.Dpid, -1)
+
+    def test_equality_and_hash(self):
+        dpid = utils.Dpid(1)
+        self.assertEqual(dpid, utils.Dpid('00:00:00:00:00:00:00:01'))
+        self.assertEqual(dpid, '00:00:00:00:00:00:00:01')
+        self.assertNotEqual(dpid, utils.Dpid(2))
+        self.assertNotEqual(dpid, 'foo')
+        self.assertNotEqual(dpid, 1)
+        table = {'00:00:00:00:00:00:00:01': 'switch'}
+        self.assertEqual(table[dpid], 'switch')
+        self.assertEqual(len(set([dpid, utils.Dpid(1)])), 1)
+
+    def test_equality_follows_hash(self):
+        dpid = utils.Dpid(0xab)
+        self.assertEqual(dpid, '00:00:00:00:00:00:00:ab')
+        self.assertEqual(hash(dpid), hash('00:00:00:00:00:00:00:ab'))
+        # Other spellings hash differently, so they are not equal either
+        self.assertNotEqual(dpid, '00:00:00:00:00:00:00:AB')
+        self.assertNotEqual(dpid, 'ab')
+        self.assertNotEqual(dpid, utils.MacAddress(0xab))
+        self.assertEqual(dpid, utils.Dpid('00:00:00:00:00:00:00:AB'))
+
+    def test_ordering(self):
+        macs = [utils.MacAddress(3), utils.MacAddress(1),
+                utils.MacAddress(2)]
+        self.assertEqual([m.value for m in sorted(macs)], [1, 2, 3])
+        self.assertTrue(utils.MacAddress(1) < '00:00:00:00:00:02')
+        self.assertTrue(utils.MacAddress(3) >= utils.MacAddress(3))
+
+    def test_slots(self):
+        self.assertRaises(AttributeError, setattr, utils.Dpid(1), 'x', 1)
+
+    def test_pickle(self):
+        import pickle
+        dpid = utils.Dpid(5)
+        self.assertEqual(pickle.loads(pickle.dumps(dpid)), dpid)
+
+
+class TestDpidUrls(unittest.TestCase):
+
+    def test_quote_dpid(self):
+        quoted = '00%3A00%3A00%3A00%3A00%3A00%3A00%3A0a'
+        self.assertEqual(utils.quote_dpid('00:00:00:00:00:00:00:0a'), quoted)
+        self.assertEqual(utils.quote_dpid(10), quoted)
+        self.assertEqual(utils.quote_dpid(utils.Dpid(10)), quoted)
+        self.assertRaises(ValueError, utils.quote_dpid, 2 ** 64)
+
+    def test_dpid_hook(self):
+        import json
+        cache = {}
+        text = ('[{"src_dpid": "00:00:00:00:00:00:00:01", '
+                '"dst_dpid": "00:00:00:00:00:00:00:02"}, '
+                '{"dpid": "00:00:00:00:00:00:00:01", "dpids": "x"}, '
+                '{"dpid": "bogus"}]')
+        links = json.loads(text, object_hook=utils.dpid_hook(cache))
+        self.assertEqual(links[0]["src_dpid"].value, 1)
+        self.assertEqual(links[0]["dst_dpid"].value, 2)
+        # Each DPID is parsed once and shared
+        self.assertTrue(links[0]["src_dpid"] is links[1]["dpid"])
+        self.assertEqual(links[1]["dpids"], "x")
+        self.assertEqual(links[2]["dpid"], "bogus")
+        self.assertEqual(len(cache), 2)
+
+
+class RunParallelTests(unittest.TestCase):
+    def test_runs_every_task(self):
+        done = []
+        tasks = [lambda i=i: done.append(i) for i in range(10)]
+        self.assertEqual(utils.run_parallel(tasks, 4), [])
+        self.assertEqual(sorted(done), list(range(10)))
+
+    def test_parallel(self):
+        # Both tasks must run at once to pass the barrier
+        barrier = threading.Event()
+        seen = []
+
+        def task():
+            seen.append(1)
+            if len(seen) == 2:
+                barrier.set()
+            if not barrier.wait(5):
+                raise RuntimeError("not parallel")
+
+        self.assertEqual(utils.run_parallel([task, task], 2), [])
+
+    def test_single_task_in_calling_thread(self):
+        threads = []
+        utils.run_parallel(
+            [lambda: threads.append(threading.current_thread())], 8)
+        self.assertEqual(threads, [threading.current_thread()])
+
+    def test_collects_errors(self):
+        def fail():
+            raise ValueError()
+
+        done = []
+        errors = utils.run_parallel([fail, fail, lambda: done.append(1)], 1)
+        self.assertEqual(len(errors), 2)
+        self.assertTrue(isinstance(errors[0], ValueError))
+        self.assertEqual(done, [1])
+
+    def test_stop_on_error(self):
+        def fail():
+            raise ValueError()
 
+        done = []
+        errors = utils.run_parallel([fail, lambda: done.append(1)], 1,
+                                    stop_on_error=True)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(done, [])
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import copy
+import threading
+import unittest
+
+import requests
+
+from hpsdnclient.api import Api
+from hpsdnclient.auth import XAuthToken
+from hpsdnclient.datatypes import Datapath, Flow
+from hpsdnclient.tests.stub import Faults, StubController, StubState, dpid
+from hpsdnclient.watch import (COUNTERS_CHANGED, DATAPATH_CONNECTED,
+                               DATAPATH_DISCONNECTED, FLOW_ADDED,
+                               FLOW_MODIFIED, FLOW_REMOVED, Watcher)
+
+
+def _kinds(events):
+    return sorted((e.kind, e.dpid) for e in events)
+
+
+class WatcherTests(unittest.TestCase):
+    def setUp(self):
+        self.state = StubState(datapaths=2, flows=3)
+        self.stub = StubController(self.state, etags=True).start()
+        self.addCleanup(self.stub.stop)
+        self.auth = XAuthToken(self.stub.address, 'sdn', 'skyline')
+        self.api = Api(self.stub.address, self.auth)
+        self.dpids = self.state.dpids[:]
+
+    def _events(self, watcher):
+        watcher.poll()
+        return list(watcher.events(timeout=0))
+
+    def _connect(self, number):
+        d = dpid(number)
+        with self.state.lock:
+            datapath = copy.deepcopy(self.state.datapaths[self.dpids[0]])
+            datapath["dpid"] = d
+            self.state.datapaths[d] = datapath
+            self.state.flows[d] = [copy.deepcopy(
+                self.state.flows[self.dpids[0]][0])]
+            self.state.dpids.append(d)
+        return d
+
+    def test_first_poll_is_silent(self):
+        watcher = Watcher(self.api)
+        self.assertEqual(self._events(watcher), [])
+        self.assertEqual(watcher.to_dict()["watched"], self.dpids)
+
+    def test_initial(self):
+        watcher = Watcher(self.api, initial=True)
+        events = self._events(watcher)
+        self.assertEqual(_kinds(events),
+                         sorted([(DATAPATH_CONNECTED, d) for d in self.dpids] +
+                                [(FLOW_ADDED, d) for d in self.dpids] * 3))
+        self.assertTrue(isinstance(events[0].item, Datapath))
+        self.assertTrue(isinstance(events[-1].item, Flow))
+
+    def test_flow_events(self):
+        watcher = Watcher(self.api)
+        self._events(watcher)
+        d = self.dpids[0]
+        with self.state.lock:
+            flows = self.state.flows[d]
+            flows[0]["packet_count"] += 10
+            flows[1]["idle_timeout"] = 5
+            removed = flows.pop(2)
+            added = copy.deepcopy(removed)
+            added["priority"] = 50000
+            flows.append(added)
+        events = dict((e.kind, e) for e in self._events(watcher))
+        self.assertEqual(sorted(events), [COUNTERS_CHANGED, FLOW_ADDED,
+                                          FLOW_MODIFIED, FLOW_REMOVED])
+        counters = events[COUNTERS_CHANGED]
+        self.assertEqual(counters.item.packet_count,
+                         counters.previous.packet_count + 10)
+        self.assertEqual(events[FLOW_MODIFIED].item.idle_timeout, 5)
+        self.assertEqual(events[FLOW_ADDED].item.priority, 50000)
+        self.assertEqual(events[FLOW_REMOVED].item.priority,
+                         removed["priority"])
+        self.assertEqual(set(e.dpid for e in events.values()), set([d]))
+        self.assertEqual(self._events(watcher), [])
+
+    def test_match_order(self):
+        watcher = Watcher(self.api)
+        self._events(watcher)
+        with self.state.lock:
+            flow = self.state.flows[self.dpids[0]][0]
+            flow["match"] = list(reversed(flow["match"]))
+        self.assertEqual(self._events(watcher), [])
+
+    def test_datapaths(self):
+        watcher = Watcher(self.api)
+        self._events(watcher)
+        d = self._connect(9)
+        with self.state.lock:
+            self.state.dpids.remove(self.dpids[1])
+        events = self._events(watcher)
+        # The flows of a datapath that connects later are new
+        self.assertEqual(_kinds(events), [(DATAPATH_CONNECTED, d),
+                                          (DATAPATH_DISCONNECTED,
+                                           self.dpids[1]),
+                                          (FLOW_ADDED, d)])
+        self.assertEqual(watcher.to_dict()["watched"], [self.dpids[0], d])
+        with self.state.lock:
+            self.state.flows[d] = []
+        self.assertEqual(_kinds(self._events(watcher)), [(FLOW_REMOVED, d)])
+
+    def test_selected_dpids(self):
+        watcher = Watcher(self.api, dpids=[self.dpids[1]])
+        self._events(watcher)
+        self.assertEqual(watcher.to_dict()["watched"], [self.dpids[1]])
+        watcher = Watcher(self.api, dpids=[])
+        self._events(watcher)
+        self.assertEqual(watcher.to_dict()["watched"], [])
+        self.assertEqual(self.stub.requests['GET of/datapaths/{dpid}/flows'],
+                         1)
+
+    def test_staggered(self):
+        dpids = [dpid(n) for n in range(1, 5)]
+        watcher = Watcher(self.api, dpids=dpids, interval=10.0)
+        due = sorted(t.due for t in watcher._flows.values())
+        gaps = [b - a for a, b in zip(due, due[1:])]
+        for gap in gaps:
+            self.assertAlmostEqual(gap, 2.0, places=2)
+
+    def test_adaptive_interval(self):
+        watcher = Watcher(self.api, interval=1.0, max_interval=3.0,
+                          backoff=2.0)
+        watcher.poll()
+        target = watcher._flows[self.dpids[0]]
+        self.assertEqual(target.interval, 2.0)
+        watcher.poll()
+        watcher.poll()
+        self.assertEqual(target.interval, 3.0)
+        with self.state.lock:
+            self.state.flows[self.dpids[0]].pop()
+        watcher.poll()
+        self.assertEqual(target.interval, 1.0)
+        self.assertEqual(watcher._flows[self.dpids[1]].interval, 3.0)
+
+    def test_errors(self):
+        self.stub.faults = Faults(error_rate=1.0, paths='/flows')
+        errors = []
+        watcher = Watcher(self.api, dpids=[self.dpids[0]],
+                          on_error=errors.append, max_interval=30.0)
+        watcher.poll()
+        self.assertTrue(isinstance(errors[0], requests.HTTPError))
+        self.assertEqual(watcher._flows[self.dpids[0]].interval, 30.0)
+        self.assertEqual(watcher.to_dict()["errors"], 1)
+
+    def test_callback_thread(self):
+        seen = []
+        added = threading.Event()
+
+        def callback(event):
+            seen.append(event)
+            if event.kind == FLOW_ADDED:
+                added.set()
+
+        watcher = Watcher(self.api, callback, interval=0.02,
+                          max_interval=0.05)
+        watcher.poll()
+        with watcher:
+            d = self._connect(9)
+            self.assertTrue(added.wait(5))
+        self.assertEqual(_kinds(seen), [(DATAPATH_CONNECTED, d),
+                                        (FLOW_ADDED, d)])
+
+
+class PollTests(unittest.TestCase):
+    def _start(self, etags):
+        self.stub = StubController(StubState(datapaths=1, flows=3),
+                                   etags=etags).start()
+        self.addCleanup(self.stub.stop)
+        auth = XAuthToken(self.stub.address, 'sdn', 'skyline')
+        self.api = Api(self.stub.address, auth)
+        self.url = self.api._of_base_url + 'datapaths'
+
+    def test_conditional(self):
+        self._start(True)
+        data, etag, digest = self.api.restclient.poll(self.url)
+        self.assertEqual(len(data["datapaths"]), 1)
+        self.assertTrue(etag)
+        self.assertEqual(self.api.restclient.poll(self.url, etag, digest),
+                         (None, etag, digest))
+
+    def test_digest(self):
+        self._start(False)
+        data, etag, digest = self.api.restclient.poll(self.url)
+        self.assertEqual(etag, None)
+        self.assertEqual(self.api.restclient.poll(self.url, None, digest),
+                         (None, None, digest))
+        with self.stub.state.lock:
+            self.stub.state.dpids.append(dpid(2))
+            self.stub.state.datapaths[dpid(2)] = {"dpid": dpid(2)}
+        data, _, new_digest = self.api.restclient.poll(self.url, None, digest)
+        self.assertEqual(len(data["datapaths"]), 2)
+        self.assertNotEqual(new_digest, digest)
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Client side rate limiting and concurrency control """
+
+import collections
+import threading
+import time
+
+from hpsdnclient.utils import endpoint_family
+
+OVERLOAD_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+
+
+class TokenBucket(object):
+    """ A token bucket rate limiter
+
+    :param float rate: Tokens added per second
+    :param int burst: Maximum number of tokens held by the bucket
+
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1, rate))
+        self._tokens = self.burst
+        self._updated = time.time()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def try_acquire(self, tokens=1):
+        """ Take tokens without blocking. Returns True on success """
+        with self._lock:
+            self._refill(time.time())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1):
+        """ Take tokens, blocking until they are available """
+        while True:
+            with self._lock:
+                self._refill(time.time())
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveLimiter(object):
+    """ An AIMD concurrency limiter
+
+    The limit grows by ``increase`` for every ``limit`` successful requests
+    and is multiplied by ``decrease`` when the error rate over the last
+    ``window`` requests exceeds ``error_threshold`` or a request is slower
+    than ``latency_target``. At most one decrease happens per ``limit``
+    completed requests so that a burst of failures from requests that were
+    already in flight does not collapse the limit.
+
+    :param int initial: Initial number of concurrent requests
+    :param int min_limit: Lower bound for the limit
+    :param int max_limit: Upper bound for the limit
+    :param float increase: Additive increase
+    :param float decrease: Multiplicative decrease factor
+    :param float latency_target: Latency in seconds treated as overload
+    :param float error_threshold: Error rate treated as overload
+    :param int window: Number of requests used to compute the error rate
+
+    """
+    def __init__(self, initial=8, min_limit=1, max_limit=64, increase=1.0,
+                 decrease=0.5, latency_target=None, error_threshold=0.1,
+                 window=20):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self.error_threshold = error_threshold
+        self.limit = float(min(max(initial, min_limit), max_limit))
+        self.inflight = 0
+        self._outcomes = collections.deque(maxlen=window)
+        self._since_decrease = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """ Block until a request may be sent """
+        with self._cond:
+            while self.inflight >= int(self.limit):
+                self._cond.wait()
+            self.inflight += 1
+
+    def release(self, latency, error=False):
+        """ Record the outcome of a request and adjust the limit """
+        with self._cond:
+            self.inflight -= 1
+            self._outcomes.append(error)
+            self._since_decrease += 1
+            errors = sum(1 for e in self._outcomes if e)
+            overloaded = (errors > self.error_threshold * len(self._outcomes)
+                          and error)
+            if self.latency_target is not None:
+                overloaded = overloaded or latency > self.latency_target
+            if overloaded:
+                if self._since_decrease >= int(self.limit):
+                    self.limit = max(self.min_limit,
+                                     self.limit * self.decrease)
+                    self._since_decrease = 0
+            elif not error:
+                self.limit = min(self.max_limit,
+                                 self.limit + self.increase / self.limit)
+            self._cond.notify_all()
+
+
+class Throttle(object):
+    """ Rate and concurrency limits for a single endpoint family
+
+    :param hpsdnclient.throttle.TokenBucket bucket: Rate limiter (Optional)
+    :param hpsdnclient.throttle.AdaptiveLimiter limiter:
+        Concurrency limiter (Optional)
+
+    """
+    def __init__(self, bucket=None, limiter=None):
+        self.bucket = bucket
+        self.limiter = limiter
+
+    def call(self, send):
+        """ Call ``send`` once the limits allow it """
+        if self.bucket is not None:
+            self.bucket.acquire()
+        if self.limiter is None:
+            return send()
+        self.limiter.acquire()
+        start = time.time()
+        error = True
+        try:
+            response = send()
+            error = response.status_code in OVERLOAD_STATUS_CODES
+            return response
+        finally:
+            self.limiter.release(time.time() - start, error)
+
+    def to_dict(self):
+        data = {}
+        if self.bucket is not None:
+            data["rate"] = self.bucket.rate
+            data["burst"] = self.bucket.burst
+        if self.limiter is not None:
+            data["limit"] = self.limiter.limit
+            data["inflight"] = self.limiter.inflight
+        return data
+
+
+class Governor(object):
+    """ Applies a Throttle per endpoint family (``of``, ``net``, ``diag``
+    and ``core``)
+
+    :param dict families: Maps an endpoint family to a Throttle
+    :param hpsdnclient.throttle.Throttle default:
+        Used for families without their own Throttle (Optional)
+
+    """
+    def __init__(self, families=None, default=None):
+        self.families = dict(families or {})
+        self.default = default
+
+    def throttle(self, url):
+        return self.families.get(endpoint_family(url), self.default)
+
+    def call(self, url, send):
+        """ Call ``send`` subject to the limits for the family of ``url``"""
+        throttle = self.throttle(url)
+        if throttle is None:
+            return send()
+        return throttle.call(send)
+
+    def to_dict(self):
+        data = dict((k, v.to_dict()) for k, v in self.families.items())
+        if self.default is not None:
+            data["default"] = self.default.to_dict()
+        return data
@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Timing of the phases of a request, and profiling of decoding
+
+Connection times are only known when requests are sent through a
+session made by :func:`timing_session`. ::
+
+    metrics = MetricsCollector()
+    api = Api('10.0.0.1', auth, session=timing_session(),
+              hooks=[metrics])
+
+"""
+
+import threading
+import time
+
+try:
+    import cProfile
+    import pstats
+except ImportError:
+    cProfile = None
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+# Python3 compatibility
+try:
+    from io import StringIO
+except ImportError:
+    from StringIO import StringIO
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.connection import (HTTPConnection,
+                                                  HTTPSConnection)
+from requests.packages.urllib3.connectionpool import (HTTPConnectionPool,
+                                                      HTTPSConnectionPool)
+
+# Defined with RequestInfo, so hooks need not import this module
+from hpsdnclient.hooks import PHASES  # noqa
+
+
+CPROFILE = 'cprofile'
+TRACEMALLOC = 'tracemalloc'
+
+_local = threading.local()
+
+
+def reset_connect_time():
+    _local.connect = None
+
+
+def connect_time():
+    """ Seconds spent connecting in this thread since the last reset, or
+    None if the request was not sent through a :class:`TimingAdapter` """
+    return getattr(_local, 'connect', None)
+
+
+class _TimedConnect(object):
+    def connect(self):
+        start = time.time()
+        try:
+            return super(_TimedConnect, self).connect()
+        finally:
+            _local.connect = (connect_time() or 0.0) + time.time() - start
+
+
+class TimedHTTPConnection(_TimedConnect, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnect, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimingAdapter(HTTPAdapter):
+    """ A transport adapter that records the time spent connecting,
+    including the TLS handshake """
+    def init_poolmanager(self, *args, **kwargs):
+        super(TimingAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool}
+
+    def send(self, request, **kwargs):
+        # The connect phase is measured, even if no connection is made
+        if connect_time() is None:
+            _local.connect = 0.0
+        return super(TimingAdapter, self).send(request, **kwargs)
+
+
+def timing_session():
+    """ Returns a requests Session that records connection times. The
+    session also keeps connections to the controller alive. """
+    session = requests.Session()
+    adapter = TimingAdapter()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class DecodeProfiler(object):
+    """ Profiles a function call with cProfile or tracemalloc
+
+    Only one call is profiled at a time; calls made while another is
+    being profiled are not profiled.
+
+    :param str mode: ``"cprofile"`` or ``"tracemalloc"``
+    :param int top: Number of functions or lines in the report
+
+    """
+    def __init__(self, mode=CPROFILE, top=20):
+        if mode == CPROFILE and cProfile is None:
+            raise ValueError("cProfile is not available")
+        if mode == TRACEMALLOC and tracemalloc is None:
+            raise ValueError("tracemalloc needs Python 3.4 or later")
+        if mode not in (CPROFILE, TRACEMALLOC):
+            raise ValueError("Unknown profile mode {0}".format(mode))
+        self.mode = mode
+        self.top = top
+        self._lock = threading.Lock()
+
+    def call(self, func, *args):
+        """ Call func, returns its result and the report, or None if the
+        call was not profiled """
+        if not self._lock.acquire(False):
+            return func(*args), None
+        try:
+            if self.mode == CPROFILE:
+                return self._cprofile(func, args)
+            return self._tracemalloc(func, args)
+        finally:
+            self._lock.release()
+
+    def _cprofile(self, func, args):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is active
+            return func(*args), None
+        try:
+            result = func(*args)
+        finally:
+            profiler.disable()
+        out = StringIO()
+        stats = pstats.Stats(profiler, stream=out)
+        stats.sort_stats('cumulative').print_stats(self.top)
+        return result, out.getvalue()
+
+    def _tracemalloc(self, func, args):
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        try:
+            before = tracemalloc.take_snapshot()
+            current = tracemalloc.get_traced_memory()[0]
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            result = func(*args)
+            peak = tracemalloc.get_traced_memory()[1] - current
+            after = tracemalloc.take_snapshot()
+        finally:
+            if started:
+                tracemalloc.stop()
+        stats = after.compare_to(before, 'lineno')[:self.top]
+        report = "Peak: {0} bytes\n".format(peak)
+        report += "\n".join(str(s) for s in stats)
+        return result, report
@@ -0,0 +1,393 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Program flows, groups and meters on many datapaths as one transaction """
+
+import json
+import threading
+import time
+
+from hpsdnclient.error import TransactionError
+from hpsdnclient.template import FlowBatch
+from hpsdnclient.utils import BODY_TYPES, dpid_string, run_parallel
+
+# Flows given as a request body rather than as Flow objects
+ENCODED_FLOWS = (FlowBatch,) + BODY_TYPES
+
+FLOW = 'flow'
+GROUP = 'group'
+METER = 'meter'
+
+ADD = 'add'
+UPDATE = 'update'
+DELETE = 'delete'
+
+COMMITTED = 'committed'
+ROLLED_BACK = 'rolled_back'
+UNCHANGED = 'unchanged'
+INCONSISTENT = 'inconsistent'
+
+
+def flow_key(flow):
+    """ Flows are identified by their table, priority and match. The order
+    of the match fields does not matter """
+    data = flow if isinstance(flow, dict) else flow.to_dict()
+    match = sorted(json.dumps(field, sort_keys=True)
+                   for field in data.get("match") or [])
+    return (data.get("table_id") or 0, data.get("priority"), tuple(match))
+
+
+class Change(object):
+    """ A change to the flows, a group or a meter of one datapath
+
+    Flow changes hold a list of flows. Group and meter changes hold the
+    ID and, for adds and updates, the new Group or Meter.
+
+    :param str kind: FLOW, GROUP or METER
+    :param str action: ADD, UPDATE or DELETE
+    :param dpid: The datapath ID
+    :param item: The flows, group or meter
+    :param item_id: The group or meter ID
+
+    """
+    def __init__(self, kind, action, dpid, item=None, item_id=None):
+        self.kind = kind
+        self.action = action
+        self.dpid = dpid
+        self.item = item
+        self.item_id = item_id
+        # The state replaced by an update or delete, used to undo it
+        self.previous = None
+
+    def prepare(self, api, flows=None):
+        """ Fetch the state an update or delete replaces
+
+        :param flows: The datapath's current flows keyed by
+            :func:`flow_key`, for flow changes
+
+        """
+        if self.action == ADD:
+            return
+        if self.kind == FLOW:
+            items = self.item
+            if isinstance(items, FlowBatch):
+                items = [json.loads(f) for f in items.flows]
+            elif isinstance(items, BODY_TYPES):
+                body = json.loads(bytes(items).decode('utf-8'))
+                items = body.get("flows") or [body["flow"]]
+            self.previous = [flows[flow_key(f)] for f in items
+                             if flow_key(f) in flows]
+        elif self.kind == GROUP:
+            self.previous = api.get_group_details(self.dpid, self.item_id)
+        else:
+            self.previous = api.get_meter_details(self.dpid, self.item_id)
+
+    def apply(self, api):
+        getattr(self, '_' + self.kind)(api, self.action, self.item)
+
+    def undo(self, api):
+        if self.action == ADD:
+            getattr(self, '_' + self.kind)(api, DELETE, self.item)
+        elif self.action == UPDATE:
+            if self.previous:
+                getattr(self, '_' + self.kind)(api, UPDATE, self.previous)
+        elif self.previous:
+            getattr(self, '_' + self.kind)(api, ADD, self.previous)
+
+    def _flow(self, api, action, flows):
+        getattr(api, action + '_flows')(self.dpid, flows)
+
+    def _group(self, api, action, group):
+        if action == ADD:
+            api.add_group(self.dpid, group)
+        elif action == UPDATE:
+            api.update_group(self.dpid, self.item_id, group)
+        else:
+            api.delete_groups(self.dpid, self.item_id)
+
+    def _meter(self, api, action, meter):
+        if action == ADD:
+            api.add_meter(self.dpid, meter)
+        elif action == UPDATE:
+            api.update_meter(self.dpid, self.item_id, meter)
+        else:
+            api.delete_meter(self.dpid, self.item_id)
+
+    def __repr__(self):
+        item = len(self.item) if self.kind == FLOW else self.item_id
+        return '<Change {0} {1} {2} {3}>'.format(self.action, self.kind,
+                                                 dpid_string(self.dpid), item)
+
+
+class DatapathResult(object):
+    """ The outcome of a transaction on one datapath
+
+    ``state`` is COMMITTED if all its changes were applied, UNCHANGED if
+    none were, ROLLED_BACK if the applied changes were undone and
+    INCONSISTENT if undoing them failed.
+
+    :param str dpid: The datapath ID
+    :param list changes: The changes for the datapath
+
+    """
+    def __init__(self, dpid, changes):
+        self.dpid = dpid
+        self.changes = changes
+        self.applied = []
+        self.state = UNCHANGED
+        self.error = None
+        self.rollback_errors = []
+        self.latency = 0.0
+        self.rollback_latency = 0.0
+
+    def to_dict(self):
+        return {"dpid": self.dpid,
+                "state": self.state,
+                "changes": len(self.changes),
+                "applied": len(self.applied),
+                "error": None if self.error is None else str(self.error),
+                "rollback_errors": [str(e) for e in self.rollback_errors],
+                "latency": self.latency,
+                "rollback_latency": self.rollback_latency}
+
+
+class TransactionResult(object):
+    """ The outcome of a transaction
+
+    :param dict datapaths: DatapathResults keyed by DPID
+    :param float elapsed: Seconds from the start of the commit until it
+        was applied or rolled back
+
+    """
+    def __init__(self, datapaths, elapsed):
+        self.datapaths = datapaths
+        self.elapsed = elapsed
+
+    @property
+    def committed(self):
+        return all(d.state == COMMITTED for d in self.datapaths.values())
+
+    def failed(self):
+        """ Returns the DatapathResult of the first failed datapath """
+        for result in self.datapaths.values():
+            if result.error is not None:
+                return result
+        return None
+
+    def to_dict(self):
+        return {"committed": self.committed,
+                "elapsed": self.elapsed,
+                "datapaths": [d.to_dict() for d in self.datapaths.values()]}
+
+
+class Transaction(object):
+    """ Apply flow, group and meter changes to many datapaths, all or
+    nothing
+
+    Changes are queued with the methods below and applied by
+    :meth:`commit`. Each datapath's changes are applied in the order they
+    were queued, with consecutive flow changes of the same kind sent in a
+    single request; datapaths are programmed in parallel. If a change
+    fails, no further changes are started and every applied change is
+    undone, datapaths again in parallel: adds are deleted, and updated or
+    deleted items are restored from the state read before they changed.
+    The commit then raises :class:`~hpsdnclient.error.TransactionError`.
+
+    Used as a context manager, the transaction commits on exit unless an
+    exception was raised. ::
+
+        with Transaction(api) as tx:
+            for dpid in dpids:
+                tx.add_flows(dpid, flows)
+
+    :param api: The Api to program the datapaths with
+    :param int parallel: Number of datapaths programmed at once
+
+    """
+    def __init__(self, api, parallel=8):
+        self.api = api
+        self.parallel = parallel
+        self.changes = {}
+        self.result = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+
+    def _queue(self, change):
+        changes = self.changes.setdefault(dpid_string(change.dpid), [])
+        if change.kind == FLOW and not isinstance(change.item, ENCODED_FLOWS):
+            if not isinstance(change.item, list):
+                change.item = [change.item]
+            last = changes[-1] if changes else None
+            if (last is not None and last.kind == FLOW and
+                    last.action == change.action and
+                    not isinstance(last.item, ENCODED_FLOWS)):
+                last.item = last.item + change.item
+                return
+        changes.append(change)
+
+    def add_flows(self, dpid, flows):
+        """ Add a flow, or flows, to a datapath
+
+        :param dpid: The datapath ID
+        :param list, hpsdnclient.datatypes.Flow flows: The flow or flows,
+            a :class:`~hpsdnclient.template.FlowBatch` or an encoded body
+
+        """
+        self._queue(Change(FLOW, ADD, dpid, flows))
+
+    def update_flows(self, dpid, flows):
+        """ Update a flow, or flows, on a datapath
+
+        :param dpid: The datapath ID
+        :param list, hpsdnclient.datatypes.Flow flows: The flow or flows,
+            a :class:`~hpsdnclient.template.FlowBatch` or an encoded body
+
+        """
+        self._queue(Change(FLOW, UPDATE, dpid, flows))
+
+    def delete_flows(self, dpid, flows):
+        """ Delete a flow, or flows, from a datapath
+
+        :param dpid: The datapath ID
+        :param list, hpsdnclient.datatypes.Flow flows: The flow or flows,
+            a :class:`~hpsdnclient.template.FlowBatch` or an encoded body
+
+        """
+        self._queue(Change(FLOW, DELETE, dpid, flows))
+
+    def add_group(self, dpid, group):
+        """ Add a group to a datapath
+
+        :param dpid: The datapath ID
+        :param hpsdnclient.datatypes.Group group: The group
+
+        """
+        self._queue(Change(GROUP, ADD, dpid, group, group.id))
+
+    def update_group(self, dpid, group_id, group):
+        """ Update a group on a datapath
+
+        :param dpid: The datapath ID
+        :param str group_id: The group ID
+        :param hpsdnclient.datatypes.Group group: The group
+
+        """
+        self._queue(Change(GROUP, UPDATE, dpid, group, group_id))
+
+    def delete_group(self, dpid, group_id):
+        """ Delete a group from a datapath
+
+        :param dpid: The datapath ID
+        :param str group_id: The group ID
+
+        """
+        self._queue(Change(GROUP, DELETE, dpid, item_id=group_id))
+
+    def add_meter(self, dpid, meter):
+        """ Add a meter to a datapath
+
+        :param dpid: The datapath ID
+        :param hpsdnclient.datatypes.Meter meter: The meter
+
+        """
+        self._queue(Change(METER, ADD, dpid, meter, meter.id))
+
+    def update_meter(self, dpid, meter_id, meter):
+        """ Update a meter on a datapath
+
+        :param dpid: The datapath ID
+        :param str meter_id: The meter ID
+        :param hpsdnclient.datatypes.Meter meter: The meter
+
+        """
+        self._queue(Change(METER, UPDATE, dpid, meter, meter_id))
+
+    def delete_meter(self, dpid, meter_id):
+        """ Delete a meter from a datapath
+
+        :param dpid: The datapath ID
+        :param str meter_id: The meter ID
+
+        """
+        self._queue(Change(METER, DELETE, dpid, item_id=meter_id))
+
+    def _run(self, results, work):
+        """ Call work(result) for each DatapathResult, ``parallel`` at a
+        time """
+        errors = run_parallel([lambda r=r: work(r) for r in results],
+                              self.parallel)
+        if errors:
+            raise errors[0]
+
+    def _apply(self, result, abort):
+        start = time.time()
+        try:
+            changes = result.changes
+            if any(c.kind == FLOW and c.action != ADD for c in changes):
+                flows = dict((flow_key(f), f) for f in
+                             self.api.get_flows(changes[0].dpid))
+            else:
+                flows = None
+            for change in changes:
+                if abort.is_set():
+                    return
+                change.prepare(self.api, flows)
+                change.apply(self.api)
+                result.applied.append(change)
+            result.state = COMMITTED
+        except Exception as e:
+            result.error = e
+            abort.set()
+        finally:
+            result.latency = time.time() - start
+
+    def _rollback(self, result):
+        start = time.time()
+        for change in reversed(result.applied):
+            try:
+                change.undo(self.api)
+            except Exception as e:
+                result.rollback_errors.append(e)
+        result.state = INCONSISTENT if result.rollback_errors else ROLLED_BACK
+        result.rollback_latency = time.time() - start
+
+    def commit(self):
+        """ Apply the queued changes
+
+        :return: The state and latency of each datapath
+        :rtype: TransactionResult
+        :raises: TransactionError if a change failed. The changes applied
+            to every datapath were rolled back
+
+        """
+        start = time.time()
+        results = [DatapathResult(dpid, changes)
+                   for dpid, changes in self.changes.items()]
+        abort = threading.Event()
+        self._run(results, lambda r: self._apply(r, abort))
+        if abort.is_set():
+            self._run([r for r in results if r.applied], self._rollback)
+        self.changes = {}
+        self.result = TransactionResult(
+            dict((r.dpid, r) for r in results), time.time() - start)
+        if abort.is_set():
+            raise TransactionError(self.result)
+        return self.result
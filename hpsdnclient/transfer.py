@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Streaming file transfers """
+
+import hashlib
+import os
+import re
+import threading
+import time
+# Python3 compatibility
+try:
+    from urllib.parse import urlparse, unquote
+except ImportError:
+    from urlparse import urlparse
+    from urllib import unquote
+
+import requests
+
+from hpsdnclient.error import raise_errors, TransferError
+from hpsdnclient.utils import run_parallel
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+PART_SUFFIX = '.part'
+
+RESUME_EXCEPTIONS = (requests.ConnectionError, requests.Timeout,
+                     requests.exceptions.ChunkedEncodingError)
+
+FILENAME_RE = re.compile(r'filename\s*=\s*"?([^";]+)"?')
+CONTENT_RANGE_RE = re.compile(r'bytes\s+(\d+)-(\d+)/(\d+|\*)')
+
+
+class TransferStats(object):
+    """ The outcome of a file transfer
+
+    :param int size: Number of bytes transferred
+    :param float elapsed: Duration of the transfer in seconds
+    :param str checksum: Hex digest of the data, if one was requested
+
+    """
+    def __init__(self, size, elapsed, checksum=None):
+        self.size = size
+        self.elapsed = elapsed
+        self.checksum = checksum
+
+    @property
+    def throughput(self):
+        """ Bytes per second """
+        if self.elapsed <= 0:
+            return float(self.size)
+        return self.size / self.elapsed
+
+    def to_dict(self):
+        return {"size": self.size,
+                "elapsed": self.elapsed,
+                "throughput": self.throughput,
+                "checksum": self.checksum}
+
+
+class UploadStream(object):
+    """ Streams a file in binary mode, ``chunk_size`` bytes at a time
+
+    The stream can be passed as the body of a request; only one chunk is
+    held in memory at a time. Each iteration reads the file from the
+    start, so a request may be retried.
+
+    :param str path: The file to upload
+    :param int chunk_size: Number of bytes read and sent at a time
+    :param progress: Called as ``progress(sent, total)`` after each chunk
+    :param str checksum: A hashlib algorithm, e.g "sha256", used to compute
+        a checksum of the data as it is sent (Optional)
+
+    """
+    def __init__(self, path, chunk_size=DEFAULT_CHUNK_SIZE, progress=None,
+                 checksum=None):
+        self.path = path
+        self.filename = os.path.basename(path)
+        self.total = os.path.getsize(path)
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.checksum = checksum
+        self.sent = 0
+        self.stats = None
+
+    def __len__(self):
+        return self.total
+
+    def __iter__(self):
+        self.sent = 0
+        digest = hashlib.new(self.checksum) if self.checksum else None
+        start = time.time()
+        with open(self.path, 'rb', 0) as f:
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+                if digest is not None:
+                    digest.update(chunk)
+                yield chunk
+                self.sent += len(chunk)
+                if self.progress is not None:
+                    self.progress(self.sent, self.total)
+        self.stats = TransferStats(self.sent, time.time() - start,
+                                   digest.hexdigest() if digest else None)
+
+
+def attachment_filename(response, url=None):
+    """ Returns the file name from the response's Content-Disposition, or
+    from the last segment of the url. Any directories are stripped. """
+    disposition = response.headers.get("Content-Disposition", "")
+    match = FILENAME_RE.search(disposition)
+    if match is not None:
+        name = match.group(1).strip()
+    else:
+        name = unquote(urlparse(url or "").path.rstrip('/').split('/')[-1])
+    return os.path.basename(name.replace('\\', '/')) or 'download'
+
+
+def _replace(source, target):
+    try:
+        os.replace(source, target)
+    except AttributeError:
+        # Python 2 cannot rename over an existing file on Windows
+        if os.path.exists(target):
+            os.remove(target)
+        os.rename(source, target)
+
+
+class Downloader(object):
+    """ Downloads a file to disk in large chunks
+
+    The data is written to ``<path>.part`` and renamed once complete. If
+    the connection drops, the download resumes from the last byte written
+    with a Range request; servers that ignore the Range header restart
+    it from the beginning. A ``.part`` file left by an earlier download
+    is resumed in the same way. When ``parallel`` is greater than one and
+    the server accepts byte ranges, the file is fetched as that many
+    ranges on separate connections.
+
+    :param get: Called as ``get(url, headers)`` to send a streaming GET
+        request, returns the Response
+    :param int chunk_size: Number of bytes read and written at a time
+    :param int parallel: Number of ranges fetched at once
+    :param bool resume: Resume interrupted downloads
+    :param int retries: Resume attempts allowed per range
+    :param progress: Called as ``progress(received, total)`` after each
+        chunk. total is None if the size is unknown
+
+    """
+    def __init__(self, get, chunk_size=DEFAULT_CHUNK_SIZE, parallel=1,
+                 resume=True, retries=3, progress=None):
+        self.get = get
+        self.chunk_size = chunk_size
+        self.parallel = parallel
+        self.resume = resume
+        self.retries = retries
+        self.progress = progress
+        self.stats = None
+        self._offsets = {}
+        self._received = 0
+        self._transferred = 0
+        self._total = None
+        self._lock = threading.Lock()
+
+    def fetch(self, url, path=None, response=None):
+        """ Download url
+
+        :param str url: The URL to download
+        :param str path: The file to save to. If it is None or a
+            directory, the name from the Content-Disposition header is used
+        :param response: A streaming response to url that has already
+            been received (Optional)
+        :return: The path of the downloaded file
+        :rtype: str
+
+        """
+        start = time.time()
+        self._offsets = {}
+        self._received = 0
+        self._transferred = 0
+        if response is None:
+            response = self._request(url)
+        if path is None or os.path.isdir(path):
+            path = os.path.join(path or '', attachment_filename(response, url))
+        part = path + PART_SUFFIX
+        length = response.headers.get('Content-Length')
+        ranges = response.headers.get('Accept-Ranges', '').lower() == 'bytes'
+        if (self.parallel > 1 and ranges and length is not None and
+                response.status_code == 200):
+            response.close()
+            self._fetch_parallel(url, part, int(length))
+        else:
+            self._fetch_serial(url, part, response)
+        _replace(part, path)
+        self.stats = TransferStats(self._transferred, time.time() - start)
+        return path
+
+    def _request(self, url, start=None, end=None):
+        headers = {}
+        if start is not None:
+            headers['Range'] = 'bytes={0}-{1}'.format(
+                start, '' if end is None else end)
+        r = self.get(url, headers)
+        if r.status_code >= 400 and r.status_code != 416:
+            raise_errors(r)
+        return r
+
+    def _fetch_serial(self, url, part, response):
+        offset = 0
+        if self.resume and os.path.exists(part):
+            offset = os.path.getsize(part)
+            if offset:
+                response.close()
+                response = self._request(url, offset)
+        attempts = 0
+        while True:
+            if response.status_code == 416:
+                # Nothing is left to fetch if the partial file is complete
+                content_range = response.headers.get('Content-Range', '')
+                response.close()
+                if content_range.endswith('/{0}'.format(offset)):
+                    self._received = offset
+                    return
+                offset = 0
+                response = self._request(url)
+                continue
+            if response.status_code != 206:
+                # The server sent the whole file
+                offset = 0
+            length = response.headers.get('Content-Length')
+            self._total = offset + int(length) if length else None
+            self._received = offset
+            try:
+                self._write(response, part, 0, offset)
+                return
+            except RESUME_EXCEPTIONS:
+                attempts += 1
+                if not self.resume or attempts > self.retries:
+                    raise
+                offset = self._offsets[0]
+                response = self._request(url, offset)
+
+    def _fetch_parallel(self, url, part, total):
+        self._total = total
+        with open(part, 'wb') as f:
+            f.truncate(total)
+        size = max(-(-total // self.parallel), self.chunk_size)
+        ranges = [(start, min(start + size, total) - 1)
+                  for start in range(0, total, size)]
+        errors = run_parallel(
+            [lambda r=r: self._fetch_range(url, part, *r) for r in ranges],
+            len(ranges))
+        if errors:
+            raise errors[0]
+
+    def _fetch_range(self, url, part, start, end):
+        offset = start
+        attempts = 0
+        while True:
+            response = self._request(url, offset, end)
+            if response.status_code != 206:
+                response.close()
+                raise TransferError(url, "the server did not return bytes "
+                                    "{0}-{1}".format(offset, end))
+            try:
+                offset = self._write(response, part, start, offset, end)
+            except RESUME_EXCEPTIONS:
+                if not self.resume:
+                    raise
+                offset = self._offsets[start]
+            if offset > end:
+                return
+            attempts += 1
+            if attempts > self.retries:
+                raise TransferError(url, "bytes {0}-{1} are incomplete".format(
+                    offset, end))
+
+    def _write(self, response, part, key, offset, end=None):
+        """ Writes the response body to part from offset, returns the
+        offset after the last byte. The offset reached is also kept in
+        _offsets[key] in case the connection fails. """
+        self._offsets[key] = offset
+        try:
+            with open(part, 'r+b' if offset or end is not None else 'wb') as f:
+                f.seek(offset)
+                for chunk in response.iter_content(self.chunk_size):
+                    if not chunk:
+                        continue
+                    if not isinstance(chunk, bytes):
+                        chunk = chunk.encode("UTF-8")
+                    if end is not None:
+                        chunk = chunk[:end + 1 - offset]
+                    f.write(chunk)
+                    offset += len(chunk)
+                    self._offsets[key] = offset
+                    self._report(len(chunk))
+                if end is None:
+                    f.truncate()
+        finally:
+            response.close()
+        return offset
+
+    def _report(self, size):
+        with self._lock:
+            self._transferred += size
+            self._received += size
+            received = self._received
+        if self.progress is not None:
+            self.progress(received, self._total)
@@ -16,18 +16,376 @@
 
 """ Useful utilities """
 
+import threading
+# Python3 compatibility
+try:
+    from urllib.parse import quote
+except ImportError:
+    from urllib import quote
+try:
+    STRING_TYPES = (str, unicode)
+except NameError:
+    STRING_TYPES = (str,)
+
+# Request bodies that are already encoded
+BODY_TYPES = (bytes, bytearray, memoryview)
+
 MAC = 12
 DPID = 16
 
+DPID_KEYS = ('dpid', 'src_dpid', 'dst_dpid')
+
+_QUOTED_DPIDS = {}
+_QUOTED_DPIDS_MAX = 65536
+
+_HEX_BYTES = ['{0:02x}'.format(i) for i in range(256)]
+
+try:
+    (0).to_bytes(1, 'big').hex(':')
+
+    def _format(value, size):
+        return value.to_bytes(size, 'big').hex(':')
+except (AttributeError, TypeError):
+    def _format(value, size):
+        return ':'.join([_HEX_BYTES[(value >> shift) & 0xff]
+                         for shift in range((size - 1) * 8, -8, -8)])
+
+
+def string_to_int(st):
+    """ Convert a string like 00:00:00:00:00:00:00:01 to an integer """
+    return int(st.replace(':', ''), 16)
+
+
+def int_to_string(value, length):
+    """ Convert an integer to a string like 00:00:00:00:00:00:00:01
+
+    :param int value: The DPID or MAC address
+    :param int length: The number of hex digits, DPID or MAC
+
+    """
+    if value < 0 or value >> (length * 4):
+        raise ValueError("{0:#x} does not fit in {1} hex digits".format(
+            value, length))
+    return _format(value, length // 2)
+
 
 def string_to_hex(st, length):
     """ Convert a string like 00:00 in to hex 0x0000 format"""
-    tmp = '{0:#x}'.format(int(st.replace(':', '').lstrip('0'), length))
-    return tmp
+    return '{0:#x}'.format(string_to_int(st))
 
 
 def hex_to_string(hx, length):
     """Convert a hex number from 0x0000 to 00:00 format"""
-    tmp = hx.lstrip('0x').zfill(length)
-    tmp = ':'.join(a+b for a, b in zip(tmp[::2], tmp[1::2]))
-    return tmp
+    if isinstance(hx, STRING_TYPES):
+        hx = int(hx, 16)
+    return int_to_string(hx, length)
+
+
+def _numpy(values):
+    """ Returns the numpy module if values is a NumPy array, else None.
+    NumPy is optional, so it is only imported when an array is given """
+    if type(values).__name__ != 'ndarray':
+        return None
+    import numpy
+    return numpy
+
+
+def strings_to_ints(strings):
+    """ Convert DPID or MAC address strings to integers
+
+    :param strings: A sequence of strings, or a NumPy array of strings of
+        the same length
+    :return: A list of integers, or a NumPy uint64 array for an array
+
+    """
+    numpy = _numpy(strings)
+    if numpy is not None:
+        return _numpy_strings_to_ints(numpy, strings)
+    return [int(st.replace(':', ''), 16) for st in strings]
+
+
+def ints_to_strings(values, length=DPID):
+    """ Convert integers to DPID or MAC address strings
+
+    :param values: A sequence of integers, or a NumPy integer array
+    :param int length: The number of hex digits, DPID or MAC
+    :return: A list of strings, or a NumPy string array for an array
+
+    """
+    numpy = _numpy(values)
+    if numpy is not None:
+        return _numpy_ints_to_strings(numpy, values, length)
+    limit = 1 << (length * 4)
+    size = length // 2
+    result = []
+    for value in values:
+        if value < 0 or value >= limit:
+            raise ValueError("{0:#x} does not fit in {1} hex digits".format(
+                value, length))
+        result.append(_format(value, size))
+    return result
+
+
+def _numpy_ints_to_strings(numpy, values, length):
+    values = numpy.asarray(values, dtype=numpy.uint64)
+    size = length // 2
+    if length < 16 and (values >> numpy.uint64(length * 4)).any():
+        raise ValueError("values do not fit in {0} hex digits".format(length))
+    octets = values.astype('>u8').view(numpy.uint8).reshape(-1, 8)
+    octets = octets[:, 8 - size:]
+    high = octets >> 4
+    low = octets & 0xf
+    # Each octet becomes two hex digits and a separator, written as UCS4
+    # code points so the result can be viewed as a unicode array
+    chars = numpy.empty((len(values), size, 3), dtype=numpy.uint32)
+    chars[:, :, 0] = high + ord('0') + (ord('a') - ord('9') - 1) * (high > 9)
+    chars[:, :, 1] = low + ord('0') + (ord('a') - ord('9') - 1) * (low > 9)
+    chars[:, :, 2] = ord(':')
+    width = size * 3 - 1
+    chars = numpy.ascontiguousarray(chars.reshape(-1, size * 3)[:, :width])
+    return chars.view('U{0}'.format(width)).ravel()
+
+
+def _numpy_strings_to_ints(numpy, strings):
+    strings = numpy.asarray(strings)
+    if strings.dtype.kind == 'U':
+        width = strings.dtype.itemsize // 4
+        chars = strings.view(numpy.uint32).reshape(-1, width)
+        if (chars > 0x7f).any():
+            raise ValueError("Not DPID or MAC address strings")
+        chars = chars.astype(numpy.uint8)
+    elif strings.dtype.kind == 'S':
+        width = strings.dtype.itemsize
+        chars = strings.view(numpy.uint8).reshape(-1, width)
+    else:
+        raise ValueError("Not DPID or MAC address strings")
+    size = (width + 1) // 3
+    if (size * 3 - 1 != width or size > 8 or
+            (chars[:, 2::3] != ord(':')).any()):
+        raise ValueError("Not DPID or MAC address strings")
+    table = numpy.full(256, 0xff, dtype=numpy.uint8)
+    for i, c in enumerate('0123456789abcdef'):
+        table[ord(c)] = i
+        table[ord(c.upper())] = i
+    high = table[chars[:, 0::3]]
+    low = table[chars[:, 1::3]]
+    if ((high | low) > 0xf).any():
+        raise ValueError("Not DPID or MAC address strings")
+    octets = numpy.zeros((len(chars), 8), dtype=numpy.uint8)
+    octets[:, 8 - size:] = (high << 4) | low
+    return octets.view('>u8').ravel().astype(numpy.uint64)
+
+
+class _Address(object):
+    """ An integer backed DPID or MAC address. The string form is built
+    once, when first used. Addresses compare and hash like their lower
+    case string form, so they can be looked up in dicts keyed by the
+    strings the controller returns. Other spellings of the address, e.g
+    in upper case, are not equal to it; parse them first. """
+
+    __slots__ = ('value', '_string')
+    length = None
+
+    def __init__(self, value):
+        if isinstance(value, _Address):
+            value = value.value
+        elif isinstance(value, STRING_TYPES):
+            value = string_to_int(value)
+        if value < 0 or value >> (self.length * 4):
+            raise ValueError("{0:#x} is not a valid {1}".format(
+                value, type(self).__name__))
+        self.value = value
+        self._string = None
+
+    def __str__(self):
+        if self._string is None:
+            self._string = _format(self.value, self.length // 2)
+        return self._string
+
+    def __repr__(self):
+        return "{0}('{1}')".format(type(self).__name__, self)
+
+    def __int__(self):
+        return self.value
+
+    __index__ = __int__
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def __reduce__(self):
+        return type(self), (self.value,)
+
+    def _other(self, other):
+        if isinstance(other, type(self)):
+            return other.value
+        if isinstance(other, STRING_TYPES):
+            try:
+                return string_to_int(other)
+            except ValueError:
+                return None
+        return None
+
+    def __eq__(self, other):
+        # Only the canonical string is equal, as it is the one hashed
+        if isinstance(other, STRING_TYPES):
+            return str(self) == other
+        if isinstance(other, type(self)):
+            return self.value == other.value
+        return False
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __lt__(self, other):
+        value = self._other(other)
+        if value is None:
+            return NotImplemented
+        return self.value < value
+
+    def __le__(self, other):
+        value = self._other(other)
+        if value is None:
+            return NotImplemented
+        return self.value <= value
+
+    def __gt__(self, other):
+        value = self._other(other)
+        if value is None:
+            return NotImplemented
+        return self.value > value
+
+    def __ge__(self, other):
+        value = self._other(other)
+        if value is None:
+            return NotImplemented
+        return self.value >= value
+
+
+class Dpid(_Address):
+    """ A datapath ID
+
+    :param value: An integer, or a string like 00:00:00:00:00:00:00:01
+
+    """
+    __slots__ = ()
+    length = DPID
+
+
+class MacAddress(_Address):
+    """ A MAC address
+
+    :param value: An integer, or a string like 00:00:00:00:00:01
+
+    """
+    __slots__ = ()
+    length = MAC
+
+
+def dpid_string(dpid):
+    """ Returns the string form of a DPID given as an integer, a
+    :class:`Dpid` or a string """
+    if isinstance(dpid, STRING_TYPES):
+        return dpid
+    if isinstance(dpid, _Address):
+        return str(dpid)
+    return int_to_string(dpid, DPID)
+
+
+def quote_dpid(dpid):
+    """ Returns the DPID, given as an integer, a :class:`Dpid` or a string,
+    quoted for use in a url. Results are cached """
+    try:
+        return _QUOTED_DPIDS[dpid]
+    except KeyError:
+        pass
+    quoted = quote(dpid_string(dpid), safe='')
+    if len(_QUOTED_DPIDS) >= _QUOTED_DPIDS_MAX:
+        _QUOTED_DPIDS.clear()
+    _QUOTED_DPIDS[dpid] = quoted
+    return quoted
+
+
+def dpid_hook(cache):
+    """ Returns a json ``object_hook`` that replaces the DPIDs in decoded
+    objects with :class:`Dpid` values. Each DPID is parsed once and the
+    instance is shared through ``cache``, a dict of strings to Dpids """
+    def hook(obj):
+        for key in DPID_KEYS:
+            if key not in obj:
+                continue
+            value = obj[key]
+            if isinstance(value, STRING_TYPES):
+                dpid = cache.get(value)
+                if dpid is None:
+                    try:
+                        dpid = cache[value] = Dpid(value)
+                    except ValueError:
+                        continue
+                obj[key] = dpid
+        return obj
+    return hook
+
+
+API_ROOT = '/sdn/v2.0/'
+FAMILIES = ('of', 'net', 'diag')
+
+
+def controller_url(controller):
+    """Return the base url, e.g https://10.10.10.10:8443, for a controller.
+    The controller may be given as a host name or IP address, which uses
+    HTTPS on port 8443, or as a url like http://127.0.0.1:8080"""
+    if '://' in controller:
+        return controller.rstrip('/')
+    return 'https://{0}:8443'.format(controller)
+
+
+def run_parallel(tasks, parallel, stop_on_error=False):
+    """ Call each task, ``parallel`` at a time, in threads. A single task,
+    or a single worker, runs in the calling thread.
+
+    :param tasks: Callables taking no arguments
+    :param int parallel: Number of tasks run at once
+    :param bool stop_on_error: Start no more tasks once one has failed
+    :return: The exceptions raised by the tasks
+    :rtype: list
+
+    """
+    pending = list(tasks)
+    errors = []
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if not pending or (stop_on_error and errors):
+                    return
+                task = pending.pop(0)
+            try:
+                task()
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+
+    workers = min(parallel, len(pending))
+    if workers <= 1:
+        worker()
+        return errors
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def endpoint_family(url):
+    """Return the REST API family ("of", "net", "diag" or "core") that
+    the url belongs to"""
+    index = url.find(API_ROOT)
+    if index >= 0:
+        segment = url[index + len(API_ROOT):].split('/', 1)[0]
+        segment = segment.split('?', 1)[0]
+        if segment in FAMILIES:
+            return segment
+    return 'core'
@@ -0,0 +1,357 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Watch datapaths and flows for changes """
+
+import heapq
+import threading
+import time
+# Python3 compatibility
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from hpsdnclient.datatypes import JsonObjectFactory
+from hpsdnclient.transaction import flow_key
+from hpsdnclient.utils import dpid_string
+
+DATAPATH_CONNECTED = 'datapath_connected'
+DATAPATH_DISCONNECTED = 'datapath_disconnected'
+FLOW_ADDED = 'flow_added'
+FLOW_REMOVED = 'flow_removed'
+FLOW_MODIFIED = 'flow_modified'
+COUNTERS_CHANGED = 'counters_changed'
+
+# Flow fields that change without the flow being modified
+COUNTERS = ('packet_count', 'byte_count')
+VOLATILE = COUNTERS + ('duration_sec', 'duration_nsec')
+
+
+class Event(object):
+    """ A change seen by a :class:`Watcher`
+
+    :param str kind: What changed, e.g. FLOW_ADDED
+    :param str dpid: The datapath
+    :param item: The Datapath or Flow, as it is now. For removals and
+        disconnections, as it was last seen
+    :param previous: The Flow before it was modified or its counters
+        changed, otherwise None
+
+    """
+    def __init__(self, kind, dpid, item, previous=None):
+        self.kind = kind
+        self.dpid = dpid
+        self.item = item
+        self.previous = previous
+        self.time = time.time()
+
+    def __repr__(self):
+        return 'Event({0!r}, {1!r})'.format(self.kind, self.dpid)
+
+    def to_dict(self):
+        return {"kind": self.kind,
+                "dpid": self.dpid,
+                "item": self.item.to_dict(),
+                "previous": (self.previous.to_dict()
+                             if self.previous is not None else None),
+                "time": self.time}
+
+
+def _stable(flow):
+    """ The fields of a flow dict that only change when it is modified. The
+    match is part of the flow's key """
+    return dict((k, v) for k, v in flow.items()
+                if k not in VOLATILE and k != 'match')
+
+
+def _counters(flow):
+    return tuple(flow.get(name) for name in COUNTERS)
+
+
+class _Target(object):
+    """ A URL polled on its own schedule, with what was last seen there """
+    def __init__(self, url, dpid, interval, initial=False):
+        self.url = url
+        self.dpid = dpid
+        self.interval = interval
+        # Report what the first poll finds as added
+        self.initial = initial
+        self.due = 0.0
+        self.etag = None
+        self.digest = None
+        self.items = None
+        self.active = True
+
+
+class Watcher(object):
+    """ Polls datapaths and their flows, and reports changes as Events
+
+    Each datapath's flows, and the list of datapaths, are polled on their
+    own schedule. Polls start staggered across ``interval``, so that
+    requests are spread out rather than sent in bursts. A target that
+    changed is polled again after ``interval`` seconds; while it stays
+    the same its interval grows by ``backoff``, up to ``max_interval``.
+    Requests are conditional when the controller sends ETags, and bodies
+    are hashed so that unchanged responses are not parsed. Only the flows
+    that changed are converted to Flow objects.
+
+    Events are passed to ``callback`` in the watcher's thread. Without a
+    callback they are queued for :meth:`events`. From asyncio, use a
+    callback that hands events to the loop with
+    ``loop.call_soon_threadsafe``. ::
+
+        with Watcher(api, interval=2.0) as watcher:
+            for event in watcher.events():
+                print(event.kind, event.dpid)
+
+    Flows are identified by their table, priority and match. When a
+    datapath disconnects its flows stop being watched; no FLOW_REMOVED
+    events are sent for them.
+
+    :param api: The Api
+    :param callback: Called with each :class:`Event` (Optional)
+    :param list dpids: The datapaths whose flows are watched. By default,
+        every connected datapath. Pass an empty list to only watch the
+        datapaths
+    :param float interval: The shortest time between polls of a target
+    :param float max_interval: The longest time between polls of a target
+    :param float backoff: Factor the interval of an unchanged target grows
+        by after each poll
+    :param bool initial: Report the datapaths and flows found by the
+        first polls as connected and added
+    :param on_error: Called with the exceptions raised while polling. The
+        target is polled again after ``max_interval`` (Optional)
+
+    """
+    def __init__(self, api, callback=None, dpids=None, interval=5.0,
+                 max_interval=60.0, backoff=1.5, initial=False,
+                 on_error=None):
+        self.api = api
+        self.callback = callback
+        self.dpids = dpids
+        self.interval = interval
+        self.max_interval = max(max_interval, interval)
+        self.backoff = backoff
+        self.initial = initial
+        self.on_error = on_error
+        self.queue = queue.Queue() if callback is None else None
+        self._wanted = (set(dpid_string(d) for d in dpids)
+                        if dpids is not None else None)
+        self.polls = 0
+        self.changed = 0
+        self.errors = 0
+        self._datapaths = _Target(api._of_base_url + 'datapaths', None,
+                                  interval, initial)
+        self._flows = {}
+        self._schedule = []
+        self._sequence = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        start = time.time()
+        self._add(self._datapaths, start)
+        for i, dpid in enumerate(dpids or []):
+            self._watch_flows(dpid_string(dpid),
+                              start + interval * (i + 1) / (len(dpids) + 1),
+                              initial)
+
+    def _add(self, target, due):
+        target.due = due
+        with self._lock:
+            self._sequence += 1
+            heapq.heappush(self._schedule, (due, self._sequence, target))
+
+    def _watch_flows(self, dpid, due, initial):
+        if dpid in self._flows:
+            return
+        url = self.api._datapath_url(dpid) + '/flows'
+        target = self._flows[dpid] = _Target(url, dpid, self.interval,
+                                             initial)
+        self._add(target, due)
+
+    def _emit(self, kind, dpid, item, previous=None):
+        event = Event(kind, dpid, item, previous)
+        if self.callback is not None:
+            self.callback(event)
+        else:
+            self.queue.put(event)
+
+    def _poll(self, target):
+        """ Poll a target, report its changes, returns True if it changed """
+        self.polls += 1
+        data, target.etag, target.digest = self.api.restclient.poll(
+            target.url, target.etag, target.digest)
+        if data is None:
+            return False
+        if target is self._datapaths:
+            changed = self._datapaths_changed(data.get("datapaths") or [])
+        else:
+            changed = self._flows_changed(target, data.get("flows") or [])
+        if changed:
+            self.changed += 1
+        return changed
+
+    def _datapaths_changed(self, datapaths):
+        target = self._datapaths
+        first = target.items is None
+        previous = target.items or {}
+        current = dict((dpid_string(d["dpid"]), d) for d in datapaths)
+        target.items = current
+        connected = [d for d in current if d not in previous]
+        disconnected = [d for d in previous if d not in current]
+        # Stagger the first flow polls of the new datapaths. The flows of
+        # datapaths that connect later are all new
+        watch = [d for d in connected
+                 if self._wanted is None or d in self._wanted]
+        now = time.time()
+        for i, dpid in enumerate(watch):
+            self._watch_flows(dpid, now + self.interval * i / len(watch),
+                              target.initial or not first)
+        for dpid in disconnected:
+            flows = self._flows.pop(dpid, None)
+            if flows is not None:
+                flows.active = False
+        if first and not target.initial:
+            return False
+        for dpid in connected:
+            self._emit(DATAPATH_CONNECTED, dpid,
+                       JsonObjectFactory.create('Datapath', current[dpid]))
+        for dpid in disconnected:
+            self._emit(DATAPATH_DISCONNECTED, dpid,
+                       JsonObjectFactory.create('Datapath', previous[dpid]))
+        return bool(connected or disconnected)
+
+    def _flows_changed(self, target, flows):
+        first = target.items is None
+        previous = target.items or {}
+        current = {}
+        for flow in flows:
+            current[flow_key(flow)] = flow
+        target.items = current
+        if first and not target.initial:
+            return False
+        changed = False
+        create = JsonObjectFactory.create
+        for key, flow in current.items():
+            old = previous.get(key)
+            if old is None:
+                self._emit(FLOW_ADDED, target.dpid, create('Flow', flow))
+                changed = True
+            elif _stable(flow) != _stable(old):
+                self._emit(FLOW_MODIFIED, target.dpid, create('Flow', flow),
+                           create('Flow', old))
+                changed = True
+            elif _counters(flow) != _counters(old):
+                self._emit(COUNTERS_CHANGED, target.dpid,
+                           create('Flow', flow), create('Flow', old))
+                changed = True
+        for key, old in previous.items():
+            if key not in current:
+                self._emit(FLOW_REMOVED, target.dpid, create('Flow', old))
+                changed = True
+        return changed
+
+    def _run_target(self, target):
+        if not target.active:
+            return
+        try:
+            if self._poll(target):
+                target.interval = self.interval
+            else:
+                target.interval = min(target.interval * self.backoff,
+                                      self.max_interval)
+        except Exception as e:
+            self.errors += 1
+            target.interval = self.max_interval
+            if self.on_error is None:
+                raise
+            self.on_error(e)
+        finally:
+            self._add(target, time.time() + target.interval)
+
+    def _next(self):
+        """ Removes and returns the next target and when it is due """
+        with self._lock:
+            due, _, target = heapq.heappop(self._schedule)
+        return due, target
+
+    def poll(self):
+        """ Poll the datapaths and then every datapath's flows now, in the
+        calling thread. Use either poll or :meth:`start`, not both """
+        with self._lock:
+            self._schedule = []
+        self._run_target(self._datapaths)
+        with self._lock:
+            # New datapaths were scheduled; they are polled below instead
+            self._schedule = [entry for entry in self._schedule
+                              if entry[2] is self._datapaths]
+        for target in list(self._flows.values()):
+            self._run_target(target)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            due, target = self._next()
+            delay = due - time.time()
+            if delay > 0 and self._stop.wait(delay):
+                self._add(target, due)
+                break
+            try:
+                self._run_target(target)
+            except Exception:
+                # No on_error handler: keep watching the other targets
+                pass
+
+    def start(self):
+        """ Start polling in a background thread """
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """ Stop polling and wait for the current poll to finish """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def events(self, timeout=None):
+        """ Yields the queued events as they arrive, until the watcher is
+        stopped or no event arrives for ``timeout`` seconds """
+        if self.queue is None:
+            raise ValueError("Events are passed to the callback")
+        while True:
+            try:
+                yield self.queue.get(timeout=timeout if timeout is not None
+                                     else 0.1)
+            except queue.Empty:
+                if timeout is not None or self._stop.is_set():
+                    return
+
+    def to_dict(self):
+        return {"polls": self.polls,
+                "changed": self.changed,
+                "errors": self.errors,
+                "datapaths": len(self._datapaths.items or {}),
+                "watched": sorted(self._flows)}
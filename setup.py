@@ -57,6 +57,9 @@ setup(
     license='Apache License, Version 2.0',
     packages=['hpsdnclient'],
     include_package_data=True,
+    entry_points={
+        'console_scripts': ['hpsdn = hpsdnclient.cli:main'],
+    },
     install_requires=requires('requirements.txt'),
     test_suite='nose.collector',
     tests_require=requires('test-requirements.txt'),